@@ -0,0 +1,58 @@
+'''
+Micro-benchmark of the Python overhead of preparing an AeroTimeStepInfo for a
+call to the UVLM library, on the coupled_configuration_DARPA grid.
+
+Compares rebuilding the ctypes pointer tables on every call (previous
+behaviour: generate_ctypes_pointers + remove_ctypes_pointers) with the cached
+tables, which are only rebuilt after an array is reallocated.
+
+    python dev/benchmark_ctypes_pointers.py [n_calls]
+'''
+import sys
+import timeit
+
+import sharpy.utils.input_arg as input_arg
+import sharpy.utils.solver_interface as solver_interface
+from sharpy.presharpy.presharpy import PreSharpy
+from sharpy.utils.cout_utils import start_writer, finish_writer
+import sharpy.solvers
+import sharpy.postproc
+import sharpy.generators
+
+import tests.coupled.dynamic.coupled_configuration_DARPA.generate_coupled_configuration_DARPA as darpa
+
+
+def main(n_calls=1000):
+    start_writer()
+    settings = input_arg.read_settings(['', darpa.route + darpa.case_name + '.solver.txt'])
+    data = PreSharpy(settings)
+    for solver_name in ['BeamLoader', 'AerogridLoader']:
+        solver = solver_interface.initialise_solver(solver_name)
+        solver.initialise(data)
+        data = solver.run()
+    finish_writer()
+
+    tstep = data.aero.timestep_info[-1]
+
+    def rebuild():
+        tstep.generate_ctypes_pointers()
+        tstep.remove_ctypes_pointers()
+
+    def cached():
+        tstep.generate_ctypes_pointers()
+
+    t_rebuild = timeit.timeit(rebuild, number=n_calls)/n_calls
+    tstep.remove_ctypes_pointers()
+    t_cached = timeit.timeit(cached, number=n_calls)/n_calls
+
+    print('surfaces:                 %u' % tstep.n_surf)
+    print('rebuilt tables per call:  %.2f us' % (t_rebuild*1e6))
+    print('cached tables per call:   %.2f us' % (t_cached*1e6))
+    print('speed-up:                 %.1fx' % (t_rebuild/t_cached))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,87 @@
+'''
+Benchmark of the DynamicCoupled FSI loop on the hale test case.
+
+Reports, per time step, the wall time, the number of AeroTimeStepInfo and
+StructTimeStepInfo instances created and the memory allocated (tracemalloc).
+Run it on two checkouts to compare them:
+
+    python dev/benchmark_fsi_copies.py [n_time_steps]
+'''
+import os
+import sys
+import time
+import tracemalloc
+
+import configobj
+
+import sharpy.utils.input_arg as input_arg
+import sharpy.utils.solver_interface as solver_interface
+import sharpy.utils.datastructures as datastructures
+from sharpy.presharpy.presharpy import PreSharpy
+from sharpy.utils.cout_utils import start_writer, finish_writer
+import sharpy.solvers
+import sharpy.postproc
+import sharpy.generators
+
+import tests.coupled.dynamic.hale.generate_hale as hale
+
+
+def count_instances(cls, counter):
+    original_init = cls.__init__
+
+    def counted_init(self, *args, **kwargs):
+        counter[cls.__name__] += 1
+        original_init(self, *args, **kwargs)
+
+    cls.__init__ = counted_init
+
+
+def main(n_time_steps=20):
+    # benchmark settings: no postprocessors and a short simulation
+    solver_file = hale.route + hale.case_name + '.solver.txt'
+    config = configobj.ConfigObj(solver_file)
+    config['SHARPy']['flow'] = ['BeamLoader', 'AerogridLoader', 'StaticCoupled']
+    config['DynamicCoupled']['postprocessors'] = []
+    config['DynamicCoupled']['postprocessors_settings'] = {}
+    config['DynamicCoupled']['print_info'] = 'off'
+    config['DynamicCoupled']['n_time_steps'] = n_time_steps
+    config.filename = hale.route + hale.case_name + '_benchmark.solver.txt'
+    config.write()
+
+    start_writer()
+    settings = input_arg.read_settings(['', config.filename])
+    data = PreSharpy(settings)
+    for solver_name in settings['SHARPy']['flow']:
+        solver = solver_interface.initialise_solver(solver_name)
+        solver.initialise(data)
+        data = solver.run()
+
+    counter = {'AeroTimeStepInfo': 0, 'StructTimeStepInfo': 0}
+    count_instances(datastructures.AeroTimeStepInfo, counter)
+    count_instances(datastructures.StructTimeStepInfo, counter)
+
+    solver = solver_interface.initialise_solver('DynamicCoupled')
+    solver.initialise(data)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    solver.run()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    total = sum(stat.size for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+    finish_writer()
+    os.remove(config.filename)
+
+    print('time steps:                  %u' % n_time_steps)
+    print('wall time per time step:     %.4f s' % (elapsed/n_time_steps))
+    print('AeroTimeStepInfo per step:   %.2f' % (counter['AeroTimeStepInfo']/n_time_steps))
+    print('StructTimeStepInfo per step: %.2f' % (counter['StructTimeStepInfo']/n_time_steps))
+    print('memory held after run:       %.2f MB' % (total/1024**2))
+    print('peak traced memory:          %.2f MB' % (peak/1024**2))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,56 @@
+'''
+FSI sub-iterations per time step of DynamicCoupled on the coupled_configuration
+test case, for every order of the predictor of the first sub-iteration.
+
+    python dev/benchmark_fsi_predictor.py [n_time_steps]
+'''
+import sys
+
+import numpy as np
+
+import sharpy.utils.input_arg as input_arg
+import sharpy.utils.solver_interface as solver_interface
+from sharpy.presharpy.presharpy import PreSharpy
+from sharpy.utils.cout_utils import start_writer, finish_writer
+import sharpy.solvers
+import sharpy.postproc
+import sharpy.generators
+
+import tests.coupled.dynamic.coupled_configuration.generate_coupled_configuration as case
+
+
+def run(predictor_order, n_time_steps):
+    settings = input_arg.read_settings(['', case.route + case.case_name + '.solver.txt'])
+    settings['DynamicCoupled']['postprocessors'] = []
+    settings['DynamicCoupled']['postprocessors_settings'] = dict()
+    settings['DynamicCoupled']['print_info'] = 'off'
+    settings['DynamicCoupled']['n_time_steps'] = n_time_steps
+    settings['DynamicCoupled']['predictor_order'] = predictor_order
+    data = PreSharpy(settings)
+    for solver_name in ['BeamLoader', 'AerogridLoader', 'StaticCoupled', 'DynamicCoupled']:
+        solver = solver_interface.initialise_solver(solver_name)
+        solver.initialise(data)
+        data = solver.run()
+    return solver.fsi_iterations
+
+
+def main(n_time_steps=30):
+    start_writer()
+    iterations = dict()
+    for order in range(3):
+        iterations[order] = run(order, n_time_steps)
+    finish_writer()
+
+    print('time steps: %u' % n_time_steps)
+    for order in range(3):
+        print('predictor_order = %u: %.2f sub-iterations per step (%.1f%% fewer than without predictor)' %
+              (order,
+               np.mean(iterations[order]),
+               100.*(1. - np.mean(iterations[order])/np.mean(iterations[0]))))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,106 @@
+'''
+Write and read times of the time step histories of a 5000 step case, in the
+group per time step layout of SaveData and in the columnar layout, with and
+without compression filters.
+
+The aerodynamic grid has two surfaces of 8x20 panels and a wake of 20 panels,
+the beam 41 nodes. The same few time steps are repeated along the history to
+keep the memory low, which makes the compression ratios optimistic.
+
+    python dev/benchmark_savedata.py [n_steps]
+'''
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import h5py
+import numpy as np
+
+from sharpy.utils.datastructures import AeroTimeStepInfo, StructTimeStepInfo
+import sharpy.utils.h5utils as h5utils
+import sharpy.postproc.savedata as savedata
+
+
+def new_steps(n_distinct=5):
+    dimensions = np.array([[8, 20], [8, 20]])
+    dimensions_star = np.array([[20, 20], [20, 20]])
+    aero = []
+    struct = []
+    for i_step in range(n_distinct):
+        aero.append(AeroTimeStepInfo(dimensions, dimensions_star))
+        for field in ('zeta', 'zeta_star', 'forces', 'gamma', 'gamma_star', 'u_ext'):
+            for array in getattr(aero[-1], field):
+                array[:] = np.random.rand(*array.shape)
+        struct.append(StructTimeStepInfo(41, 20))
+        struct[-1].pos[:] = np.random.rand(41, 3)
+        struct[-1].psi[:] = np.random.rand(20, 3, 3)
+    return aero, struct
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def write_groups(filename, aero, struct):
+    with h5py.File(filename, 'w') as hdfile:
+        classes = (AeroTimeStepInfo, StructTimeStepInfo)
+        savedata.add_as_grp(aero, hdfile, grpname='aero', ClassesToSave=classes)
+        savedata.add_as_grp(struct, hdfile, grpname='structure', ClassesToSave=classes)
+
+
+def write_columnar(filename, aero, struct, **filters):
+    n_steps = len(aero)
+    block = 50
+    with h5py.File(filename, 'w') as hdfile:
+        for name, history in (('aero', aero), ('structure', struct)):
+            appender = h5utils.TimeStepAppender(hdfile.create_group(name),
+                                                chunk_steps=block,
+                                                skip_attr=savedata.SkipAttr,
+                                                **filters)
+            for ts in range(0, n_steps, block):
+                ts_list = list(range(ts, min(ts + block, n_steps)))
+                appender.append_steps(ts_list, [history[it] for it in ts_list])
+
+
+def main(n_steps=5000):
+    np.random.seed(0)
+    aero_steps, struct_steps = new_steps()
+    aero = [aero_steps[ts % len(aero_steps)] for ts in range(n_steps)]
+    struct = [struct_steps[ts % len(struct_steps)] for ts in range(n_steps)]
+
+    folder = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(folder, 'groups.h5')
+        t_write, _ = timed(lambda: write_groups(filename, aero, struct))
+        t_read, groups = timed(lambda: h5utils.readh5(filename))
+        error = np.max(np.abs(groups.aero[n_steps//2].gamma[1] - aero[n_steps//2].gamma[1]))
+        print('groups per time step: write %.2f s, read %.2f s, %.1f MB (max difference %.1e)' %
+              (t_write, t_read, os.path.getsize(filename)/2**20, error))
+
+        for label, filters in (('columnar', {}),
+                               ('columnar, lzf', {'compression': 'lzf', 'shuffle': True}),
+                               ('columnar, gzip 4', {'compression': 'gzip', 'shuffle': True})):
+            filename = os.path.join(folder, 'columnar.h5')
+            t_write, _ = timed(lambda: write_columnar(filename, aero, struct, **filters))
+            t_field, (_, gamma) = timed(lambda: h5utils.read_time_series(filename, 'aero', 'gamma'))
+            t_window, (_, zeta) = timed(lambda: h5utils.read_time_series(filename, 'aero', 'zeta',
+                                                                         start=n_steps//2,
+                                                                         stop=n_steps//2 + 100,
+                                                                         i_surf=0))
+            error = np.max(np.abs(gamma[1][n_steps//2] - aero[n_steps//2].gamma[1]))
+            print('%s: write %.2f s, read gamma %.3f s, read 100 steps of zeta %.4f s, %.1f MB '
+                  '(max difference %.1e)' %
+                  (label, t_write, t_field, t_window, os.path.getsize(filename)/2**20, error))
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,86 @@
+'''
+Benchmark of the GustVelocityField and SteadyVelocityField generators on the
+hale case grid (bound surfaces and wake), against the previous point by point
+loop.
+
+    python dev/benchmark_velocity_generators.py [n_calls]
+'''
+import sys
+import timeit
+
+import numpy as np
+
+import sharpy.utils.input_arg as input_arg
+import sharpy.utils.solver_interface as solver_interface
+import sharpy.utils.generator_interface as generator_interface
+from sharpy.presharpy.presharpy import PreSharpy
+from sharpy.utils.cout_utils import start_writer, finish_writer
+import sharpy.solvers
+import sharpy.postproc
+import sharpy.generators
+from sharpy.generators.gustvelocityfield import one_minus_cos
+
+import tests.coupled.dynamic.hale.generate_hale as hale
+
+
+def loop_gust(zeta, uext, u_inf, u_inf_direction, t, offset, gust_length, gust_intensity):
+    for i_surf in range(len(zeta)):
+        uext[i_surf].fill(0.0)
+        for i in range(zeta[i_surf].shape[1]):
+            for j in range(zeta[i_surf].shape[2]):
+                uext[i_surf][:, i, j] += u_inf*u_inf_direction
+                uext[i_surf][:, i, j] += one_minus_cos(zeta[i_surf][0, i, j] - u_inf*t + offset,
+                                                       zeta[i_surf][1, i, j],
+                                                       zeta[i_surf][2, i, j],
+                                                       gust_length,
+                                                       gust_intensity)
+
+
+def main(n_calls=10):
+    start_writer()
+    settings = input_arg.read_settings(['', hale.route + hale.case_name + '.solver.txt'])
+    data = PreSharpy(settings)
+    for solver_name in ['BeamLoader', 'AerogridLoader']:
+        solver = solver_interface.initialise_solver(solver_name)
+        solver.initialise(data)
+        data = solver.run()
+    finish_writer()
+
+    tstep = data.aero.timestep_info[-1]
+    u_inf = 25.
+    u_inf_direction = np.array([1., 0., 0.])
+    gust_settings = {'u_inf': u_inf,
+                     'u_inf_direction': u_inf_direction,
+                     'gust_shape': '1-cos',
+                     'gust_length': 5.,
+                     'gust_intensity': 0.1*u_inf,
+                     'offset': 2.}
+    gust = generator_interface.generator_from_string('GustVelocityField')()
+    gust.initialise(gust_settings)
+    steady = generator_interface.generator_from_string('SteadyVelocityField')()
+    steady.initialise({'u_inf': u_inf, 'u_inf_direction': u_inf_direction})
+
+    for name, zeta, uext in (('bound', tstep.zeta, tstep.u_ext),
+                             ('wake', tstep.zeta_star, tstep.u_ext_star)):
+        params = {'zeta': zeta, 'override': True, 'ts': 1, 'dt': 0.01, 't': 0.01}
+        reference = [np.zeros_like(u) for u in uext]
+
+        t_loop = timeit.timeit(lambda: loop_gust(zeta, reference, u_inf, u_inf_direction, 0.01, 2., 5., 0.1*u_inf),
+                               number=n_calls)/n_calls
+        t_gust = timeit.timeit(lambda: gust.generate(params, uext), number=n_calls)/n_calls
+        t_steady = timeit.timeit(lambda: steady.generate(params, uext), number=n_calls)/n_calls
+        gust.generate(params, uext)
+        error = max([np.max(np.abs(u - r)) for u, r in zip(uext, reference)])
+
+        print('%s: %u points' % (name, sum([z[0, :, :].size for z in zeta])))
+        print('  loop gust:         %.3f ms' % (t_loop*1e3))
+        print('  GustVelocityField:   %.3f ms (%.0fx)' % (t_gust*1e3, t_loop/t_gust))
+        print('  SteadyVelocityField: %.3f ms' % (t_steady*1e3))
+        print('  max difference:    %.2e' % error)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
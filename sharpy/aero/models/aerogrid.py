@@ -12,9 +12,10 @@ import ctypes as ct
 import numpy as np
 import scipy.interpolate
 
+import sharpy.aero.utils.mapping as mapping
 import sharpy.utils.algebra as algebra
 import sharpy.utils.cout_utils as cout
-from sharpy.utils.datastructures import AeroTimeStepInfo
+from sharpy.utils.datastructures import AeroTimeStepInfo, TimeStepHistory
 
 
 class Aerogrid(object):
@@ -23,7 +24,7 @@ class Aerogrid(object):
         self.beam = None
         self.aero_settings = None
 
-        self.timestep_info = []
+        self.timestep_info = TimeStepHistory()
         self.ini_info = None
 
         self.surface_distribution = None
@@ -33,6 +34,11 @@ class Aerogrid(object):
         self.airfoil_db = dict()
         self.struct2aero_mapping = None
         self.aero2struct_mapping = []
+        # operator mapping the aerodynamic forces to the structural nodes, built in generate_mapping
+        self.force_mapping = None
+        self.strip_cache = None
+        self.strip_cache_deflection = None
+        self.undeformed_strip_db = dict()
 
         self.n_node = 0
         self.n_elem = 0
@@ -84,6 +90,7 @@ class Aerogrid(object):
                                                    assume_sorted=True))
         self.add_timestep()
         self.generate_mapping()
+        self.generate_strip_cache(self.beam)
         self.generate_zeta(self.beam, self.aero_settings, ts)
 
     def output_info(self):
@@ -136,11 +143,69 @@ class Aerogrid(object):
 
     def add_timestep(self):
         try:
-            self.timestep_info.append(self.timestep_info[-1].copy())
+            self.timestep_info.append_copy(self.timestep_info[-1])
         except IndexError:
             self.timestep_info.append(self.ini_info.copy())
 
     def generate_zeta_timestep_info(self, structure_tstep, aero_tstep, beam, aero_settings):
+        if not self.strip_cache_is_valid():
+            self.generate_strip_cache(beam)
+
+        cga = structure_tstep.cga()
+        for i_surf in range(self.n_surf):
+            cache = self.strip_cache[i_surf]
+            (aero_tstep.zeta[i_surf][:, :, cache['i_n']],
+             aero_tstep.zeta_dot[i_surf][:, :, cache['i_n']]) = (
+                generate_strips(cache['undeformed'],
+                                structure_tstep.pos[cache['i_node'], :],
+                                structure_tstep.pos_dot[cache['i_node'], :],
+                                structure_tstep.psi[cache['master_elem'], cache['master_elem_node'], :],
+                                structure_tstep.psi_dot[cache['master_elem'], cache['master_elem_node'], :],
+                                cga,
+                                orientation_in=aero_settings['freestream_dir'],
+                                calculate_zeta_dot=True))
+
+    def set_control_surface_deflection(self, i_control_surface, deflection):
+        """
+        Sets the deflection of a control surface and invalidates the strip geometry that depends on it.
+        """
+        self.aero_dict['control_surface_deflection'][i_control_surface] = deflection
+        self.invalidate_strip_cache()
+
+    def invalidate_strip_cache(self):
+        """
+        Forces the strip geometry to be updated the next time the grid is generated. It has to be called after
+        modifying the ``aero_dict`` entries that define the undeformed strips (e.g. control surface deflections).
+
+        Undeformed strips without control surfaces are kept in ``undeformed_strip_db`` and reused.
+        """
+        self.strip_cache = None
+        for key in list(self.undeformed_strip_db.keys()):
+            if key[-1] is not None:
+                del self.undeformed_strip_db[key]
+
+    def strip_cache_is_valid(self):
+        """
+        Checks that the undeformed strips in ``strip_cache`` correspond to the current control surface deflections.
+        """
+        if self.strip_cache is None:
+            return False
+        try:
+            deflection = self.aero_dict['control_surface_deflection']
+        except KeyError:
+            return True
+        return np.array_equal(deflection, self.strip_cache_deflection)
+
+    def generate_strip_cache(self, beam):
+        """
+        Generates ``strip_cache``, a list with a dictionary per surface containing the global node (``i_node``),
+        master element and node (``master_elem``, ``master_elem_node``) and spanwise index (``i_n``) of every strip,
+        and the ``undeformed`` strip geometry ``(n_strips, 3, M + 1)`` including airfoil, chord, control surface,
+        twist and sweep. Only the beam deformation is applied to them when the grid is generated.
+
+        The undeformed strips are taken from ``undeformed_strip_db`` when a strip with the same airfoil, M,
+        M_distribution, chord, elastic axis, twist, sweep and control surface state has already been generated.
+        """
         global_node_in_surface = []
         for i_surf in range(self.n_surf):
             global_node_in_surface.append([])
@@ -158,6 +223,14 @@ class Aerogrid(object):
         except KeyError:
             self.aero_dict['sweep'] = np.zeros_like(self.aero_dict['twist'])
 
+        strips = []
+        for i_surf in range(self.n_surf):
+            strips.append({'i_node': [],
+                           'master_elem': [],
+                           'master_elem_node': [],
+                           'i_n': [],
+                           'undeformed': []})
+
         # one surface per element
         for i_elem in range(self.n_elem):
             i_surf = self.aero_dict['surface_distribution'][i_elem]
@@ -217,11 +290,7 @@ class Aerogrid(object):
                             raise NotImplementedError(str(self.aero_dict['control_surface_type'][i_control_surface]) +
                                 ' control surfaces are not yet implemented')
 
-
-
                 node_info = dict()
-                node_info['i_node'] = i_global_node
-                node_info['i_local_node'] = i_local_node
                 node_info['chord'] = self.aero_dict['chord'][i_elem, i_local_node]
                 node_info['eaxis'] = self.aero_dict['elastic_axis'][i_elem, i_local_node]
                 node_info['twist'] = self.aero_dict['twist'][i_elem, i_local_node]
@@ -230,21 +299,52 @@ class Aerogrid(object):
                 node_info['M_distribution'] = self.aero_dict['m_distribution'].decode('ascii')
                 node_info['airfoil'] = self.aero_dict['airfoil_distribution'][i_elem, i_local_node]
                 node_info['control_surface'] = control_surface_info
-                node_info['beam_coord'] = structure_tstep.pos[i_global_node, :]
-                node_info['pos_dot'] = structure_tstep.pos_dot[i_global_node, :]
-                node_info['beam_psi'] = structure_tstep.psi[master_elem, master_elem_node, :]
-                node_info['psi_dot'] = structure_tstep.psi_dot[master_elem, master_elem_node, :]
-                node_info['for_delta'] = beam.frame_of_reference_delta[master_elem, master_elem_node, :]
-                node_info['elem'] = beam.elements[master_elem]
-                node_info['for_pos'] = structure_tstep.for_pos
-                node_info['cga'] = structure_tstep.cga()
-                (aero_tstep.zeta[i_surf][:, :, i_n],
-                 aero_tstep.zeta_dot[i_surf][:, :, i_n]) = (
-                    generate_strip(node_info,
-                                   self.airfoil_db,
-                                   aero_settings['aligned_grid'],
-                                   orientation_in=aero_settings['freestream_dir'],
-                                   calculate_zeta_dot=True))
+
+                strips[i_surf]['i_node'].append(i_global_node)
+                strips[i_surf]['master_elem'].append(master_elem)
+                strips[i_surf]['master_elem_node'].append(master_elem_node)
+                strips[i_surf]['i_n'].append(i_n)
+                strips[i_surf]['undeformed'].append(self.get_undeformed_strip(node_info))
+
+        for i_surf in range(self.n_surf):
+            for k in ['i_node', 'master_elem', 'master_elem_node', 'i_n']:
+                strips[i_surf][k] = np.array(strips[i_surf][k], dtype=int)
+            strips[i_surf]['undeformed'] = np.array(strips[i_surf]['undeformed'], dtype=ct.c_double)
+
+        self.strip_cache = strips
+        try:
+            self.strip_cache_deflection = np.array(self.aero_dict['control_surface_deflection'], copy=True)
+        except KeyError:
+            self.strip_cache_deflection = None
+
+    def get_undeformed_strip(self, node_info):
+        """
+        Returns the undeformed strip (see ``generate_undeformed_strip``) for ``node_info``, generating it only if
+        it is not in ``undeformed_strip_db``.
+        """
+        control_surface_key = None
+        if node_info['control_surface'] is not None:
+            hinge_coords = node_info['control_surface']['hinge_coords']
+            if hinge_coords is not None:
+                hinge_coords = tuple(np.array(hinge_coords, dtype=float).ravel())
+            control_surface_key = (node_info['control_surface']['type'],
+                                   float(node_info['control_surface']['deflection']),
+                                   int(node_info['control_surface']['chord']),
+                                   hinge_coords)
+        key = (node_info['airfoil'],
+               int(node_info['M']),
+               node_info['M_distribution'],
+               float(node_info['chord']),
+               float(node_info['eaxis']),
+               float(node_info['twist']),
+               float(node_info['sweep']),
+               control_surface_key)
+        try:
+            return self.undeformed_strip_db[key]
+        except KeyError:
+            strip = generate_undeformed_strip(node_info, self.airfoil_db)
+            self.undeformed_strip_db[key] = strip
+            return strip
 
     def generate_zeta(self, beam, aero_settings, ts=-1, beam_ts=-1):
         self.generate_zeta_timestep_info(beam.timestep_info[beam_ts],
@@ -302,12 +402,14 @@ class Aerogrid(object):
                         continue
                     self.aero2struct_mapping[i_surf][i_n] = i_global_node
 
+        self.force_mapping = mapping.Aero2StructForceMapping(self.struct2aero_mapping, self.n_surf)
+
     def update_orientation(self, quat, ts=-1):
         rot = algebra.quat2rot(quat)
         self.timestep_info[ts].update_orientation(rot)
 
     @staticmethod
-    def compute_gamma_dot(dt, tstep, previous_tsteps):
+    def compute_gamma_dot(dt, tstep, previous_tsteps, previous_dt=None):
         """
         Computes the temporal derivative of gamma using finite differences.
         It will use a first order approximation for the first evaluation
@@ -315,6 +417,7 @@ class Aerogrid(object):
         :param dt: delta time for the finite differences
         :param tstep: tstep at time n (current)
         :param previous_tsteps: previous tstep structure in order: [n-..., n-2, n-1]
+        :param previous_dt: delta time between n-2 and n-1, if different from dt
         :return:
         """
 
@@ -325,7 +428,7 @@ class Aerogrid(object):
             # first order
             # f'(n) = (f(n) - f(n - 1))/dx
             for i_surf in range(tstep.n_surf):
-                tstep.gamma_dot[i_surf] = (tstep.gamma[i_surf] - previous_tsteps[-1].gamma[i_surf])/dt
+                tstep.gamma_dot[i_surf][:] = (tstep.gamma[i_surf] - previous_tsteps[-1].gamma[i_surf])/dt
         else:
             # second order
             for i_surf in range(tstep.n_surf):
@@ -334,24 +437,64 @@ class Aerogrid(object):
                         (not np.isfinite(previous_tsteps[-2].gamma[i_surf]).any()):
                     raise ArithmeticError('NaN found in gamma')
 
-                tstep.gamma_dot[i_surf] = (3.0*tstep.gamma[i_surf]
-                                           - 4.0*previous_tsteps[-1].gamma[i_surf]
-                                           + previous_tsteps[-2].gamma[i_surf])/(2.0*dt)
+                if previous_dt is None or previous_dt == dt:
+                    tstep.gamma_dot[i_surf][:] = (3.0*tstep.gamma[i_surf]
+                                                  - 4.0*previous_tsteps[-1].gamma[i_surf]
+                                                  + previous_tsteps[-2].gamma[i_surf])/(2.0*dt)
+                else:
+                    # non uniform steps
+                    tstep.gamma_dot[i_surf][:] = (
+                        (2.0*dt + previous_dt)/(dt*(dt + previous_dt))*tstep.gamma[i_surf]
+                        - (dt + previous_dt)/(dt*previous_dt)*previous_tsteps[-1].gamma[i_surf]
+                        + dt/(previous_dt*(dt + previous_dt))*previous_tsteps[-2].gamma[i_surf])
         # for i_surf in range(tstep.n_surf):
         #     tstep.gamma_dot[i_surf] = (tstep.gamma[i_surf] - previous_tsteps[-1].gamma[i_surf])/dt
 
 
-def generate_strip(node_info, airfoil_db, aligned_grid, orientation_in=np.array([1, 0, 0]), calculate_zeta_dot = False):
+def rediscretise_wake(tstep, ratio):
     """
-    Returns a strip in "a" frame of reference, it has to be then rotated to
-    simulate angles of attack, etc
-    :param node_info:
-    :param airfoil_db:
-    :param aligned_grid:
-    :param orientation_in:
-    :return:
+    Resamples the wake panels of ``tstep`` after a change of the time step by a factor ``ratio``.
+
+    Every streamwise row of wake vertices was shed a whole number of time steps ago, so the
+    panel length follows the time step. The new rows are interpolated at the age they would have with the
+    new time step: row ``i`` at the position of the old row ``i*ratio``. The positions beyond the last row
+    are linearly extrapolated and the circulation is kept constant there.
+
+    :param tstep: AeroTimeStepInfo, modified in place
+    :param ratio: new time step/old time step
+    """
+    for i_surf in range(tstep.n_surf):
+        zeta_star = tstep.zeta_star[i_surf]
+        gamma_star = tstep.gamma_star[i_surf]
+        m_star = gamma_star.shape[0]
+        if m_star == 0:
+            continue
+
+        # vertices
+        old_row = np.arange(m_star + 1)*ratio
+        i_row = np.minimum(np.floor(old_row).astype(int), m_star - 1)
+        weight = (old_row - i_row).reshape(1, -1, 1)
+        zeta_star[:] = (1.0 - weight)*zeta_star[:, i_row, :] + weight*zeta_star[:, i_row + 1, :]
+
+        # panels, at the age of their centre
+        if m_star == 1:
+            continue
+        old_row = np.clip((np.arange(m_star) + 0.5)*ratio - 0.5, 0., m_star - 1)
+        i_row = np.minimum(np.floor(old_row).astype(int), m_star - 2)
+        weight = (old_row - i_row).reshape(-1, 1)
+        gamma_star[:] = (1.0 - weight)*gamma_star[i_row, :] + weight*gamma_star[i_row + 1, :]
+
+
+def generate_undeformed_strip(node_info, airfoil_db):
+    """
+    Returns the strip coordinates in the "b" frame of reference before the beam
+    deformation is applied: airfoil camber, elastic axis, control surface deflection,
+    chord, twist and sweep.
+
+    :param node_info: dictionary with chord, eaxis, twist, sweep, M, M_distribution, airfoil and control_surface
+    :param airfoil_db: airfoil camber lines
+    :return: (3, M + 1) coordinates
     """
-    strip_coordinates_a_frame = np.zeros((3, node_info['M'] + 1), dtype=ct.c_double)
     strip_coordinates_b_frame = np.zeros((3, node_info['M'] + 1), dtype=ct.c_double)
 
     # airfoil coordinates
@@ -369,14 +512,11 @@ def generate_strip(node_info, airfoil_db, aligned_grid, orientation_in=np.array(
                                             strip_coordinates_b_frame[1, :])
 
     # elastic axis correction
-    for i_M in range(node_info['M'] + 1):
-        strip_coordinates_b_frame[1, i_M] -= node_info['eaxis']
-
-    chord_line_b_frame = strip_coordinates_b_frame[:, -1] - strip_coordinates_b_frame[:, 0]
+    strip_coordinates_b_frame[1, :] -= node_info['eaxis']
 
     # control surface deflection
     if node_info['control_surface'] is not None:
-        b_frame_hinge_coords = strip_coordinates_b_frame[:, node_info['M'] - node_info['control_surface']['chord']]
+        b_frame_hinge_coords = strip_coordinates_b_frame[:, node_info['M'] - node_info['control_surface']['chord']].copy()
         # support for different hinge location for fully articulated control surfaces
         if node_info['control_surface']['hinge_coords'] is not None:
             # make sure the hinge coordinates are only applied when M == cs_chord
@@ -384,18 +524,14 @@ def generate_strip(node_info, airfoil_db, aligned_grid, orientation_in=np.array(
                 cout.cout_wrap('The hinge coordinates parameter is only supported when M == cs_chord')
                 node_info['control_surface']['hinge_coords'] = None
             else:
-                b_frame_hinge_coords =  node_info['control_surface']['hinge_coords']
+                b_frame_hinge_coords = np.array(node_info['control_surface']['hinge_coords'], dtype=ct.c_double)
 
-        for i_M in range(node_info['M'] - node_info['control_surface']['chord'], node_info['M'] + 1):
-            relative_coords = strip_coordinates_b_frame[:, i_M] - b_frame_hinge_coords
-            # rotate the control surface
-            relative_coords = np.dot(algebra.rotation3d_x(-node_info['control_surface']['deflection']),
-                                     relative_coords)
-            # restore coordinates
-            relative_coords += b_frame_hinge_coords
-
-            # substitute with new coordinates
-            strip_coordinates_b_frame[:, i_M] = relative_coords
+        i_hinge = node_info['M'] - node_info['control_surface']['chord']
+        relative_coords = strip_coordinates_b_frame[:, i_hinge:] - b_frame_hinge_coords[:, None]
+        # rotate the control surface and restore coordinates
+        strip_coordinates_b_frame[:, i_hinge:] = (
+            np.dot(algebra.rotation3d_x(-node_info['control_surface']['deflection']), relative_coords) +
+            b_frame_hinge_coords[:, None])
 
     # chord scaling
     strip_coordinates_b_frame *= node_info['chord']
@@ -406,48 +542,85 @@ def generate_strip(node_info, airfoil_db, aligned_grid, orientation_in=np.array(
     else:
         Ctwist = np.eye(3)
 
-    # Cab transformation
-    Cab = algebra.crv2rot(node_info['beam_psi'])
-
-    rot_angle = algebra.angle_between_vectors_sign(orientation_in, Cab[:, 1], Cab[:, 2])
-    Crot = algebra.rotation3d_z(-rot_angle)
-
     c_sweep = np.eye(3)
     if np.abs(node_info['sweep']) > 1e-6:
         c_sweep = algebra.rotation3d_z(node_info['sweep'])
 
-    # transformation from beam to beam prime (with sweep and twist)
-    for i_M in range(node_info['M'] + 1):
-        strip_coordinates_b_frame[:, i_M] = np.dot(c_sweep, np.dot(Crot,
-                                                   np.dot(Ctwist, strip_coordinates_b_frame[:, i_M])))
-        strip_coordinates_a_frame[:, i_M] = np.dot(Cab, strip_coordinates_b_frame[:, i_M])
+    return np.dot(c_sweep, np.dot(Ctwist, strip_coordinates_b_frame))
+
+
+def generate_strips(undeformed, pos, pos_dot, psi, psi_dot, cga,
+                    orientation_in=np.array([1, 0, 0]), calculate_zeta_dot=False):
+    """
+    Applies the beam deformation to a set of undeformed strips (see ``generate_undeformed_strip``) and
+    returns their coordinates and velocities in the "g" frame of reference.
+
+    :param undeformed: (n_strips, 3, M + 1) undeformed strips in the "b" frame
+    :param pos: (n_strips, 3) coordinates of the nodes
+    :param pos_dot: (n_strips, 3) velocities of the nodes
+    :param psi: (n_strips, 3) CRVs of the nodes
+    :param psi_dot: (n_strips, 3) CRV time derivatives of the nodes
+    :param cga: rotation matrix from the "a" to the "g" frame
+    :param orientation_in: free stream direction, the strips are aligned with it
+    :param calculate_zeta_dot: if False, the returned velocities are 0
+    :return: zeta and zeta_dot, each (3, M + 1, n_strips)
+    """
+    # Cab transformation
+    Cab = algebra.crv2rot_vec(psi)
+
+    # rotation around z_b to align the strip with the flow
+    # (it commutes with the sweep rotation already applied to the undeformed strip)
+    cross = np.cross(orientation_in, Cab[:, :, 1])
+    rot_angle = np.arctan2(np.linalg.norm(cross, axis=1), np.dot(Cab[:, :, 1], orientation_in))
+    rot_angle[np.einsum('ni,ni->n', Cab[:, :, 2], cross) < 0] *= -1
+    c = np.cos(-rot_angle)
+    s = np.sin(-rot_angle)
+    Crot = np.zeros((len(rot_angle), 3, 3))
+    Crot[:, 0, 0] = c
+    Crot[:, 0, 1] = -s
+    Crot[:, 1, 0] = s
+    Crot[:, 1, 1] = c
+    Crot[:, 2, 2] = 1.0
+
+    # transformation from beam prime (with sweep and twist) to a
+    strip_coordinates_a_frame = np.einsum('nij,njk,nkm->nim', Cab, Crot, undeformed)
 
     # zeta_dot
+    zeta_dot_a_frame = np.zeros_like(strip_coordinates_a_frame)
     if calculate_zeta_dot:
-        zeta_dot_a_frame = np.zeros((3, node_info['M'] + 1), dtype=ct.c_double)
-
         # velocity due to pos_dot
-        for i_M in range(node_info['M'] + 1):
-            zeta_dot_a_frame[:, i_M] += node_info['pos_dot']
+        zeta_dot_a_frame += pos_dot[:, :, None]
 
         # velocity due to psi_dot
-        Omega_b = algebra.crv_dot2Omega(node_info['beam_psi'], node_info['psi_dot'])
-        for i_M in range(node_info['M'] + 1):
-            zeta_dot_a_frame[:, i_M] += (
-                np.dot(algebra.skew(Omega_b), strip_coordinates_a_frame[:, i_M]))
-
-    else:
-        zeta_dot_a_frame = np.zeros((3, node_info['M'] + 1), dtype=ct.c_double)
+        Omega_b = np.einsum('nij,nj->ni', algebra.crv2tan_vec(psi), psi_dot)
+        zeta_dot_a_frame += np.cross(Omega_b[:, :, None], strip_coordinates_a_frame, axis=1)
 
     # add node coords
-    for i_M in range(node_info['M'] + 1):
-        strip_coordinates_a_frame[:, i_M] += node_info['beam_coord']
+    strip_coordinates_a_frame += pos[:, :, None]
 
     # rotation from a to g
-    for i_M in range(node_info['M'] + 1):
-        strip_coordinates_a_frame[:, i_M] = np.dot(node_info['cga'],
-                                                   strip_coordinates_a_frame[:, i_M])
-        zeta_dot_a_frame[:, i_M] = np.dot(node_info['cga'],
-                                          zeta_dot_a_frame[:, i_M])
+    zeta = np.einsum('ij,njm->imn', cga, strip_coordinates_a_frame)
+    zeta_dot = np.einsum('ij,njm->imn', cga, zeta_dot_a_frame)
+    return zeta, zeta_dot
+
 
-    return strip_coordinates_a_frame, zeta_dot_a_frame
+def generate_strip(node_info, airfoil_db, aligned_grid, orientation_in=np.array([1, 0, 0]), calculate_zeta_dot = False):
+    """
+    Returns a strip in "a" frame of reference, it has to be then rotated to
+    simulate angles of attack, etc
+    :param node_info:
+    :param airfoil_db:
+    :param aligned_grid:
+    :param orientation_in:
+    :return:
+    """
+    undeformed = generate_undeformed_strip(node_info, airfoil_db)
+    zeta, zeta_dot = generate_strips(undeformed[None, :, :],
+                                     np.atleast_2d(node_info['beam_coord']),
+                                     np.atleast_2d(node_info['pos_dot']),
+                                     np.atleast_2d(node_info['beam_psi']),
+                                     np.atleast_2d(node_info['psi_dot']),
+                                     node_info['cga'],
+                                     orientation_in=orientation_in,
+                                     calculate_zeta_dot=calculate_zeta_dot)
+    return zeta[:, :, 0], zeta_dot[:, :, 0]
@@ -2,6 +2,87 @@ import numpy as np
 import sharpy.utils.algebra as algebra
 
 
+class Aero2StructForceMapping(object):
+    """
+    Operator transferring the aerodynamic forces at the grid vertices to the structural nodes.
+
+    The connectivity given by ``struct2aero_mapping`` (list, for every structural node, of dictionaries
+    ``{'i_surf', 'i_n'}``) is stored as index arrays per surface, so that the forces and moments of every
+    spanwise strip are added at once.
+
+    Args:
+        struct2aero_mapping (list): structural node to aerodynamic strip mapping, as in ``Aerogrid``
+        n_surf (int): number of aerodynamic surfaces. If ``None``, it is obtained from the mapping.
+    """
+    def __init__(self, struct2aero_mapping, n_surf=None):
+        self.n_node = len(struct2aero_mapping)
+        if n_surf is None:
+            n_surf = 1 + max([mapping['i_surf']
+                              for node_mapping in struct2aero_mapping
+                              for mapping in node_mapping], default=-1)
+        self.n_surf = n_surf
+
+        # structural node and spanwise index of every strip, per surface
+        nodes = [[] for _ in range(n_surf)]
+        strips = [[] for _ in range(n_surf)]
+        for i_global_node in range(self.n_node):
+            for mapping in struct2aero_mapping[i_global_node]:
+                nodes[mapping['i_surf']].append(i_global_node)
+                strips[mapping['i_surf']].append(mapping['i_n'])
+        self.surf_nodes = [np.array(nodes_surf, dtype=int) for nodes_surf in nodes]
+        self.surf_strips = [np.array(strips_surf, dtype=int) for strips_surf in strips]
+
+        # structural nodes with aerodynamic forces
+        self.mapped_nodes = np.unique(np.concatenate(self.surf_nodes + [np.zeros((0, ), dtype=int)]))
+
+    def __call__(self, aero_forces, zeta, pos_def, psi_def, master, cag=np.eye(3)):
+        """
+        Returns the forces and moments at the structural nodes, in the material (B) frame.
+
+        Args:
+            aero_forces (list(np.ndarray)): forces and moments ``[i_surf][6, m, n]`` at the grid vertices (G frame)
+            zeta (list(np.ndarray)): grid coordinates ``[i_surf][3, m, n]`` (G frame)
+            pos_def (np.ndarray): nodal coordinates (A frame)
+            psi_def (np.ndarray): element CRVs
+            master (np.ndarray): master element and local node of every node (``node_master_elem``)
+            cag (np.ndarray): rotation matrix from G to A
+
+        Returns:
+            np.ndarray: ``(n_node, 6)`` nodal forces and moments
+        """
+        n_node, _ = pos_def.shape
+        forces_g = np.zeros((n_node, 3))
+        moments_g = np.zeros((n_node, 3))
+
+        pos_g = np.dot(pos_def, cag)
+        for i_surf in range(self.n_surf):
+            nodes = self.surf_nodes[i_surf]
+            if not len(nodes):
+                continue
+            strips = self.surf_strips[i_surf]
+            strip_forces = aero_forces[i_surf][:, :, strips]
+            strip_zeta = zeta[i_surf][:, :, strips]
+
+            # sum along the chord
+            force = strip_forces[0:3, :, :].sum(axis=1)
+            moment = strip_forces[3:6, :, :].sum(axis=1)
+            # moment of the forces about the node:
+            # sum(cross(zeta - r, f)) = sum(cross(zeta, f)) - cross(r, sum(f))
+            moment += np.cross(strip_zeta, strip_forces[0:3, :, :], axis=0).sum(axis=1)
+            moment -= np.cross(pos_g[nodes, :].T, force, axis=0)
+
+            np.add.at(forces_g, nodes, force.T)
+            np.add.at(moments_g, nodes, moment.T)
+
+        # projection in the material frame: cbg = cab.T*cag
+        struct_forces = np.zeros((n_node, 6))
+        nodes = self.mapped_nodes
+        cab = algebra.crv2rot_vec(psi_def[master[nodes, 0], master[nodes, 1], :])
+        struct_forces[nodes, 0:3] = np.einsum('nji,jk,nk->ni', cab, cag, forces_g[nodes, :])
+        struct_forces[nodes, 3:6] = np.einsum('nji,jk,nk->ni', cab, cag, moments_g[nodes, :])
+        return struct_forces
+
+
 def aero2struct_force_mapping(aero_forces,
                               struct2aero_mapping,
                               zeta,
@@ -9,26 +90,18 @@ def aero2struct_force_mapping(aero_forces,
                               psi_def,
                               master,
                               master_elem,
-                              cag=np.eye(3)):
-
-    n_node, _ = pos_def.shape
-    struct_forces = np.zeros((n_node, 6))
-
-    for i_global_node in range(n_node):
-        for mapping in struct2aero_mapping[i_global_node]:
-            i_surf = mapping['i_surf']
-            i_n = mapping['i_n']
-            _, n_m, _ = aero_forces[i_surf].shape
+                              cag=np.eye(3),
+                              operator=None):
+    """
+    Maps the aerodynamic forces at the grid vertices to the structural nodes.
 
-            i_master_elem, master_elem_local_node = master[i_global_node, :]
+    ``operator`` is the ``Aero2StructForceMapping`` of ``struct2aero_mapping``, usually the one built by
+    ``Aerogrid.generate`` (``Aerogrid.force_mapping``). If ``None``, it is built for this call.
 
-            crv = psi_def[i_master_elem, master_elem_local_node, :]
-            cab = algebra.crv2rot(crv)
-            cbg = np.dot(cab.T, cag)
+    Returns:
+        np.ndarray: ``(n_node, 6)`` nodal forces and moments in the material (B) frame
+    """
+    if operator is None:
+        operator = Aero2StructForceMapping(struct2aero_mapping, len(aero_forces))
 
-            for i_m in range(n_m):
-                chi_g = zeta[i_surf][:, i_m, i_n] - np.dot(cag.T, pos_def[i_global_node, :])
-                struct_forces[i_global_node, 0:3] += np.dot(cbg, aero_forces[i_surf][0:3, i_m, i_n])
-                struct_forces[i_global_node, 3:6] += np.dot(cbg, aero_forces[i_surf][3:6, i_m, i_n])
-                struct_forces[i_global_node, 3:6] += np.dot(cbg, np.cross(chi_g, aero_forces[i_surf][0:3, i_m, i_n]))
-    return struct_forces
+    return operator(aero_forces, zeta, pos_def, psi_def, master, cag)
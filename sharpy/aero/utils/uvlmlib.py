@@ -147,7 +147,6 @@ def vlm_solver(ts_info, options):
             ts_info.ct_p_gamma,
             ts_info.ct_p_gamma_star,
             ts_info.ct_p_forces)
-    ts_info.remove_ctypes_pointers()
 
 
 def uvlm_init(ts_info, options):
@@ -192,7 +191,6 @@ def uvlm_init(ts_info, options):
               ts_info.ct_p_gamma_star,
               ts_info.ct_p_normals,
               ts_info.ct_p_forces)
-    ts_info.remove_ctypes_pointers()
 
 
 def uvlm_solver(i_iter, ts_info, struct_ts_info, options, convect_wake=True, dt=None):
@@ -245,7 +243,6 @@ def uvlm_solver(i_iter, ts_info, struct_ts_info, options, convect_wake=True, dt=
              ts_info.ct_p_normals,
              ts_info.ct_p_forces,
              ts_info.ct_p_dynamic_forces)
-    ts_info.remove_ctypes_pointers()
     # previous_ts_info.remove_ctypes_pointers()
 
 
@@ -297,7 +294,6 @@ def uvlm_calculate_unsteady_forces(ts_info,
                               ts_info.ct_p_gamma_dot,
                               ts_info.ct_p_normals,
                               ts_info.ct_p_dynamic_forces)
-    ts_info.remove_ctypes_pointers()
 
 
 def uvlm_calculate_incidence_angle(ts_info,
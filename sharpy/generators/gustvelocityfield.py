@@ -38,9 +38,7 @@ class GustVelocityField(generator_interface.BaseGenerator):
         self.u_inf = 0.
         self.u_inf_direction = None
 
-        self.implemented_gusts = []
-        self.implemented_gusts.append('1-cos')
-        self.implemented_gusts.append('DARPA')
+        self.implemented_gusts = list(gust_shapes.keys())
 
         self.settings = dict()
 
@@ -52,6 +50,8 @@ class GustVelocityField(generator_interface.BaseGenerator):
         # check that the gust type is valid
         if not (self.settings['gust_shape'] in self.implemented_gusts):
             raise AttributeError('The gust shape ' + self.settings['gust_shape'] + ' is not implemented')
+        if self.settings['gust_shape'] == 'DARPA' and not self.settings['span'].value > 0.:
+            raise AttributeError('The DARPA gust needs a positive span')
 
         self.u_inf = self.in_dict['u_inf'].value
         self.u_inf_direction = self.in_dict['u_inf_direction']
@@ -62,36 +62,49 @@ class GustVelocityField(generator_interface.BaseGenerator):
         ts = params['ts']
         dt = params['dt']
         t = params['t']
-        gust_shape = None
-        if self.settings['gust_shape'] == '1-cos':
-            def gust_shape(x, y, z, gust_length, gust_intensity, span=0):
-                vel = np.zeros((3,))
-                if (x > 0.0 or x < -gust_length):
-                    return vel
-
-                vel[2] = (1.0 - np.cos(2.0*np.pi*x/gust_length))*gust_intensity*0.5
-                return vel
-        elif self.settings['gust_shape'] == 'DARPA':
-            def gust_shape(x, y, z, gust_length, gust_intensity, span=0):
-                vel = np.zeros((3,))
-                if (x > 0.0 or x < -gust_length):
-                    return vel
-
-                vel[2] = (1.0 - np.cos(2.0*np.pi*x/gust_length))*gust_intensity*0.5
-                vel[2] *= -np.cos(y/span*np.pi)
-                return vel
+        gust_shape = gust_shapes[self.settings['gust_shape']]
 
+        u_inf = (self.u_inf*np.array(self.u_inf_direction))[:, None, None]
         for i_surf in range(len(zeta)):
             if override:
                 uext[i_surf].fill(0.0)
 
-            for i in range(zeta[i_surf].shape[1]):
-                for j in range(zeta[i_surf].shape[2]):
-                    uext[i_surf][:, i, j] += self.u_inf*self.u_inf_direction
-                    uext[i_surf][:, i, j] += gust_shape(zeta[i_surf][0, i, j] - self.u_inf*t + self.settings['offset'],
-                                                        zeta[i_surf][1, i, j],
-                                                        zeta[i_surf][2, i, j],
-                                                        self.settings['gust_length'].value,
-                                                        self.settings['gust_intensity'].value,
-                                                        self.settings['span'].value
-                                                        )
+            uext[i_surf] += u_inf
+            uext[i_surf] += gust_shape(zeta[i_surf][0, :, :] - self.u_inf*t + self.settings['offset'],
+                                       zeta[i_surf][1, :, :],
+                                       zeta[i_surf][2, :, :],
+                                       self.settings['gust_length'].value,
+                                       self.settings['gust_intensity'].value,
+                                       self.settings['span'].value)
+
+
+def one_minus_cos(x, y, z, gust_length, gust_intensity, span=0):
+    """
+    1-cos gust velocity at the points ``(x, y, z)``, where ``x`` is the distance to the start of the gust.
+
+    Returns:
+        np.ndarray: velocities, with shape ``(3, ) + x.shape``
+    """
+    vel = np.zeros((3, ) + np.shape(x))
+    inside = np.logical_and(x <= 0.0, x >= -gust_length)
+    vel[2, ...] = np.where(inside, (1.0 - np.cos(2.0*np.pi*x/gust_length))*gust_intensity*0.5, 0.0)
+    return vel
+
+
+def darpa(x, y, z, gust_length, gust_intensity, span=0):
+    """
+    1-cos gust modulated along the span, at the points ``(x, y, z)``, where ``x`` is the distance to the start
+    of the gust.
+
+    Returns:
+        np.ndarray: velocities, with shape ``(3, ) + x.shape``
+    """
+    vel = one_minus_cos(x, y, z, gust_length, gust_intensity, span)
+    # only the points inside the gust are modulated
+    inside = np.logical_and(x <= 0.0, x >= -gust_length)
+    vel[2, inside] *= -np.cos(np.asarray(y)[inside]/span*np.pi)
+    return vel
+
+
+gust_shapes = {'1-cos': one_minus_cos,
+               'DARPA': darpa}
@@ -25,6 +25,14 @@ class TurbSimVelocityField(generator_interface.BaseGenerator):
         self.settings_types['offset'] = 'list(float)'
         self.settings_default['offset'] = np.zeros((3,))
 
+        # only keep in memory the slab of the field covering the grid, instead of the whole field
+        self.settings_types['stream'] = 'bool'
+        self.settings_default['stream'] = False
+
+        # length in x added at both sides of the grid bounding box when loading a new slab
+        self.settings_types['stream_margin'] = 'float'
+        self.settings_default['stream_margin'] = 10.0
+
         self.settings = dict()
 
         self.h5file = None
@@ -34,9 +42,12 @@ class TurbSimVelocityField(generator_interface.BaseGenerator):
         self.turb_z_initial = None
         self.turb_u_ref = None
         self.turb_data = None
+        self.turb_dataset = None
+        # indices [start, end) in x of the slab in turb_data
+        self.window = None
 
         self.bbox = None
-        self.interpolator = 3*[None]
+        self.grid = None
 
     def initialise(self, in_dict):
         self.in_dict = in_dict
@@ -44,19 +55,25 @@ class TurbSimVelocityField(generator_interface.BaseGenerator):
         self.settings = self.in_dict
 
         # load the turbulent field
-        self.h5file = h5.File(self.settings['turbulent_field'])
+        self.h5file = h5.File(self.settings['turbulent_field'], 'r')
         # make time to increase from -t to 0 instead of 0 to t
-        self.turb_time = self.h5file['time'].value
+        self.turb_time = self.h5file['time'][()]
         self.turb_time = self.turb_time - np.max(self.turb_time)
-        self.turb_u_ref = self.h5file['u_inf'].value
+        self.turb_u_ref = self.h5file['u_inf'][()]
         # self.turb_x_initial = self.turb_u_ref*(self.turb_time[1] - self.turb_time[0]) - self.settings['offset'][0]
         self.turb_x_initial = self.turb_time*self.turb_u_ref + self.settings['offset'][0]
-        self.turb_y_initial = self.h5file['y_grid'].value + self.settings['offset'][1]
-        self.turb_z_initial = self.h5file['z_grid'].value + self.settings['offset'][2]
-
-        self.turb_data = self.h5file['data/velocity'].value
-
-        self.init_interpolator(self.turb_data, self.turb_x_initial, self.turb_y_initial, self.turb_z_initial)
+        self.turb_y_initial = self.h5file['y_grid'][()] + self.settings['offset'][1]
+        self.turb_z_initial = self.h5file['z_grid'][()] + self.settings['offset'][2]
+
+        self.turb_dataset = self.h5file['data/velocity']
+        if self.settings['stream']:
+            # the slabs are read from the file in generate
+            self.turb_data = None
+            self.window = None
+        else:
+            self.turb_data = self.turb_dataset[()]
+            self.window = (0, len(self.turb_x_initial))
+            self.init_interpolator(self.turb_data, self.turb_x_initial, self.turb_y_initial, self.turb_z_initial)
 
     def generate(self, params, uext):
         zeta = params['zeta']
@@ -71,7 +88,10 @@ class TurbSimVelocityField(generator_interface.BaseGenerator):
         #         not match the mean velocity in the turbulent field', 3)
 
         # get boundary box
-        # self.bbox = self.get_bbox(zeta)
+        self.bbox = self.get_bbox(zeta)
+        self.bbox += np.asarray(for_pos[0:3]).reshape(3, 1)
+        if self.settings['stream']:
+            self.update_window(self.bbox[0, 0], self.bbox[0, 1])
 
         # x_coordinates = self.turb_x_initial.copy()
         # y_coordinates = self.turb_y_initial.copy()
@@ -95,33 +115,132 @@ class TurbSimVelocityField(generator_interface.BaseGenerator):
         :return:
         """
         bbox = np.zeros((3, 2))
+        bbox[:, 0] = np.inf
+        bbox[:, 1] = -np.inf
         for i_surf in range(len(zeta)):
-            ndim, nn, nm = zeta[i_surf].shape
-            for idim in range(ndim):
-                bbox[idim, :] = (min(bbox[idim, 0], np.min(zeta[i_surf][idim, :, :])),
-                                 max(bbox[idim, 1], np.max(zeta[i_surf][idim, :, :])))
+            if not zeta[i_surf].size:
+                continue
+            coords = zeta[i_surf].reshape(3, -1)
+            bbox[:, 0] = np.minimum(bbox[:, 0], np.min(coords, axis=1))
+            bbox[:, 1] = np.maximum(bbox[:, 1], np.max(coords, axis=1))
         return bbox
 
+    def update_window(self, x_min, x_max):
+        """
+        Makes sure the slab of the field in memory covers ``[x_min, x_max]``.
+
+        If it does not, a new slab covering ``[x_min - stream_margin, x_max + stream_margin]`` is loaded. The part
+        of the new slab that was already in memory is copied, only the rest is read from the file.
+        """
+        if x_min > x_max:
+            return
+        x_grid = self.turb_x_initial
+        n_x = len(x_grid)
+        # cells containing the points
+        start = max(np.searchsorted(x_grid, x_min, side='right') - 1, 0)
+        end = min(np.searchsorted(x_grid, x_max, side='left') + 1, n_x)
+        if self.window is not None and self.window[0] <= start and end <= self.window[1]:
+            return
+
+        margin = self.settings['stream_margin'].value
+        start = max(np.searchsorted(x_grid, x_min - margin, side='right') - 1, 0)
+        end = min(np.searchsorted(x_grid, x_max + margin, side='left') + 1, n_x)
+        end = max(end, start + 1)
+
+        data = np.empty(self.turb_dataset.shape[0:3] + (end - start, ), dtype=self.turb_dataset.dtype)
+        old_start, old_end = (start, start) if self.window is None else self.window
+        overlap_start = max(start, old_start)
+        overlap_end = min(end, old_end)
+        if overlap_start < overlap_end:
+            data[..., overlap_start - start:overlap_end - start] = \
+                self.turb_data[..., overlap_start - old_start:overlap_end - old_start]
+            self.read_slab(data, start, start, overlap_start)
+            self.read_slab(data, start, overlap_end, end)
+        else:
+            self.read_slab(data, start, start, end)
+
+        self.window = (start, end)
+        self.init_interpolator(data, x_grid[start:end], self.turb_y_initial, self.turb_z_initial)
+
+    def read_slab(self, data, data_start, start, end):
+        if start < end:
+            data[..., start - data_start:end - data_start] = self.turb_dataset[..., start:end]
+
     def init_interpolator(self, data, x_grid, y_grid, z_grid):
-        for i_dim in range(3):
-            self.interpolator[i_dim] = interpolate.RegularGridInterpolator((z_grid, y_grid, x_grid),
-                                                                           data[i_dim, :, :, :],
-                                                                           bounds_error=False,
-                                                                           fill_value=0.0)
+        """
+        Stores the grid ``(z, y, x)`` and the velocity field ``data[i_dim, i_z, i_y, i_x]`` used by
+        ``interpolate_zeta``.
+        """
+        self.grid = (np.asarray(z_grid), np.asarray(y_grid), np.asarray(x_grid))
+        self.turb_data = data
 
     def interpolate_zeta(self, zeta, for_pos, u_ext):
-        for i_dim in range(3):
-            for isurf in range(len(zeta)):
-                _, n_m, n_n = zeta[isurf].shape
-                for i_m in range(n_m):
-                    for i_n in range(n_n):
-                        coord = zeta[isurf][:, i_m, i_n] + for_pos[0:3]
-                        coord = coord[::-1]
-                        try:
-                            u_ext[isurf][i_dim, i_m, i_n] = self.interpolator[i_dim](coord)
-                        except ValueError:
-                            print(coord)
-                            raise ValueError()
-                        # next = u_ext[isurf][i_dim, i_m, i_n]
+        """
+        Interpolates the velocity field at the grid vertices ``zeta`` displaced by ``for_pos``.
 
+        The coordinates of all the surfaces are interpolated at once, see ``trilinear_interpolation``.
+        """
+        n_points = [zeta[i_surf][0, :, :].size for i_surf in range(len(zeta))]
+        if not sum(n_points):
+            return
+        coords = np.concatenate([zeta[i_surf].reshape(3, -1) for i_surf in range(len(zeta))], axis=1)
+        coords += np.asarray(for_pos[0:3]).reshape(3, 1)
+
+        velocities = trilinear_interpolation(self.grid, self.turb_data, coords[::-1, :])
 
+        i_point = 0
+        for i_surf in range(len(zeta)):
+            u_ext[i_surf][:] = velocities[:, i_point:i_point + n_points[i_surf]].reshape(u_ext[i_surf].shape)
+            i_point += n_points[i_surf]
+
+
+def trilinear_interpolation(grid, data, points, fill_value=0.0):
+    """
+    Trilinear interpolation of several fields defined on the same regular grid.
+
+    The cell and the weights of every point are computed once and shared by all the fields, which is
+    equivalent to one ``scipy.interpolate.RegularGridInterpolator`` per field with ``bounds_error=False``.
+
+    Args:
+        grid (tuple(np.ndarray)): strictly ascending coordinates of the grid along each of the 3 axes
+        data (np.ndarray): fields ``[i_field, i_0, i_1, i_2]``
+        points (np.ndarray): coordinates ``[3, n_points]`` in the same order as ``grid``
+        fill_value (float): value of the points outside the grid
+
+    Returns:
+        np.ndarray: interpolated fields ``[i_field, n_points]``
+    """
+    n_points = points.shape[1]
+    inside = np.ones((n_points, ), dtype=bool)
+    indices = []
+    weights = []
+    for i_axis in range(3):
+        axis_grid = grid[i_axis]
+        coord = points[i_axis, :]
+        inside &= (coord >= axis_grid[0]) & (coord <= axis_grid[-1])
+        i_cell = np.searchsorted(axis_grid, coord, side='right') - 1
+        i_cell = np.clip(i_cell, 0, max(len(axis_grid) - 2, 0))
+        indices.append(i_cell)
+        if len(axis_grid) > 1:
+            weights.append((coord - axis_grid[i_cell])/(axis_grid[i_cell + 1] - axis_grid[i_cell]))
+        else:
+            weights.append(np.zeros((n_points, )))
+
+    values = np.full((data.shape[0], n_points), fill_value, dtype=float)
+    if not np.any(inside):
+        return values
+
+    i0, i1, i2 = [index[inside] for index in indices]
+    w0, w1, w2 = [weight[inside] for weight in weights]
+    # upper corner of the cell, the same as the lower one for axes with a single point
+    j0, j1, j2 = [np.minimum(index + 1, len(axis_grid) - 1)
+                  for index, axis_grid in zip((i0, i1, i2), grid)]
+
+    result = np.zeros((data.shape[0], len(i0)))
+    for c0, f0 in ((i0, 1. - w0), (j0, w0)):
+        for c1, f1 in ((i1, 1. - w1), (j1, w1)):
+            factor = f0*f1
+            for c2, f2 in ((i2, 1. - w2), (j2, w2)):
+                result += data[:, c0, c1, c2]*(factor*f2)
+    values[:, inside] = result
+    return values
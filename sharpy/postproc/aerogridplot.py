@@ -1,3 +1,4 @@
+import concurrent.futures
 import os
 
 import numpy as np
@@ -45,6 +46,9 @@ class AerogridPlot(BaseSolver):
         self.settings_types['dt'] = 'float'
         self.settings_default['dt'] = 0.
 
+        self.settings_types['num_cores'] = 'int'
+        self.settings_default['num_cores'] = 1
+
         self.settings = None
         self.data = None
 
@@ -52,6 +56,8 @@ class AerogridPlot(BaseSolver):
         self.body_filename = ''
         self.wake_filename = ''
         self.ts_max = 0
+        # quad connectivities of the grids, by dimensions
+        self.connectivities = dict()
 
     def initialise(self, data, custom_settings=None):
         self.data = data
@@ -78,9 +84,12 @@ class AerogridPlot(BaseSolver):
 
     def run(self, online=False):
         if not online:
-            for self.ts in range(self.ts_max):
-                self.plot_body()
-                self.plot_wake()
+            if self.settings['num_cores'].value > 1:
+                self.write_parallel()
+            else:
+                for self.ts in range(self.ts_max):
+                    self.plot_body()
+                    self.plot_wake()
             cout.cout_wrap('...Finished', 1)
         else:
             self.ts = len(self.data.structure.timestep_info) - 1
@@ -88,174 +97,173 @@ class AerogridPlot(BaseSolver):
             self.plot_wake()
         return self.data
 
+    def write_parallel(self):
+        """
+        Writes the grids of all the time steps with a pool of ``num_cores`` processes. The grids are assembled
+        in this process and written by the pool, with at most two grids per process waiting to be written.
+        """
+        n_cores = self.settings['num_cores'].value
+        with concurrent.futures.ProcessPoolExecutor(n_cores) as pool:
+            pending = set()
+            for self.ts in range(self.ts_max):
+                for grid in self.body_grids() + self.wake_grids():
+                    if len(pending) >= 2*n_cores:
+                        done, pending = concurrent.futures.wait(pending,
+                                                                return_when=concurrent.futures.FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                    pending.add(pool.submit(write_grid, **grid))
+            for future in concurrent.futures.as_completed(pending):
+                future.result()
+
+    def connectivity(self, m, n):
+        """
+        Returns the ``(m*n, 4)`` quad connectivity of a grid of ``m`` chordwise and ``n`` spanwise panels,
+        with the points and panels numbered chordwise first.
+        """
+        try:
+            return self.connectivities[(m, n)]
+        except KeyError:
+            pass
+        i_n, i_m = np.meshgrid(np.arange(n), np.arange(m), indexing='ij')
+        node = (i_n*(m + 1) + i_m).reshape(-1)
+        conn = np.column_stack((node, node + 1, node + m + 2, node + m + 1))
+        self.connectivities[(m, n)] = conn
+        return conn
+
+    def grid_coordinates(self, zeta):
+        """
+        Coordinates of the grid points of ``zeta`` ``(3, m + 1, n + 1)``, numbered chordwise first.
+        """
+        coords = np.transpose(zeta, (2, 1, 0)).astype(float, order='C').reshape((-1, 3))
+        if self.settings['include_rbm']:
+            coords += self.data.structure.timestep_info[self.ts].for_pos[0:3]
+        if self.settings['include_forward_motion']:
+            coords[:, 0] -= self.settings['dt'].value*self.ts*self.settings['u_inf'].value
+        return coords
+
     def plot_body(self):
-        for i_surf in range(self.data.aero.timestep_info[self.ts].n_surf):
+        for grid in self.body_grids():
+            write_grid(**grid)
+
+    def plot_wake(self):
+        for grid in self.wake_grids():
+            write_grid(**grid)
+
+    def body_grids(self):
+        """
+        Returns the arguments of :func:`write_grid` for every surface of the time step ``self.ts``.
+        """
+        tstep = self.data.aero.timestep_info[self.ts]
+        grids = []
+        for i_surf in range(tstep.n_surf):
             filename = (self.body_filename +
                         '_' +
                         '%02u_' % i_surf +
                         '%06u' % self.ts)
 
-            dims = self.data.aero.timestep_info[self.ts].dimensions[i_surf, :]
-            point_data_dim = (dims[0]+1)*(dims[1]+1)  # + (dims_star[0]+1)*(dims_star[1]+1)
-            panel_data_dim = (dims[0])*(dims[1])  # + (dims_star[0])*(dims_star[1])
-
-            coords = np.zeros((point_data_dim, 3))
-            conn = []
-            panel_id = np.zeros((panel_data_dim,), dtype=int)
-            panel_surf_id = np.zeros((panel_data_dim,), dtype=int)
-            panel_gamma = np.zeros((panel_data_dim,))
-            normal = np.zeros((panel_data_dim, 3))
-            point_struct_id = np.zeros((point_data_dim,), dtype=int)
-            point_cf = np.zeros((point_data_dim, 3))
-            point_unsteady_cf = np.zeros((point_data_dim, 3))
-            zeta_dot = np.zeros((point_data_dim, 3))
-            u_inf = np.zeros((point_data_dim, 3))
-            counter = -1
-
-            # coordinates of corners
-            for i_n in range(dims[1]+1):
-                for i_m in range(dims[0]+1):
-                    counter += 1
-                    coords[counter, :] = self.data.aero.timestep_info[self.ts].zeta[i_surf][:, i_m, i_n]
-                    if self.settings['include_rbm']:
-                        coords[counter, :] += self.data.structure.timestep_info[self.ts].for_pos[0:3]
-                    if self.settings['include_forward_motion']:
-                        coords[counter, 0] -= self.settings['dt'].value*self.ts*self.settings['u_inf'].value
-
-            with_incidence_angle = True
+            dims = tstep.dimensions[i_surf, :]
+            point_data_dim = (dims[0]+1)*(dims[1]+1)
+            panel_data_dim = (dims[0])*(dims[1])
+
+            coords = self.grid_coordinates(tstep.zeta[i_surf])
+
+            # point data, numbered chordwise first
+            def point_vectors(name):
+                try:
+                    return np.transpose(getattr(tstep, name)[i_surf][0:3, :, :], (2, 1, 0)).reshape((-1, 3))
+                except AttributeError:
+                    return np.zeros((point_data_dim, 3))
+            point_struct_id = np.repeat(np.array(self.data.aero.aero2struct_mapping[i_surf][0:dims[1] + 1],
+                                                 dtype=int),
+                                        dims[0] + 1)
+
+            # cell data
+            panel_id = np.arange(panel_data_dim)
+            panel_surf_id = np.full((panel_data_dim,), i_surf, dtype=int)
+            panel_gamma = tstep.gamma[i_surf].T.reshape(-1).copy()
+            normal = np.transpose(tstep.normals[i_surf], (2, 1, 0)).reshape((-1, 3))
+
+            cell_arrays = [('panel_surface_id', panel_surf_id),
+                           ('panel_gamma', panel_gamma)]
             try:
-                self.data.aero.timestep_info[self.ts].postproc_cell['incidence_angle']
+                incidence_angle = tstep.postproc_cell['incidence_angle'][i_surf]
             except KeyError:
-                with_incidence_angle = False
+                pass
             else:
-                incidence_angle = np.zeros_like(panel_gamma)
-
-            counter = -1
-            node_counter = -1
-            for i_n in range(dims[1] + 1):
-                global_counter = self.data.aero.aero2struct_mapping[i_surf][i_n]
-                for i_m in range(dims[0] + 1):
-                    node_counter += 1
-                    # point data
-                    point_struct_id[node_counter] = global_counter
-                    point_cf[node_counter, :] = self.data.aero.timestep_info[self.ts].forces[i_surf][0:3, i_m, i_n]
-                    try:
-                        point_unsteady_cf[node_counter, :] = self.data.aero.timestep_info[self.ts].dynamic_forces[i_surf][0:3, i_m, i_n]
-                    except AttributeError:
-                        pass
-                    try:
-                        zeta_dot[node_counter, :] = self.data.aero.timestep_info[self.ts].zeta_dot[i_surf][0:3, i_m, i_n]
-                    except AttributeError:
-                        pass
-                    try:
-                        u_inf[node_counter, :] = self.data.aero.timestep_info[self.ts].u_ext[i_surf][0:3, i_m, i_n]
-                    except AttributeError:
-                        pass
-                    if i_n < dims[1] and i_m < dims[0]:
-                        counter += 1
-                    else:
-                        continue
-
-                    conn.append([node_counter + 0,
-                                 node_counter + 1,
-                                 node_counter + dims[0]+2,
-                                 node_counter + dims[0]+1])
-                    # cell data
-                    normal[counter, :] = self.data.aero.timestep_info[self.ts].normals[i_surf][:, i_m, i_n]
-                    panel_id[counter] = counter
-                    panel_surf_id[counter] = i_surf
-                    panel_gamma[counter] = self.data.aero.timestep_info[self.ts].gamma[i_surf][i_m, i_n]
-
-                    if with_incidence_angle:
-                        incidence_angle[counter] = \
-                            self.data.aero.timestep_info[self.ts].postproc_cell['incidence_angle'][i_surf][i_m, i_n]
-
-
-            ug = tvtk.UnstructuredGrid(points=coords)
-            ug.set_cells(tvtk.Quad().cell_type, conn)
-            ug.cell_data.scalars = panel_id
-            ug.cell_data.scalars.name = 'panel_n_id'
-            ug.cell_data.add_array(panel_surf_id)
-            ug.cell_data.get_array(1).name = 'panel_surface_id'
-            ug.cell_data.add_array(panel_gamma)
-            ug.cell_data.get_array(2).name = 'panel_gamma'
-            if with_incidence_angle:
-                ug.cell_data.add_array(incidence_angle)
-                ug.cell_data.get_array(3).name = 'incidence_angle'
-            ug.cell_data.vectors = normal
-            ug.cell_data.vectors.name = 'panel_normal'
-            ug.point_data.scalars = np.arange(0, coords.shape[0])
-            ug.point_data.scalars.name = 'n_id'
-            ug.point_data.add_array(point_struct_id)
-            ug.point_data.get_array(1).name = 'point_struct_id'
-            ug.point_data.add_array(point_cf)
-            ug.point_data.get_array(2).name = 'point_steady_force'
-            ug.point_data.add_array(point_unsteady_cf)
-            ug.point_data.get_array(3).name = 'point_unsteady_force'
-            ug.point_data.add_array(zeta_dot)
-            ug.point_data.get_array(4).name = 'zeta_dot'
-            ug.point_data.add_array(u_inf)
-            ug.point_data.get_array(5).name = 'u_inf'
-            write_data(ug, filename)
-
-    def plot_wake(self):
-        for i_surf in range(self.data.aero.timestep_info[self.ts].n_surf):
+                cell_arrays.append(('incidence_angle', np.asarray(incidence_angle, dtype=float).T.reshape(-1).copy()))
+
+            grids.append({'filename': filename,
+                          'coords': coords,
+                          'conn': self.connectivity(dims[0], dims[1]),
+                          'cell_scalars': ('panel_n_id', panel_id),
+                          'cell_arrays': cell_arrays,
+                          'cell_vectors': ('panel_normal', normal),
+                          'point_arrays': [('point_struct_id', point_struct_id),
+                                           ('point_steady_force', point_vectors('forces')),
+                                           ('point_unsteady_force', point_vectors('dynamic_forces')),
+                                           ('zeta_dot', point_vectors('zeta_dot')),
+                                           ('u_inf', point_vectors('u_ext'))]})
+        return grids
+
+    def wake_grids(self):
+        """
+        Returns the arguments of :func:`write_grid` for the wake of every surface of the time step ``self.ts``.
+        """
+        tstep = self.data.aero.timestep_info[self.ts]
+        grids = []
+        for i_surf in range(tstep.n_surf):
             filename = (self.wake_filename +
                         '_' +
                         '%02u_' % i_surf +
                         '%06u' % self.ts)
 
-            dims_star = self.data.aero.timestep_info[self.ts].dimensions_star[i_surf, :]
+            dims_star = tstep.dimensions_star[i_surf, :].copy()
             dims_star[0] -= self.settings['minus_m_star']
 
-            point_data_dim = (dims_star[0]+1)*(dims_star[1]+1)
             panel_data_dim = (dims_star[0])*(dims_star[1])
 
-            coords = np.zeros((point_data_dim, 3))
-            conn = []
-            panel_id = np.zeros((panel_data_dim,), dtype=int)
-            panel_surf_id = np.zeros((panel_data_dim,), dtype=int)
-            panel_gamma = np.zeros((panel_data_dim,))
-            counter = -1
-            # rotation_mat = self.data.structure.timestep_info[self.ts].cga().T
-            # coordinates of corners
-            for i_n in range(dims_star[1]+1):
-                for i_m in range(dims_star[0]+1):
-                    counter += 1
-                    coords[counter, :] = self.data.aero.timestep_info[self.ts].zeta_star[i_surf][:, i_m, i_n]
-                    if self.settings['include_rbm']:
-                        coords[counter, :] += self.data.structure.timestep_info[self.ts].for_pos[0:3]
-                    if self.settings['include_forward_motion']:
-                        coords[counter, 0] -= self.settings['dt'].value*self.ts*self.settings['u_inf'].value
-
-            counter = -1
-            node_counter = -1
-            # wake
-            for i_n in range(dims_star[1]+1):
-                for i_m in range(dims_star[0]+1):
-                    node_counter += 1
-                    # cell data
-                    if i_n < dims_star[1] and i_m < dims_star[0]:
-                        counter += 1
-                    else:
-                        continue
-
-                    conn.append([node_counter + 0,
-                                 node_counter + 1,
-                                 node_counter + dims_star[0]+2,
-                                 node_counter + dims_star[0]+1])
-                    panel_id[counter] = counter
-                    panel_surf_id[counter] = i_surf
-                    panel_gamma[counter] = self.data.aero.timestep_info[self.ts].gamma_star[i_surf][i_m, i_n]
-
-            ug = tvtk.UnstructuredGrid(points=coords)
-            ug.set_cells(tvtk.Quad().cell_type, conn)
-            ug.cell_data.scalars = panel_id
-            ug.cell_data.scalars.name = 'panel_n_id'
-            ug.cell_data.add_array(panel_surf_id)
-            ug.cell_data.get_array(1).name = 'panel_surface_id'
-            ug.cell_data.add_array(panel_gamma)
-            ug.cell_data.get_array(2).name = 'panel_gamma'
-            ug.point_data.scalars = np.arange(0, coords.shape[0])
-            ug.point_data.scalars.name = 'n_id'
-            write_data(ug, filename)
+            coords = self.grid_coordinates(tstep.zeta_star[i_surf][:, 0:dims_star[0] + 1, :])
+
+            panel_id = np.arange(panel_data_dim)
+            panel_surf_id = np.full((panel_data_dim,), i_surf, dtype=int)
+            panel_gamma = tstep.gamma_star[i_surf][0:dims_star[0], :].T.reshape(-1).copy()
+
+            grids.append({'filename': filename,
+                          'coords': coords,
+                          'conn': self.connectivity(dims_star[0], dims_star[1]),
+                          'cell_scalars': ('panel_n_id', panel_id),
+                          'cell_arrays': [('panel_surface_id', panel_surf_id),
+                                          ('panel_gamma', panel_gamma)]})
+        return grids
+
+
+def write_grid(filename, coords, conn, cell_scalars, cell_arrays, cell_vectors=None, point_arrays=()):
+    """
+    Writes a grid of quads to the VTK file ``filename``.
+
+    Args:
+        filename (str): file name, without extension
+        coords (np.ndarray): ``(n_points, 3)`` coordinates of the points
+        conn (np.ndarray): ``(n_cells, 4)`` connectivity of the quads
+        cell_scalars (tuple): name and values of the cell scalars
+        cell_arrays (list(tuple)): names and values of the other cell arrays
+        cell_vectors (tuple): name and values of the cell vectors, if any
+        point_arrays (list(tuple)): names and values of the point arrays, after the point ids ``n_id``
+    """
+    ug = tvtk.UnstructuredGrid(points=coords)
+    ug.set_cells(tvtk.Quad().cell_type, conn)
+    ug.cell_data.scalars = cell_scalars[1]
+    ug.cell_data.scalars.name = cell_scalars[0]
+    for i_array, (name, values) in enumerate(cell_arrays):
+        ug.cell_data.add_array(values)
+        ug.cell_data.get_array(i_array + 1).name = name
+    if cell_vectors is not None:
+        ug.cell_data.vectors = cell_vectors[1]
+        ug.cell_data.vectors.name = cell_vectors[0]
+    ug.point_data.scalars = np.arange(0, coords.shape[0])
+    ug.point_data.scalars.name = 'n_id'
+    for i_array, (name, values) in enumerate(point_arrays):
+        ug.point_data.add_array(values)
+        ug.point_data.get_array(i_array + 1).name = name
+    write_data(ug, filename)
@@ -166,40 +166,29 @@ class BeamPlot(BaseSolver):
             else:
                 raise AttributeError('Only scalar and 3-vector types supported in beamplot')
 
-        for i_node in range(num_nodes):
-            i_elem = self.data.structure.node_master_elem[i_node, 0]
-            i_local_node = self.data.structure.node_master_elem[i_node, 1]
-            node_id[i_node] = i_node
-
-            v1 = np.array([1., 0, 0])
-            v2 = np.array([0., 1, 0])
-            v3 = np.array([0., 0, 1])
-            cab = algebra.crv2rot(
-                self.data.structure.timestep_info[it].psi[i_elem, i_local_node, :])
-            local_x[i_node, :] = np.dot(aero2inertial, np.dot(cab, v1))
-            local_y[i_node, :] = np.dot(aero2inertial, np.dot(cab, v2))
-            local_z[i_node, :] = np.dot(aero2inertial, np.dot(cab, v3))
-
-            if i_local_node == 2:
-                coords_a_cell[i_elem, :] = self.data.structure.timestep_info[it].pos[i_node, :]
-            coords_a[i_node, :] = self.data.structure.timestep_info[it].pos[i_node, :]
-
-            # applied forces
-            cab = algebra.crv2rot(self.data.structure.timestep_info[it].psi[i_elem, i_local_node, :])
-            app_forces[i_node, :] = np.dot(aero2inertial,
-                                           np.dot(cab,
-                                                  self.data.structure.timestep_info[it].steady_applied_forces[i_node, 0:3]+
-                                                  self.data.structure.timestep_info[it].unsteady_applied_forces[i_node, 0:3]))
-            app_moment[i_node, :] = np.dot(aero2inertial,
-                                           np.dot(cab,
-                                                  self.data.structure.timestep_info[it].steady_applied_forces[i_node, 3:6]+
-                                                  self.data.structure.timestep_info[it].unsteady_applied_forces[i_node, 3:6]))
-
-            if with_gravity:
-                gravity_forces[i_node, 0:3] = np.dot(aero2inertial,
-                                                     gravity_forces[i_node, 0:3])
-                gravity_forces[i_node, 3:6] = np.dot(aero2inertial,
-                                                     gravity_forces[i_node, 3:6])
+        tstep = self.data.structure.timestep_info[it]
+        master_elem = self.data.structure.node_master_elem[:, 0]
+        master_local_node = self.data.structure.node_master_elem[:, 1]
+        node_id[:] = np.arange(num_nodes)
+
+        # rotation from the material frame of every node to the inertial frame
+        cgb = np.matmul(aero2inertial, self.data.structure.nodal_cab(tstep))
+        local_x[:] = cgb[:, :, 0]
+        local_y[:] = cgb[:, :, 1]
+        local_z[:] = cgb[:, :, 2]
+
+        last_node = master_local_node == 2
+        coords_a_cell[master_elem[last_node], :] = tstep.pos[last_node, :]
+        coords_a[:] = tstep.pos
+
+        # applied forces
+        applied_forces = tstep.steady_applied_forces + tstep.unsteady_applied_forces
+        app_forces[:] = np.einsum('nij,nj->ni', cgb, applied_forces[:, 0:3])
+        app_moment[:] = np.einsum('nij,nj->ni', cgb, applied_forces[:, 3:6])
+
+        if with_gravity:
+            gravity_forces[:, 0:3] = np.dot(gravity_forces[:, 0:3], aero2inertial.T)
+            gravity_forces[:, 3:6] = np.dot(gravity_forces[:, 3:6], aero2inertial.T)
 
         for i_elem in range(num_elem):
             conn[i_elem, :] = self.data.structure.elements[i_elem].reordered_global_connectivities
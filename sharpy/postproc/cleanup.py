@@ -47,5 +47,6 @@ class Cleanup(BaseSolver):
         return self.data
 
     def clean(self, series, n_steps):
-        for i in range(len(series[:-n_steps])):
+        first = getattr(series, 'first_index', 0)
+        for i in range(first, len(series) - n_steps):
             series[i] = None
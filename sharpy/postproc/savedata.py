@@ -3,6 +3,8 @@ import sharpy
 import sharpy.utils.cout_utils as cout
 from sharpy.utils.solver_interface import solver, BaseSolver
 import sharpy.utils.settings as settings
+import sharpy.utils.h5utils as h5utils
+from sharpy.utils.datastructures import TimeStepHistory
 
 import warnings
 import h5py
@@ -18,6 +20,10 @@ SkipAttr=[  'fortran',
             'airfoil_db',
             'settings_types',
             'beam',
+            'undeformed_strip_db',
+            'strip_cache',
+            'strip_cache_deflection',
+            'force_mapping',
             'ct_dynamic_forces_list',
             'ct_forces_list',
             'ct_gamma_dot_list',
@@ -28,7 +34,20 @@ SkipAttr=[  'fortran',
             'ct_u_ext_star_list',
             'ct_zeta_dot_list',
             'ct_zeta_list',
-            'ct_zeta_star_list',]
+            'ct_zeta_star_list',
+            'ct_p_dimensions',
+            'ct_p_dimensions_star',
+            'ct_p_dynamic_forces',
+            'ct_p_forces',
+            'ct_p_gamma',
+            'ct_p_gamma_dot',
+            'ct_p_gamma_star',
+            'ct_p_normals',
+            'ct_p_u_ext',
+            'ct_p_u_ext_star',
+            'ct_p_zeta',
+            'ct_p_zeta_dot',
+            'ct_p_zeta_star',]
 
 
 @solver
@@ -57,6 +76,24 @@ class SaveData(BaseSolver):
         self.settings_types['compress_float'] = 'bool'
         self.settings_default['compress_float'] = False
 
+        self.settings_types['format'] = 'str'
+        self.settings_default['format'] = 'h5'
+
+        self.settings_types['chunk_steps'] = 'int'
+        self.settings_default['chunk_steps'] = 10
+
+        self.settings_types['compression'] = 'str'
+        self.settings_default['compression'] = ''
+
+        self.settings_types['compression_opts'] = 'int'
+        self.settings_default['compression_opts'] = 4
+
+        self.settings_types['shuffle'] = 'bool'
+        self.settings_default['shuffle'] = False
+
+        self.settings_types['online_flush_interval'] = 'int'
+        self.settings_default['online_flush_interval'] = 10
+
         self.settings = None
         self.data = None
 
@@ -64,6 +101,11 @@ class SaveData(BaseSolver):
         self.filename = ''
         self.ts_max = 0
 
+        # online mode: open file and appenders of the time step histories
+        self.hdfile = None
+        self.appenders = dict()
+        self.n_unflushed = 0
+
         ### specify which classes are saved as hdf5 group
         # see initialise and add_as_grp
         self.ClassesToSave=(sharpy.presharpy.presharpy.PreSharpy,)
@@ -95,20 +137,30 @@ class SaveData(BaseSolver):
         if self.settings['save_struct']:
             self.ClassesToSave+=(
                                 sharpy.structure.models.beam.Beam,
+                                sharpy.structure.models.beam.DynamicInput,
                                 sharpy.utils.datastructures.StructTimeStepInfo,)
 
 
     def run(self, online=False):
-
-        hdfile=h5py.File(self.filename,'a')
-
-        #from IPython import embed;embed()
-
         if online:
-            raise NameError('online not implemented!')
-            # self.ts=len(self.data.structure.timestep_info)-1
-            # add_as_grp(self.data,hdfile,grpname='data',
-            #                         ClassesToSave=self.ClassesToSave,ts=self.ts)
+            self.append_timesteps()
+            return self.data
+
+        # the offline output goes to the same file. If the time steps have
+        # been saved online, only the last ones are still to be appended
+        streamed = self.hdfile is not None
+        if streamed:
+            self.append_timesteps()
+        self.close()
+        hdfile=h5py.File(self.filename,'a')
+        if self.settings['format'] == 'columnar':
+            # time step histories as time series, the rest as groups
+            add_as_grp(self.data,hdfile,grpname='data',
+                                ClassesToSave=self.ClassesToSave,
+                                SkipAttr=list(self.settings['skip_attr'])+['timestep_info'],
+                                            compress_float=self.settings['compress_float'] )
+            if not streamed:
+                self.write_timesteps(self.create_appenders(hdfile))
         else:
             add_as_grp(self.data,hdfile,grpname='data',
                                 ClassesToSave=self.ClassesToSave,
@@ -117,6 +169,119 @@ class SaveData(BaseSolver):
 
         return self.data
 
+    def create_appenders(self, hdfile):
+        """
+        Opens the group ``timesteps`` of ``hdfile`` (creating it if necessary)
+        and returns the ``TimeStepAppender`` of every history saved. The
+        histories already in the file, e.g. saved online, are continued.
+        """
+        grp = hdfile.require_group('timesteps')
+        histories = []
+        if self.settings['save_aero'] and getattr(self.data, 'aero', None) is not None:
+            histories.append('aero')
+        if self.settings['save_struct']:
+            histories.append('structure')
+
+        appenders = dict()
+        for name in histories:
+            appenders[name] = h5utils.TimeStepAppender(
+                grp.require_group(name),
+                chunk_steps=self.settings['chunk_steps'].value,
+                skip_attr=self.settings['skip_attr'],
+                compress_float=self.settings['compress_float'],
+                compression=self.settings['compression'],
+                compression_opts=self.settings['compression_opts'].value,
+                shuffle=self.settings['shuffle'])
+        return appenders
+
+    def write_timesteps(self, appenders):
+        """
+        Writes the time steps in memory after the last one already saved by
+        ``appenders``, in blocks of ``chunk_steps`` steps.
+        """
+        block = self.settings['chunk_steps'].value
+        for name, appender in appenders.items():
+            history = getattr(self.data, name).timestep_info
+            for ts in range(max(appender.last_ts + 1, history.first_index), len(history), block):
+                ts_list = list(range(ts, min(ts + block, len(history))))
+                appender.append_steps(ts_list, [history[it] for it in ts_list])
+
+    def append_timesteps(self):
+        """
+        Appends the time steps committed since the last call to the group
+        ``timesteps`` of the output file, with one extendable dataset per field
+        (see ``sharpy.utils.h5utils.TimeStepAppender``). The file is kept
+        open and flushed every ``online_flush_interval`` calls.
+        """
+        if self.hdfile is None:
+            self.hdfile = h5py.File(self.filename, 'a')
+            self.appenders = self.create_appenders(self.hdfile)
+
+        for name, appender in self.appenders.items():
+            history = getattr(self.data, name).timestep_info
+            for ts in range(max(appender.last_ts + 1, history.first_index), len(history)):
+                appender.append(ts, history[ts])
+
+        self.n_unflushed += 1
+        if self.n_unflushed >= self.settings['online_flush_interval'].value:
+            self.hdfile.flush()
+            self.n_unflushed = 0
+
+    def close(self):
+        """
+        Closes the output file of the online mode, if open.
+        """
+        if self.hdfile is not None:
+            self.hdfile.close()
+            self.hdfile = None
+            self.appenders = dict()
+            self.n_unflushed = 0
+
+
+
+class TimeStepSpill(object):
+    '''
+    Callable that writes the time steps evicted from a TimeStepHistory 
+    (see sharpy.utils.datastructures) to the group grpname of the hdf5 file 
+    filename. The group is laid out as the lists saved by add_as_grp, so it 
+    can be read back with sharpy.utils.h5utils.readh5.
+
+    The file is opened with the first evicted step and kept open, flushed 
+    every flush_interval steps, until close is called. It is reopened if 
+    more steps are evicted afterwards.
+    '''
+
+    def __init__(self,filename,grpname,compress_float=False,flush_interval=10):
+        self.filename=filename
+        self.grpname=grpname
+        self.compress_float=compress_float
+        self.flush_interval=max(int(flush_interval),1)
+        self.hdfile=None
+        self.n_unflushed=0
+
+    def __call__(self,ts,tstep):
+        if self.hdfile is None:
+            self.hdfile=h5py.File(self.filename,'a')
+            if not(self.grpname in self.hdfile):
+                grp=self.hdfile.create_group(self.grpname)
+                grp['_read_as']='list'
+        add_as_grp(tstep,self.hdfile[self.grpname],grpname='%.5d'%ts,
+                   ClassesToSave=(tstep.__class__,),
+                   compress_float=self.compress_float,overwrite=True)
+        self.n_unflushed+=1
+        if self.n_unflushed>=self.flush_interval:
+            self.hdfile.flush()
+            self.n_unflushed=0
+
+    def close(self):
+        '''
+        Closes the file, if open.
+        '''
+        if self.hdfile is not None:
+            self.hdfile.close()
+            self.hdfile=None
+            self.n_unflushed=0
+
 
 
 def add_as_grp(obj,grpParent,
@@ -149,7 +314,7 @@ def add_as_grp(obj,grpParent,
 
 
     ### determine if dict, list, tuple or class
-    if isinstance(obj,list):
+    if isinstance(obj,(list,TimeStepHistory)):
         ObjType='list'
     elif isinstance(obj,tuple):
         ObjType='tuple'
@@ -180,12 +345,17 @@ def add_as_grp(obj,grpParent,
             grp['_read_as']=ObjType
         else:
             grp=grpParent[grpname]
-            assert grp['_read_as'].value==ObjType,\
+            assert h5utils.read_dataset(grp['_read_as'])==ObjType,\
                                      'Can not overwrite group of different type'
 
 
+    ### per-surface arrays sharing a single buffer: save the buffer at once
+    if ObjType=='list' and getattr(obj,'buffer',None) is not None:
+        save_buffer_list(obj,grp,compress_float=compress_float)
+        return grpParent
+
     ### lists/tuples only: try to save as arrays
-    if ObjType in ('list','tuple'):
+    if ObjType in ('list','tuple') and not isinstance(obj,TimeStepHistory):
         Success=save_list_as_array(
                       list_obj=obj,grp_target=grp,compress_float=compress_float)
         if Success: 
@@ -199,6 +369,11 @@ def add_as_grp(obj,grpParent,
         dictname=obj
     elif ObjType=='class':
         dictname=obj.__dict__
+    elif isinstance(obj,TimeStepHistory):
+        # only the time steps still in memory are saved
+        dictname={}
+        for nn in range(obj.first_index,len(obj)):
+            dictname['%.5d'%nn ]=obj[nn]
     else: 
         N=len(obj)
         dictname={}
@@ -207,7 +382,7 @@ def add_as_grp(obj,grpParent,
 
 
     ### loop attributes and save
-    SaveAsGroups=ClassesToSave+(list,dict,tuple, )
+    SaveAsGroups=ClassesToSave+(list,dict,tuple,TimeStepHistory, )
 
 
     for attr in dictname:
@@ -271,6 +446,21 @@ def add_array_to_grp(data,name,grp,compress_float=False):
 
 
 
+def save_buffer_list(list_obj,grp_target,compress_float=False):
+    ''' 
+    Saves a list of arrays that are views of the single buffer list_obj.buffer
+    (e.g. the per-surface fields of AeroTimeStepInfo) as the dataset 
+    '_as_buffer', plus the shapes of the arrays in '_shapes'.
+    '''
+
+    for name in ('_as_buffer','_shapes'):
+        if name in grp_target:
+            del grp_target[name]
+    add_array_to_grp(list_obj.buffer,'_as_buffer',grp_target,compress_float)
+    grp_target['_shapes']=array([arr.shape for arr in list_obj],dtype=int64)
+
+
+
 def save_list_as_array(list_obj,grp_target,compress_float=False):
     ''' 
     Works for both lists and tuples. Returns True if the saving was successful.
@@ -3,12 +3,16 @@ import ctypes as ct
 import numpy as np
 
 import sharpy.aero.utils.mapping as mapping
+import sharpy.aero.models.aerogrid as aerogrid
 import sharpy.utils.cout_utils as cout
 import sharpy.utils.solver_interface as solver_interface
 from sharpy.utils.solver_interface import solver, BaseSolver
 import sharpy.utils.settings as settings
 import sharpy.utils.algebra as algebra
+import sharpy.utils.coupling as coupling
+import sharpy.utils.postprocessing as postprocessing
 import sharpy.structure.utils.xbeamlib as xbeam
+import sharpy.postproc.savedata as savedata
 
 
 @solver
@@ -40,15 +44,29 @@ class DynamicCoupled(BaseSolver):
         self.settings_types['dt'] = 'float'
         self.settings_default['dt'] = 0.05
 
+        # number of structural steps per aerodynamic step
         self.settings_types['structural_substeps'] = 'int'
         self.settings_default['structural_substeps'] = 1
 
+        # interpolate the loads of the structural substeps between the previous and the new
+        # aerodynamic step, instead of holding the new ones
+        self.settings_types['interpolate_substep_loads'] = 'bool'
+        self.settings_default['interpolate_substep_loads'] = True
+
         self.settings_types['fsi_substeps'] = 'int'
         self.settings_default['fsi_substeps'] = 70
 
         self.settings_types['fsi_tolerance'] = 'float'
         self.settings_default['fsi_tolerance'] = 1e-5
 
+        # absolute tolerance of the residuals, added to fsi_tolerance times the norm of the state
+        self.settings_types['fsi_abs_tolerance'] = 'float'
+        self.settings_default['fsi_abs_tolerance'] = 1e-8
+
+        # residuals of the flexible, rigid body and quaternion dofs evaluated separately
+        self.settings_types['fsi_block_residuals'] = 'bool'
+        self.settings_default['fsi_block_residuals'] = False
+
         self.settings_types['relaxation_factor'] = 'float'
         self.settings_default['relaxation_factor'] = 0.2
 
@@ -64,18 +82,64 @@ class DynamicCoupled(BaseSolver):
         self.settings_types['dynamic_relaxation'] = 'bool'
         self.settings_default['dynamic_relaxation'] = True
 
+        # 'prescribed': relaxation_factor, ramped to final_relaxation_factor if dynamic_relaxation
+        # 'aitken': Aitken adaptive relaxation, starting every time step from relaxation_factor
+        # 'iqn_ils': interface quasi-Newton with least-squares Jacobian
+        self.settings_types['relaxation_method'] = 'str'
+        self.settings_default['relaxation_method'] = 'prescribed'
+
+        # number of previous time steps whose sub-iterations are reused by iqn_ils
+        self.settings_types['iqn_reuse_steps'] = 'int'
+        self.settings_default['iqn_reuse_steps'] = 0
+
         self.settings_types['postprocessors'] = 'list(str)'
         self.settings_default['postprocessors'] = list()
 
         self.settings_types['postprocessors_settings'] = 'dict'
         self.settings_default['postprocessors_settings'] = dict()
 
+        # run the postprocessors in a background thread, on snapshots of the committed steps
+        self.settings_types['postprocessors_async'] = 'bool'
+        self.settings_default['postprocessors_async'] = False
+
+        # maximum number of steps waiting to be postprocessed before the solver waits
+        self.settings_types['postprocessors_queue_size'] = 'int'
+        self.settings_default['postprocessors_queue_size'] = 2
+
         self.settings_types['cleanup_previous_solution'] = 'bool'
         self.settings_default['cleanup_previous_solution'] = True
 
         self.settings_types['include_unsteady_force_contribution'] = 'bool'
         self.settings_default['include_unsteady_force_contribution'] = False
 
+        # order of the extrapolation of the structural state and forces from the previous
+        # steps used in the first sub-iteration (0: previous step, 1: linear, 2: quadratic)
+        self.settings_types['predictor_order'] = 'int'
+        self.settings_default['predictor_order'] = 0
+
+        # adaptive time step: dt is the initial time step and n_time_steps*dt the simulated time.
+        # The steps are never rejected, the error of a step only shortens the next one. The time of every
+        # committed step is stored in its time attribute
+        self.settings_types['adaptive_dt'] = 'bool'
+        self.settings_default['adaptive_dt'] = False
+
+        # target local error of the structural state, relative to 1 + |q|
+        self.settings_types['adaptive_dt_tolerance'] = 'float'
+        self.settings_default['adaptive_dt_tolerance'] = 1e-3
+
+        # bounds of the adaptive time step, as multiples of dt
+        self.settings_types['adaptive_dt_min_factor'] = 'float'
+        self.settings_default['adaptive_dt_min_factor'] = 0.1
+
+        self.settings_types['adaptive_dt_max_factor'] = 'float'
+        self.settings_default['adaptive_dt_max_factor'] = 10.0
+
+        self.settings_types['n_steps_in_memory'] = 'int'
+        self.settings_default['n_steps_in_memory'] = 0
+
+        self.settings_types['spill_file'] = 'str'
+        self.settings_default['spill_file'] = ''
+
         self.data = None
         self.settings = None
         self.structural_solver = None
@@ -85,15 +149,27 @@ class DynamicCoupled(BaseSolver):
         self.res = 0.0
         self.res_dqdt = 0.0
         self.res_dqddt = 0.0
+        self.residual = None
 
         self.previous_force = None
+        # writers of the time steps evicted from memory (see set_retention)
+        self.spills = []
+
+        # new (relaxed) steady and unsteady forces during the structural substeps
+        self.substep_forces = None
+        self.accelerator = None
+        # number of FSI sub-iterations of every time step
+        self.fsi_iterations = []
 
         self.dt = 0.
+        self.time = 0.
+        self.time_step_controller = None
 
-        self.predictor = False
+        self.predictor = 0
         self.residual_table = None
         self.postprocessors = dict()
         self.with_postprocessors = False
+        self.background_postprocessors = None
 
     def get_g(self):
         return self.structural_solver.settings['gravity'].value
@@ -116,10 +192,14 @@ class DynamicCoupled(BaseSolver):
         settings.to_custom_types(self.settings, self.settings_types, self.settings_default)
         self.dt = self.settings['dt']
         self.print_info = self.settings['print_info']
+        self.predictor = self.settings['predictor_order'].value
+        if self.predictor not in coupling.extrapolation_coefficients:
+            raise NotImplementedError('predictor_order %u is not implemented' % self.predictor)
         if self.settings['cleanup_previous_solution']:
             # if there's data in timestep_info[>0], copy the last one to
             # timestep_info[0] and remove the rest
             self.cleanup_timestep_info()
+        self.set_retention()
 
         self.structural_solver = solver_interface.initialise_solver(self.settings['structural_solver'])
         self.structural_solver.initialise(self.data, self.settings['structural_solver_settings'])
@@ -127,6 +207,25 @@ class DynamicCoupled(BaseSolver):
         self.aero_solver.initialise(self.structural_solver.data, self.settings['aero_solver_settings'])
         self.data = self.aero_solver.data
 
+        self.accelerator = coupling.initialise_accelerator(self.settings['relaxation_method'],
+                                                           self.settings['relaxation_factor'].value,
+                                                           self.relaxation_factor,
+                                                           self.settings['iqn_reuse_steps'].value)
+        self.fsi_iterations = []
+
+        self.residual = coupling.StructuralResidual(len(self.data.structure.timestep_info[-1].q),
+                                                    self.settings['fsi_tolerance'].value,
+                                                    self.settings['fsi_abs_tolerance'].value,
+                                                    self.settings['fsi_block_residuals'].value)
+
+        self.time_step_controller = None
+        if self.settings['adaptive_dt']:
+            self.time_step_controller = coupling.AdaptiveTimeStep(
+                self.settings['adaptive_dt_min_factor'].value*self.settings['dt'].value,
+                self.settings['adaptive_dt_max_factor'].value*self.settings['dt'].value,
+                self.settings['adaptive_dt_tolerance'].value,
+                self.settings['fsi_substeps'].value)
+
         if self.print_info:
             self.residual_table = cout.TablePrinter(7, 14, ['g', 'f', 'g', 'f', 'f', 'f', 'e'])
             self.residual_table.field_length[0] = 6
@@ -144,29 +243,92 @@ class DynamicCoupled(BaseSolver):
                 self.data, self.settings['postprocessors_settings'][postproc])
 
 
+    def set_retention(self):
+        """
+        Limits the number of time steps kept in memory to ``n_steps_in_memory``
+        (``0`` keeps all of them). If ``spill_file`` is given, the older steps are
+        written to it before being released.
+        """
+        n_keep = self.settings['n_steps_in_memory'].value
+        if n_keep:
+            # the aero solver needs the two previous steps for gamma_dot
+            n_keep = max(n_keep, 3)
+        for spill in self.spills:
+            spill.close()
+        self.spills = []
+        aero_spill = None
+        struct_spill = None
+        if n_keep and self.settings['spill_file']:
+            aero_spill = savedata.TimeStepSpill(self.settings['spill_file'], 'aero')
+            struct_spill = savedata.TimeStepSpill(self.settings['spill_file'], 'structure')
+            self.spills = [aero_spill, struct_spill]
+        self.data.aero.timestep_info.set_retention(n_keep, aero_spill)
+        self.data.structure.timestep_info.set_retention(n_keep, struct_spill)
+
     def cleanup_timestep_info(self):
         if max(len(self.data.aero.timestep_info), len(self.data.structure.timestep_info)) > 1:
-            # copy last info to first
-            self.data.aero.timestep_info[0] = self.data.aero.timestep_info[-1]
-            self.data.structure.timestep_info[0] = self.data.structure.timestep_info[-1]
-            # delete all the rest
-            while len(self.data.aero.timestep_info) - 1:
-                del self.data.aero.timestep_info[-1]
-            while len(self.data.structure.timestep_info) - 1:
-                del self.data.structure.timestep_info[-1]
+            # keep only the last info, as the first step
+            self.data.aero.timestep_info.restart()
+            self.data.structure.timestep_info.restart()
 
         self.data.ts = 0
 
     def run(self):
-        # previous_kstep = self.data.structure.timestep_info[-1].copy()
+        self.background_postprocessors = None
+        if self.with_postprocessors and self.settings['postprocessors_async']:
+            self.background_postprocessors = postprocessing.BackgroundPostprocessors(
+                [self.postprocessors[postproc] for postproc in self.settings['postprocessors']],
+                self.settings['postprocessors_queue_size'].value)
+
+        # scratch steps for the FSI sub-iterations. They are allocated once and
+        # refilled from the committed steps with copy(out=...), so the
+        # sub-iterations do not allocate new timestep info.
+        # structural_kstep and previous_kstep are swapped every sub-iteration.
+        aero_kstep = self.data.aero.timestep_info[-1].copy()
+        structural_kstep = self.data.structure.timestep_info[-1].copy()
+        previous_kstep = structural_kstep.copy()
+        n_substeps = max(self.settings['structural_substeps'].value, 1)
+        if n_substeps > 1:
+            self.substep_forces = (structural_kstep.steady_applied_forces.copy(order='F'),
+                                   structural_kstep.unsteady_applied_forces.copy(order='F'))
+
+        # time of the last committed step and of the end of the simulation
+        nominal_dt = self.settings['dt'].value
+        self.time = (len(self.data.structure.timestep_info) - 1)*nominal_dt
+        end_time = self.time + self.settings['n_time_steps'].value*nominal_dt
+        # times of the last committed steps, for the error estimate
+        committed_times = [self.time]
+        dt = nominal_dt
+        previous_dt = nominal_dt
+        if self.time_step_controller is None:
+            min_dt = nominal_dt
+            q_predicted = None
+        else:
+            min_dt = self.time_step_controller.dt_min
+            q_predicted = np.zeros_like(structural_kstep.q)
+
         # dynamic simulations start at tstep == 1, 0 is reserved for the initial state
-        for self.data.ts in range(len(self.data.structure.timestep_info),
-                                  self.settings['n_time_steps'].value + len(self.data.structure.timestep_info)):
-            # aero_kstep = self.data.aero.timestep_info[-1].copy()
-            structural_kstep = self.data.structure.timestep_info[-1].copy()
+        while end_time - self.time > 0.5*min_dt:
+            self.data.ts = len(self.data.structure.timestep_info)
+            if self.time_step_controller is not None:
+                dt = max(min(dt, end_time - self.time), min_dt)
+                aero_kwargs = {'dt': dt, 't': self.time + dt, 'previous_dt': previous_dt}
+                struct_kwargs = {'dt': dt}
+            else:
+                aero_kwargs = dict()
+                struct_kwargs = dict()
+
+            self.data.structure.timestep_info[-1].copy(out=structural_kstep)
+            if q_predicted is not None:
+                self.predict_state(committed_times, self.time + dt, q_predicted)
+            if self.predictor:
+                self.predict(structural_kstep, committed_times, self.time + dt)
+            self.accelerator.reset()
 
             # previous_kstep = self.data.structure.timestep_info[-1].copy()
             k = 0
+            converged = False
+            n_iterations = self.settings['fsi_substeps'].value
             for k in range(self.settings['fsi_substeps'].value + 1):
                 if k == self.settings['fsi_substeps'].value and not self.settings['fsi_substeps'] == 0:
                     cout.cout_wrap('The FSI solver did not converge!!!')
@@ -180,16 +342,21 @@ class DynamicCoupled(BaseSolver):
                     break
 
                 # generate new grid (already rotated)
-                aero_kstep = self.data.aero.timestep_info[-1].copy()
+                self.data.aero.timestep_info[-1].copy(out=aero_kstep)
+                if not dt == previous_dt:
+                    # the wake panels have the length of the previous time step. Only the
+                    # scratch step is resampled, the committed one is left untouched
+                    aerogrid.rediscretise_wake(aero_kstep, dt/previous_dt)
                 self.aero_solver.update_custom_grid(structural_kstep, aero_kstep)
 
                 # run the solver
                 self.data = self.aero_solver.run(aero_kstep,
                                                  structural_kstep,
-                                                 convect_wake=True)
+                                                 convect_wake=True,
+                                                 **aero_kwargs)
 
-                previous_kstep = structural_kstep.copy()
-                structural_kstep = self.data.structure.timestep_info[-1].copy()
+                previous_kstep, structural_kstep = structural_kstep, previous_kstep
+                self.data.structure.timestep_info[-1].copy(out=structural_kstep)
                 # map forces
                 force_coeff = 0.0
                 if self.settings['include_unsteady_force_contribution']:
@@ -199,36 +366,40 @@ class DynamicCoupled(BaseSolver):
                                 force_coeff)
 
                 # relaxation
-                relax_factor = self.relaxation_factor(k)
-                relax(self.data.structure,
-                      structural_kstep,
-                      previous_kstep,
-                      relax_factor)
-
-                if k > 0.9*self.settings['fsi_substeps'].value:
-                    relax_factor = 0.3
-                elif k > 0.8*self.settings['fsi_substeps'].value:
-                    relax_factor = 0.8
+                self.accelerator.update(
+                    (structural_kstep.steady_applied_forces, structural_kstep.unsteady_applied_forces),
+                    (previous_kstep.steady_applied_forces, previous_kstep.unsteady_applied_forces))
 
                 # run structural solver
-                self.data = self.structural_solver.run(structural_step=structural_kstep)
+                if n_substeps > 1:
+                    self.run_structural_substeps(structural_kstep, dt, n_substeps)
+                else:
+                    self.data = self.structural_solver.run(structural_step=structural_kstep, **struct_kwargs)
 
                 # check convergence
                 if self.convergence(k,
                                     structural_kstep,
                                     previous_kstep):
+                    converged = True
+                    n_iterations = k + 1
                     break
+            self.fsi_iterations.append(n_iterations)
 
+            # commit the converged state
             self.aero_solver.add_step()
-            self.data.aero.timestep_info[-1] = aero_kstep.copy()
+            aero_kstep.copy(out=self.data.aero.timestep_info[-1])
 
             self.structural_solver.add_step()
-            self.data.structure.timestep_info[-1] = structural_kstep.copy()
-            self.data.structure.integrate_position(-1, self.settings['dt'].value)
+            structural_kstep.copy(out=self.data.structure.timestep_info[-1])
+            self.data.structure.integrate_position(-1, dt)
+            self.time += dt
+            self.data.aero.timestep_info[-1].time = self.time
+            self.data.structure.timestep_info[-1].time = self.time
+            committed_times = committed_times[-2:] + [self.time]
 
             if self.print_info:
                 self.residual_table.print_line([self.data.ts,
-                                                self.data.ts*self.dt.value,
+                                                self.time,
                                                 k,
                                                 np.log10(self.res),
                                                 np.log10(self.res_dqdt),
@@ -236,35 +407,98 @@ class DynamicCoupled(BaseSolver):
                                                 structural_kstep.for_vel[2]])
             self.structural_solver.extract_resultants()
             # run postprocessors
-            if self.with_postprocessors:
+            if self.background_postprocessors is not None:
+                self.background_postprocessors.submit(self.data)
+            elif self.with_postprocessors:
                 for postproc in self.postprocessors:
                     self.data = self.postprocessors[postproc].run(online=True)
 
+            # time step of the next step
+            if self.time_step_controller is not None:
+                if len(committed_times) > 2:
+                    self.time_step_controller.estimate_error(q_predicted, structural_kstep.q)
+                previous_dt = dt
+                dt = self.time_step_controller.next_dt(dt, n_iterations, converged)
+
+        if self.background_postprocessors is not None:
+            self.background_postprocessors.close()
+            if self.print_info:
+                cout.cout_wrap('Time waiting for the background postprocessors: %.2f s' %
+                               self.background_postprocessors.wait_time, 1)
+            self.background_postprocessors = None
+
+        # close the files kept open by the postprocessors in online mode and by the spills
+        for postproc in self.postprocessors.values():
+            if hasattr(postproc, 'close'):
+                postproc.close()
+        for spill in self.spills:
+            spill.close()
+
         if self.print_info:
+            if self.fsi_iterations:
+                cout.cout_wrap('%u time steps, average FSI sub-iterations per time step: %.2f' %
+                               (len(self.fsi_iterations), np.mean(self.fsi_iterations)), 1)
             cout.cout_wrap('...Finished', 1)
         return self.data
 
+    def run_structural_substeps(self, structural_kstep, dt, n_substeps):
+        """
+        Integrates the structure over ``dt`` in ``n_substeps`` steps, starting from the last committed step
+        (see ``sharpy.utils.coupling.run_structural_substeps``).
+        """
+        self.data = coupling.run_structural_substeps(self.structural_solver,
+                                                     structural_kstep,
+                                                     self.data.structure.timestep_info[-1],
+                                                     dt,
+                                                     n_substeps,
+                                                     self.settings['interpolate_substep_loads'].value,
+                                                     self.substep_forces)
+
+    def predict(self, structural_kstep, committed_times, time):
+        """
+        Extrapolates the state and the applied forces of the new step from the last committed ones.
+        """
+        history = self.data.structure.timestep_info
+        order = min(self.predictor, len(history) - history.first_index - 1)
+        times = None
+        if self.time_step_controller is not None:
+            # only the steps of this run have known times
+            order = min(order, len(committed_times) - 1)
+            times = committed_times[-1 - order:]
+        if order < 1:
+            return
+        coupling.extrapolate([history[-1 - i] for i in range(order, -1, -1)],
+                             predicted_attributes,
+                             structural_kstep,
+                             times,
+                             time)
+
+    def predict_state(self, committed_times, time, q_predicted):
+        """
+        Linear extrapolation of ``q`` from the last two committed steps, used for the error estimate
+        of the adaptive time step.
+        """
+        history = self.data.structure.timestep_info
+        if len(committed_times) < 2 or len(history) - history.first_index < 2:
+            q_predicted[:] = history[-1].q
+            return
+        weights = coupling.extrapolation_weights(committed_times[-2:], time)
+        q_predicted[:] = weights[0]*history[-2].q + weights[1]*history[-1].q
+
     def convergence(self, k, tstep, previous_tstep):
+        converged = self.residual(tstep, previous_tstep)
+
         # check for non-convergence
-        if not all(np.isfinite(tstep.q)):
+        if not self.residual.is_finite():
             raise Exception('***Not converged! There is a NaN value in the forces!')
 
-        self.res = (np.linalg.norm(tstep.q-
-                                   previous_tstep.q)/
-                    np.linalg.norm(previous_tstep.q))
-        self.res_dqdt = (np.linalg.norm(tstep.dqdt-
-                                        previous_tstep.dqdt)/
-                         np.linalg.norm(previous_tstep.dqdt))
-        self.res_dqddt = (np.linalg.norm(tstep.dqddt-
-                                         previous_tstep.dqddt)/
-                          np.linalg.norm(previous_tstep.dqddt))
+        self.res = self.residual.field_residual('q')
+        self.res_dqdt = self.residual.field_residual('dqdt')
+        self.res_dqddt = self.residual.field_residual('dqddt')
 
         # convergence
         if k > self.settings['minimum_steps'].value - 1:
-            if self.res < self.settings['fsi_tolerance'].value:
-                if self.res_dqdt < self.settings['fsi_tolerance'].value:
-                    if self.res_dqddt < self.settings['fsi_tolerance'].value:
-                        return True
+            return converged
 
         return False
 
@@ -282,7 +516,8 @@ class DynamicCoupled(BaseSolver):
             structural_kstep.psi,
             self.data.structure.node_master_elem,
             self.data.structure.master,
-            structural_kstep.cag())
+            structural_kstep.cag(),
+            operator=self.data.aero.force_mapping)
         dynamic_struct_forces = unsteady_forces_coeff*mapping.aero2struct_force_mapping(
             aero_kstep.dynamic_forces,
             self.data.aero.struct2aero_mapping,
@@ -291,15 +526,25 @@ class DynamicCoupled(BaseSolver):
             structural_kstep.psi,
             self.data.structure.node_master_elem,
             self.data.structure.master,
-            structural_kstep.cag())
+            structural_kstep.cag(),
+            operator=self.data.aero.force_mapping)
 
         # prescribed forces + aero forces
-        structural_kstep.steady_applied_forces = (
-            (struct_forces + self.data.structure.ini_info.steady_applied_forces).
-            astype(dtype=ct.c_double, order='F', copy=True))
-        structural_kstep.unsteady_applied_forces = (
-            (dynamic_struct_forces + self.data.structure.dynamic_input[max(self.data.ts - 1, 0)]['dynamic_forces']).
-            astype(dtype=ct.c_double, order='F', copy=True))
+        np.add(struct_forces,
+               self.data.structure.ini_info.steady_applied_forces,
+               out=structural_kstep.steady_applied_forces)
+        np.add(dynamic_struct_forces,
+               self.data.structure.dynamic_input[self.dynamic_input_index()]['dynamic_forces'],
+               out=structural_kstep.unsteady_applied_forces)
+
+    def dynamic_input_index(self):
+        """
+        Index of the prescribed dynamic input of the current step. The inputs are given every ``dt``,
+        so with an adaptive time step the closest one in time is used.
+        """
+        if self.time_step_controller is None:
+            return max(self.data.ts - 1, 0)
+        return coupling.input_index(self.time, self.settings['dt'].value, len(self.data.structure.dynamic_input))
 
     def relaxation_factor(self, k):
         initial = self.settings['relaxation_factor'].value
@@ -314,6 +559,12 @@ class DynamicCoupled(BaseSolver):
         return value
 
 
+# attributes of the structural steps extrapolated by the predictor
+predicted_attributes = ['q', 'dqdt', 'dqddt',
+                        'pos', 'pos_dot', 'psi', 'psi_dot',
+                        'steady_applied_forces', 'unsteady_applied_forces']
+
+
 def relax(beam, timestep, previous_timestep, coeff):
     # from sharpy.structure.utils.xbeamlib import xbeam_solv_state2disp
     # numdof = beam.num_dof.value
@@ -324,10 +575,10 @@ def relax(beam, timestep, previous_timestep, coeff):
     # normalise_quaternion(timestep)
     # xbeam_solv_state2disp(beam, timestep)
 
-    timestep.steady_applied_forces[:] = ((1.0 - coeff)*timestep.steady_applied_forces +
-            coeff*previous_timestep.steady_applied_forces)
-    timestep.unsteady_applied_forces[:] = ((1.0 - coeff)*timestep.unsteady_applied_forces +
-            coeff*previous_timestep.unsteady_applied_forces)
+    timestep.steady_applied_forces *= 1.0 - coeff
+    timestep.steady_applied_forces += coeff*previous_timestep.steady_applied_forces
+    timestep.unsteady_applied_forces *= 1.0 - coeff
+    timestep.unsteady_applied_forces += coeff*previous_timestep.unsteady_applied_forces
 
 
 
@@ -8,6 +8,7 @@ import sharpy.utils.solver_interface as solver_interface
 from sharpy.utils.solver_interface import solver, BaseSolver
 import sharpy.utils.settings as settings
 import sharpy.utils.algebra as algebra
+import sharpy.utils.coupling as coupling
 
 
 @solver
@@ -63,6 +64,16 @@ class DynamicPrescribedCoupled(BaseSolver):
         self.settings_types['dynamic_relaxation'] = 'bool'
         self.settings_default['dynamic_relaxation'] = True
 
+        # 'prescribed': relaxation_factor, ramped to final_relaxation_factor if dynamic_relaxation
+        # 'aitken': Aitken adaptive relaxation, starting every time step from relaxation_factor
+        # 'iqn_ils': interface quasi-Newton with least-squares Jacobian
+        self.settings_types['relaxation_method'] = 'str'
+        self.settings_default['relaxation_method'] = 'prescribed'
+
+        # number of previous time steps whose sub-iterations are reused by iqn_ils
+        self.settings_types['iqn_reuse_steps'] = 'int'
+        self.settings_default['iqn_reuse_steps'] = 0
+
         self.settings_types['postprocessors'] = 'list(str)'
         self.settings_default['postprocessors'] = list()
 
@@ -75,6 +86,7 @@ class DynamicPrescribedCoupled(BaseSolver):
         self.aero_solver = None
 
         self.previous_force = None
+        self.accelerator = None
 
         self.dt = 0.
         self.postprocessors = dict()
@@ -92,6 +104,11 @@ class DynamicPrescribedCoupled(BaseSolver):
         self.aero_solver.initialise(self.structural_solver.data, self.settings['aero_solver_settings'])
         self.data = self.aero_solver.data
 
+        self.accelerator = coupling.initialise_accelerator(self.settings['relaxation_method'],
+                                                           self.settings['relaxation_factor'].value,
+                                                           self.relaxation_factor,
+                                                           self.settings['iqn_reuse_steps'].value)
+
         # if there's data in timestep_info[>0], copy the last one to
         # timestep_info[0] and remove the rest
         self.cleanup_timestep_info()
@@ -113,14 +130,9 @@ class DynamicPrescribedCoupled(BaseSolver):
 
     def cleanup_timestep_info(self):
         if max(len(self.data.aero.timestep_info), len(self.data.structure.timestep_info)) > 1:
-            # copy last info to first
-            self.data.aero.timestep_info[0] = self.data.aero.timestep_info[-1]
-            self.data.structure.timestep_info[0] = self.data.structure.timestep_info[-1]
-            # delete all the rest
-            while len(self.data.aero.timestep_info) - 1:
-                del self.data.aero.timestep_info[-1]
-            while len(self.data.structure.timestep_info) - 1:
-                del self.data.structure.timestep_info[-1]
+            # keep only the last info, as the first step
+            self.data.aero.timestep_info.restart()
+            self.data.structure.timestep_info.restart()
 
         self.data.ts = 0
 
@@ -143,6 +155,7 @@ class DynamicPrescribedCoupled(BaseSolver):
                 self.data.structure.timestep_info[ts].for_vel[:] = self.data.structure.dynamic_input[ts - 1]['for_vel']
                 self.data.structure.timestep_info[ts].for_acc[:] = self.data.structure.dynamic_input[ts - 1]['for_acc']
             structural_kstep = self.data.structure.timestep_info[-1].copy()
+            self.accelerator.reset()
 
             for k in range(self.settings['fsi_substeps'].value + 1):
                 if k == self.settings['fsi_substeps'].value and not self.settings['fsi_substeps'] == 0:
@@ -166,10 +179,9 @@ class DynamicPrescribedCoupled(BaseSolver):
                                 0*1.0)
 
                 # relax
-                relax(self.data.structure,
-                      structural_kstep,
-                      previous_kstep,
-                      self.relaxation_factor(k))
+                self.accelerator.update(
+                    (structural_kstep.steady_applied_forces, structural_kstep.unsteady_applied_forces),
+                    (previous_kstep.steady_applied_forces, previous_kstep.unsteady_applied_forces))
 
                 # run structural solver
                 self.data = self.structural_solver.run(structural_step=structural_kstep)
@@ -238,7 +250,8 @@ class DynamicPrescribedCoupled(BaseSolver):
             structural_kstep.psi,
             self.data.structure.node_master_elem,
             self.data.structure.master,
-            structural_kstep.cag())
+            structural_kstep.cag(),
+            operator=self.data.aero.force_mapping)
         dynamic_struct_forces = unsteady_forces_coeff*mapping.aero2struct_force_mapping(
             aero_kstep.dynamic_forces,
             self.data.aero.struct2aero_mapping,
@@ -247,7 +260,8 @@ class DynamicPrescribedCoupled(BaseSolver):
             structural_kstep.psi,
             self.data.structure.node_master_elem,
             self.data.structure.master,
-            structural_kstep.cag())
+            structural_kstep.cag(),
+            operator=self.data.aero.force_mapping)
 
         # prescribed forces + aero forces
         structural_kstep.steady_applied_forces = (
@@ -106,11 +106,8 @@ class NonLinearDynamicCoupledStep(BaseSolver):
 
         applied_forces_copy = applied_forces.copy()
         gravity_forces_copy = step.gravity_forces.copy()
-        for i_node in range(self.data.structure.num_node):
-            applied_forces_copy[i_node, 3:6] += np.cross(step.pos[i_node, :],
-                                                         applied_forces_copy[i_node, 0:3])
-            gravity_forces_copy[i_node, 3:6] += np.cross(step.pos[i_node, :],
-                                                         gravity_forces_copy[i_node, 0:3])
+        applied_forces_copy[:, 3:6] += np.cross(step.pos, applied_forces_copy[:, 0:3])
+        gravity_forces_copy[:, 3:6] += np.cross(step.pos, gravity_forces_copy[:, 0:3])
 
         totals = np.sum(applied_forces_copy + gravity_forces_copy, axis=0)
         return totals[0:3], totals[3:6]
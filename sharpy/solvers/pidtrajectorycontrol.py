@@ -174,11 +174,8 @@ class PIDTrajectoryControl(BaseSolver):
                     if inode > 0:
                         self.force_history[local_it, inode, 1] = 0
                     # apply the forces now
-                    (self.data.structure.dynamic_input[self.data.ts]
-                        ['dynamic_forces']
-                        [i_global_node, 0:3]) = (
-                            self.data.structure.dynamic_input[self.data.ts]['dynamic_forces']
-                            [i_global_node, 0:3] + self.force_history[local_it, inode, :])
+                    dynamic_forces = self.data.structure.dynamic_input.writable('dynamic_forces')
+                    dynamic_forces[self.data.ts, i_global_node, 0:3] += self.force_history[local_it, inode, :]
 
                 # print(self.force_history[local_it, :, :])
             # print(self.input_trajectory[local_it, :, :])
@@ -206,10 +203,8 @@ class PIDTrajectoryControl(BaseSolver):
         if it is None:
             it = self.data.ts
 
-        trajectory = np.zeros((len(nodes), 3))
         coordinates = self.data.structure.timestep_info[it - 1].glob_pos(include_rbm=True)
-        for inode in range(len(nodes)):
-            trajectory[inode] = coordinates[nodes[inode], :]
+        trajectory = coordinates[np.asarray(nodes, dtype=int), :]
 
         return trajectory
 
@@ -239,11 +239,8 @@ class PrescribedUvlm(BaseSolver):
 
     def cleanup_timestep_info(self):
         if len(self.data.aero.timestep_info) > 1:
-            # copy last info to first
-            self.data.aero.timestep_info[0] = self.data.aero.timestep_info[-1]
-            # delete all the rest
-            while len(self.data.aero.timestep_info) - 1:
-                del self.data.aero.timestep_info[-1]
+            # keep only the last info, as the first step
+            self.data.aero.timestep_info.restart()
 
         self.data.ts = 0
 
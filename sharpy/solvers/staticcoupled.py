@@ -8,6 +8,7 @@ import sharpy.utils.solver_interface as solver_interface
 from sharpy.utils.solver_interface import solver, BaseSolver
 import sharpy.utils.settings as settings
 import sharpy.utils.algebra as algebra
+import sharpy.utils.coupling as coupling
 
 
 @solver
@@ -45,12 +46,25 @@ class StaticCoupled(BaseSolver):
         self.settings_types['relaxation_factor'] = 'float'
         self.settings_default['relaxation_factor'] = 0.
 
+        # 'prescribed': constant relaxation_factor
+        # 'aitken': Aitken adaptive relaxation, starting every load step from relaxation_factor
+        # 'iqn_ils': interface quasi-Newton with least-squares Jacobian
+        self.settings_types['relaxation_method'] = 'str'
+        self.settings_default['relaxation_method'] = 'prescribed'
+
+        # number of previous load steps whose iterations are reused by iqn_ils
+        self.settings_types['iqn_reuse_steps'] = 'int'
+        self.settings_default['iqn_reuse_steps'] = 0
+
         self.data = None
         self.settings = None
         self.structural_solver = None
         self.aero_solver = None
 
         self.previous_force = None
+        self.accelerator = None
+        # number of iterations of every load step
+        self.n_iterations = []
 
     def initialise(self, data, input_dict=None):
         self.data = data
@@ -66,6 +80,14 @@ class StaticCoupled(BaseSolver):
         self.aero_solver.initialise(self.structural_solver.data, self.settings['aero_solver_settings'])
         self.data = self.aero_solver.data
 
+        # the prescribed relaxation keeps its own implementation below
+        self.accelerator = None
+        if not self.settings['relaxation_method'].lower() == 'prescribed':
+            self.accelerator = coupling.initialise_accelerator(self.settings['relaxation_method'],
+                                                               self.settings['relaxation_factor'].value,
+                                                               reuse_steps=self.settings['iqn_reuse_steps'].value)
+        self.n_iterations = []
+
     def increase_ts(self):
         self.data.ts += 1
         self.structural_solver.next_step()
@@ -73,14 +95,9 @@ class StaticCoupled(BaseSolver):
 
     def cleanup_timestep_info(self):
         if max(len(self.data.aero.timestep_info), len(self.data.structure.timestep_info)) > 1:
-            # copy last info to first
-            self.data.aero.timestep_info[0] = self.data.aero.timestep_info[-1].copy()
-            self.data.structure.timestep_info[0] = self.data.structure.timestep_info[-1].copy()
-            # delete all the rest
-            while len(self.data.aero.timestep_info) - 1:
-                del self.data.aero.timestep_info[-1]
-            while len(self.data.structure.timestep_info) - 1:
-                del self.data.structure.timestep_info[-1]
+            # keep only the last info, as the first step
+            self.data.aero.timestep_info.restart()
+            self.data.structure.timestep_info.restart()
 
         self.data.ts = 0
 
@@ -115,9 +132,17 @@ class StaticCoupled(BaseSolver):
                     self.data.structure.timestep_info[self.data.ts].psi,
                     self.data.structure.node_master_elem,
                     self.data.structure.master,
-                    self.data.structure.timestep_info[self.data.ts].cag())
+                    self.data.structure.timestep_info[self.data.ts].cag(),
+                    operator=self.data.aero.force_mapping)
 
-                if not self.settings['relaxation_factor'].value == 0.:
+                if self.accelerator is not None:
+                    # the structure has not been given any forces yet in the first iteration of the load step
+                    if i_iter == 0:
+                        self.accelerator.reset()
+                    else:
+                        self.accelerator.update((struct_forces, ), (self.previous_force, ))
+                    self.previous_force = struct_forces.copy()
+                elif not self.settings['relaxation_factor'].value == 0.:
                     if i_iter == 0:
                         self.previous_force = struct_forces.copy()
 
@@ -140,6 +165,9 @@ class StaticCoupled(BaseSolver):
 
                 # convergence
                 if self.convergence(i_iter, i_step):
+                    self.n_iterations.append(i_iter + 1)
+                    if self.settings['print_info'].value:
+                        cout.cout_wrap('Load step %u converged in %u iterations' % (i_step, i_iter + 1), 1)
                     # create q and dqdt vectors
                     self.structural_solver.update(self.data.structure.timestep_info[self.data.ts])
                     self.cleanup_timestep_info()
@@ -180,11 +208,9 @@ class StaticCoupled(BaseSolver):
 
     def change_trim(self, alpha, thrust, thrust_nodes, tail_deflection, tail_cs_index):
         # self.cleanup_timestep_info()
-        self.data.structure.timestep_info = []
+        self.data.structure.timestep_info.clear()
         self.data.structure.timestep_info.append(self.data.structure.ini_info.copy())
-        aero_copy = self.data.aero.timestep_info[-1]
-        self.data.aero.timestep_info = []
-        self.data.aero.timestep_info.append(aero_copy)
+        self.data.aero.timestep_info.restart()
         self.data.ts = 0
         # alpha
         orientation_quat = algebra.euler2quat(np.array([0.0, alpha, 0.0]))
@@ -217,7 +243,7 @@ class StaticCoupled(BaseSolver):
 
         # tail deflection
         try:
-            self.data.aero.aero_dict['control_surface_deflection'][tail_cs_index] = tail_deflection
+            self.data.aero.set_control_surface_deflection(tail_cs_index, tail_deflection)
         except KeyError:
             raise Exception('This model has no control surfaces')
         except IndexError:
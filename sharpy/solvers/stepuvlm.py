@@ -76,7 +76,8 @@ class StepUvlm(BaseSolver):
             structure_tstep=None,
             convect_wake=True,
             dt=None,
-            t=None):
+            t=None,
+            previous_dt=None):
 
         if aero_tstep is None:
             aero_tstep = self.data.aero.timestep_info[-1]
@@ -118,7 +119,7 @@ class StepUvlm(BaseSolver):
         # print('current step max unsforce: %f' % aero_tstep.dynamic_forces[0].max())
 
         # calculate unsteady (added mass) forces:
-        self.data.aero.compute_gamma_dot(dt, aero_tstep, self.data.aero.timestep_info[-3:-1])
+        self.compute_gamma_dot(aero_tstep, dt, previous_dt)
         uvlmlib.uvlm_calculate_unsteady_forces(aero_tstep,
                                                structure_tstep,
                                                self.settings,
@@ -126,6 +127,25 @@ class StepUvlm(BaseSolver):
                                                dt=dt)
         return self.data
 
+    def compute_gamma_dot(self, aero_tstep, dt, previous_dt=None):
+        """
+        Computes ``gamma_dot`` of ``aero_tstep`` from the two previous steps.
+
+        If ``aero_tstep`` is the last step of the history, those are the two before it. Otherwise it is a
+        scratch copy of the new step (as in the coupled solvers), which is committed after the last step, and
+        those are the two last ones.
+
+        :param aero_tstep: current step
+        :param dt: time step between the previous and the current step
+        :param previous_dt: time step between the two previous steps, if different from ``dt``
+        """
+        history = self.data.aero.timestep_info
+        if len(history) and aero_tstep is history[-1]:
+            previous_tsteps = history[-3:-1]
+        else:
+            previous_tsteps = history[-2:]
+        self.data.aero.compute_gamma_dot(dt, aero_tstep, previous_tsteps, previous_dt)
+
     def add_step(self):
         self.data.aero.add_timestep()
 
@@ -184,14 +184,9 @@ class Trim(BaseSolver):
 
     def cleanup_timestep_info(self):
         if max(len(self.data.aero.timestep_info), len(self.data.structure.timestep_info)) > 1:
-            # copy last info to first
-            self.data.aero.timestep_info[0] = self.data.aero.timestep_info[-1]
-            self.data.structure.timestep_info[0] = self.data.structure.timestep_info[-1]
-            # delete all the rest
-            while len(self.data.aero.timestep_info) - 1:
-                del self.data.aero.timestep_info[-1]
-            while len(self.data.structure.timestep_info) - 1:
-                del self.data.structure.timestep_info[-1]
+            # keep only the last info, as the first step
+            self.data.aero.timestep_info.restart()
+            self.data.structure.timestep_info.restart()
 
         self.data.ts = 0
 
@@ -268,7 +263,8 @@ def solver_wrapper(x, x_info, solver_data, i_dim=-1):
     tstep.quat[:] = orientation_quat
     # control surface deflection
     for i_cs in range(len(x_info['i_control_surfaces'])):
-        solver_data.data.aero.aero_dict['control_surface_deflection'][x_info['control_surfaces_id'][i_cs]] = x[x_info['i_control_surfaces'][i_cs]]
+        solver_data.data.aero.set_control_surface_deflection(x_info['control_surfaces_id'][i_cs],
+                                                             x[x_info['i_control_surfaces'][i_cs]])
     # thrust input
     tstep.steady_applied_forces[:] = 0.0
     try:
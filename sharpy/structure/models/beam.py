@@ -1,10 +1,11 @@
+import collections
 import ctypes as ct
 import numpy as np
 
 from sharpy.structure.basestructure import BaseStructure
 import sharpy.structure.models.beamstructures as beamstructures
 import sharpy.utils.algebra as algebra
-from sharpy.utils.datastructures import StructTimeStepInfo
+from sharpy.utils.datastructures import StructTimeStepInfo, TimeStepHistory
 
 
 class Beam(BaseStructure):
@@ -15,9 +16,9 @@ class Beam(BaseStructure):
         self.num_node = -1
         self.num_elem = -1
 
-        self.timestep_info = []
+        self.timestep_info = TimeStepHistory()
         self.ini_info = None
-        self.dynamic_input = []
+        self.dynamic_input = DynamicInput(0)
 
         self.connectivities = None
 
@@ -54,6 +55,8 @@ class Beam(BaseStructure):
 
         self.fortran = dict()
 
+        self.nodal_operators = NodalOperatorCache()
+
     def generate(self, in_data, settings):
         self.settings = settings
         # read and store data
@@ -162,50 +165,8 @@ class Beam(BaseStructure):
 
     def add_unsteady_information(self, dyn_dict, num_steps):
         # data storage for time dependant input
-        for it in range(num_steps):
-            self.dynamic_input.append(dict())
-
-        try:
-            for it in range(num_steps):
-                self.dynamic_input[it]['dynamic_forces'] = dyn_dict['dynamic_forces'][it, :, :]
-        except KeyError:
-            for it in range(num_steps):
-                self.dynamic_input[it]['dynamic_forces'] = np.zeros((self.num_node, 6), dtype=ct.c_double, order='F')
-
-        try:
-            for it in range(num_steps):
-                self.dynamic_input[it]['for_pos'] = dyn_dict['for_pos'][it, :]
-        except KeyError:
-            for it in range(num_steps):
-                self.dynamic_input[it]['for_pos'] = np.zeros((6, ), dtype=ct.c_double, order='F')
-
-        try:
-            for it in range(num_steps):
-                self.dynamic_input[it]['for_vel'] = dyn_dict['for_vel'][it, :]
-        except KeyError:
-            for it in range(num_steps):
-                self.dynamic_input[it]['for_vel'] = np.zeros((6, ), dtype=ct.c_double, order='F')
-
-        try:
-            for it in range(num_steps):
-                self.dynamic_input[it]['for_acc'] = dyn_dict['for_acc'][it, :]
-        except KeyError:
-            for it in range(num_steps):
-                self.dynamic_input[it]['for_acc'] = np.zeros((6, ), dtype=ct.c_double, order='F')
-
-        # try:
-        #     for it in range(num_steps):
-        #         self.dynamic_input[it]['trayectories'] = dyn_dict['trayectories'][it, :, :]
-        # except KeyError:
-        #     for it in range(num_steps):
-        #         self.dynamic_input[it]['trayectories'] = None
-
-        try:
-            for it in range(num_steps):
-                self.dynamic_input[it]['enforce_trajectory'] = dyn_dict['enforce_trayectory'][it, :, :]
-        except KeyError:
-            for it in range(num_steps):
-                self.dynamic_input[it]['enforce_trajectory'] = np.zeros((self.num_node, 3), dtype=bool)
+        num_steps = max(num_steps, len(self.dynamic_input))
+        self.dynamic_input = DynamicInput(self.num_node, num_steps, dyn_dict)
 
     def generate_dof_arrays(self):
         self.vdof = np.zeros((self.num_node,), dtype=ct.c_int, order='F') - 1
@@ -295,6 +256,8 @@ class Beam(BaseStructure):
         if len(timestep_info) == 0:
             # copy from ini_info
             timestep_info.append(self.ini_info.copy())
+        elif isinstance(timestep_info, TimeStepHistory):
+            timestep_info.append_copy(self.timestep_info[-1])
         else:
             timestep_info.append(self.timestep_info[-1].copy())
 
@@ -410,35 +373,163 @@ class Beam(BaseStructure):
         #     dt*np.dot(self.timestep_info[ts].cga(),
         #               self.timestep_info[ts].for_vel[3:6]))
 
+    def nodal_psi(self, tstep):
+        """
+        Returns the ``(num_node, 3)`` CRVs of the nodes, taken from their master elements.
+        """
+        return tstep.psi[self.node_master_elem[:, 0], self.node_master_elem[:, 1], :]
+
+    def nodal_cab(self, tstep):
+        """
+        Returns the ``(num_node, 3, 3)`` rotation matrices from B to A of the nodes of ``tstep``.
+        """
+        return self.nodal_operators.get(tstep, 'cab', self.nodal_psi(tstep), algebra.crv2rot_vec)
+
+    def nodal_inv_tant(self, tstep):
+        """
+        Returns the ``(num_node, 3, 3)`` inverses of the transposed tangential operators of the nodes of ``tstep``.
+        """
+        return self.nodal_operators.get(tstep, 'inv_tant', self.nodal_psi(tstep), algebra.crv2invtant_vec)
+
     def nodal_b_for_2_a_for(self, nodal, tstep, filter=np.array([True]*6)):
-        nodal_a = nodal.copy(order='F')
-        for i_node in range(self.num_node):
-            # get master elem and i_local_node
-            i_master_elem, i_local_node = self.node_master_elem[i_node, :]
-            crv = tstep.psi[i_master_elem, i_local_node, :]
-            cab = algebra.crv2rot(crv)
-            temp = np.zeros((6,))
-            temp[0:3] = np.dot(cab, nodal[i_node, 0:3])
-            temp[3:6] = np.dot(cab, nodal[i_node, 3:6])
-            for i in range(6):
-                if filter[i]:
-                    nodal_a[i_node, i] = temp[i]
-
-        return nodal_a
+        return premultiply_nodal(self.nodal_cab(tstep), nodal, filter)
 
     def nodal_premultiply_inv_T_transpose(self, nodal, tstep, filter=np.array([True]*6)):
-        # nodal_t = np.zeros_like(nodal, dtype=ct.c_double, order='F')
-        nodal_t = nodal.copy(order='F')
-        for i_node in range(self.num_node):
-            # get master elem and i_local_node
-            i_master_elem, i_local_node = self.node_master_elem[i_node, :]
-            crv = tstep.psi[i_master_elem, i_local_node, :]
-            inv_tanT = algebra.crv2invtant(crv)
-            temp = np.zeros((6,))
-            temp[0:3] = np.dot(inv_tanT, nodal[i_node, 0:3])
-            temp[3:6] = np.dot(inv_tanT, nodal[i_node, 3:6])
-            for i in range(6):
-                if filter[i]:
-                    nodal_t[i_node, i] = temp[i]
-
-        return nodal_t
+        return premultiply_nodal(self.nodal_inv_tant(tstep), nodal, filter)
+
+
+def premultiply_nodal(operators, nodal, filter=np.array([True]*6)):
+    """
+    Premultiplies the force and moment of every node by its ``(3, 3)`` operator.
+
+    :param operators: (num_node, 3, 3) operators
+    :param nodal: (num_node, 6) nodal forces and moments
+    :param filter: components that are transformed, the others are copied from ``nodal``
+    :return: (num_node, 6) transformed forces and moments
+    """
+    filter = np.asarray(filter, dtype=bool)
+    nodal_out = nodal.copy(order='F')
+    num_node = nodal.shape[0]
+    transformed = np.einsum('nij,nkj->nki', operators, nodal.reshape((num_node, 2, 3))).reshape((num_node, 6))
+    nodal_out[:, filter] = transformed[:, filter]
+    return nodal_out
+
+
+class NodalOperatorCache(object):
+    """
+    Cache of the nodal operators (functions of the nodal CRVs) of the last time steps used.
+
+    The operators of a time step are recomputed only if its CRVs have changed.
+    """
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+
+    def get(self, tstep, name, psi, function):
+        key = (id(tstep), name)
+        entry = self.entries.get(key)
+        if entry is not None and np.array_equal(entry[0], psi):
+            self.entries.move_to_end(key)
+            return entry[1]
+
+        operators = function(psi)
+        self.entries[key] = (psi.copy(), operators)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return operators
+
+
+class DynamicInput(object):
+    """
+    Time dependent input of the structure (``dynamic_forces``, ``for_pos``, ``for_vel``, ``for_acc`` and
+    ``enforce_trajectory``), stored as ``(n_steps, ...)`` arrays.
+
+    The inputs present in ``dyn_dict`` are views of its arrays. The missing ones are not allocated: every
+    step returns a shared read-only zero array until :meth:`writable` is called for them.
+
+    Indexing by time step returns a :class:`DynamicInputStep`, so that ``dynamic_input[ts]['dynamic_forces']``
+    works as with the previous list of dictionaries.
+    """
+    # input name: (key in dyn_dict, shape of every step with None for the number of nodes, dtype)
+    fields = collections.OrderedDict((
+        ('dynamic_forces', ('dynamic_forces', (None, 6), ct.c_double)),
+        ('for_pos', ('for_pos', (6, ), ct.c_double)),
+        ('for_vel', ('for_vel', (6, ), ct.c_double)),
+        ('for_acc', ('for_acc', (6, ), ct.c_double)),
+        ('enforce_trajectory', ('enforce_trayectory', (None, 3), bool))))
+
+    def __init__(self, num_node, n_steps=0, dyn_dict=None):
+        self.n_steps = n_steps
+
+        if dyn_dict is None:
+            dyn_dict = dict()
+        self.columns = dict()
+        self.zeros = dict()
+        for name, (key, shape, dtype) in self.fields.items():
+            try:
+                self.columns[name] = np.asarray(dyn_dict[key], dtype=dtype)[:n_steps, ...]
+            except KeyError:
+                shape = tuple(num_node if n is None else n for n in shape)
+                zeros = np.zeros(shape, dtype=dtype, order='F')
+                zeros.flags.writeable = False
+                self.zeros[name] = zeros
+
+    def __len__(self):
+        return self.n_steps
+
+    def __getitem__(self, it):
+        if it < 0:
+            it += self.n_steps
+        if not 0 <= it < self.n_steps:
+            raise IndexError('Time step %u out of the dynamic input range' % it)
+        return DynamicInputStep(self, it)
+
+    def __iter__(self):
+        for it in range(self.n_steps):
+            yield DynamicInputStep(self, it)
+
+    def values(self, name):
+        """
+        Returns the ``(n_steps, ...)`` array of the input ``name``. Missing inputs are returned as a read-only
+        broadcast of the zero default, which does not allocate memory.
+        """
+        try:
+            return self.columns[name]
+        except KeyError:
+            zeros = self.zeros[name]
+            return np.broadcast_to(zeros, (self.n_steps, ) + zeros.shape)
+
+    def writable(self, name):
+        """
+        Returns the ``(n_steps, ...)`` array of the input ``name``, allocating it if it was missing.
+        """
+        if name not in self.columns:
+            zeros = self.zeros.pop(name)
+            self.columns[name] = np.zeros((self.n_steps, ) + zeros.shape, dtype=zeros.dtype)
+        return self.columns[name]
+
+
+class DynamicInputStep(object):
+    """
+    Inputs of a single time step of :class:`DynamicInput`, accessed as a dictionary.
+    """
+    def __init__(self, dynamic_input, it):
+        self.dynamic_input = dynamic_input
+        self.it = it
+
+    def __getitem__(self, name):
+        if name not in self.dynamic_input.fields:
+            raise KeyError(name)
+        return self.dynamic_input.values(name)[self.it]
+
+    def __setitem__(self, name, value):
+        if name not in self.dynamic_input.fields:
+            raise KeyError(name)
+        self.dynamic_input.writable(name)[self.it] = value
+
+    def __contains__(self, name):
+        return name in self.dynamic_input.fields
+
+    def keys(self):
+        return self.dynamic_input.fields.keys()
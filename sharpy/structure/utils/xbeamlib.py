@@ -500,8 +500,7 @@ def xbeam_solv_couplednlndyn(beam, settings):
     psi_dot_def_history = np.zeros((n_tsteps.value, beam.num_elem, 3, 3), order='F', dtype=ct.c_double)
 
     dynamic_force = np.zeros((n_nodes.value, 6, n_tsteps.value), dtype=ct.c_double, order='F')
-    for it in range(n_tsteps.value):
-        dynamic_force[:, :, it] = beam.dynamic_input[it]['dynamic_forces']
+    dynamic_force[:] = np.moveaxis(beam.dynamic_input.values('dynamic_forces')[:n_tsteps.value, :, :], 0, -1)
 
     # status flag
     success = ct.c_bool(True)
@@ -554,10 +553,10 @@ def xbeam_solv_couplednlndyn(beam, settings):
     for_pos[:, 2] = sc.integrate.cumtrapz(for_vel[:, 2], dx=dt.value, initial=0)
 
     glob_pos_def = np.zeros_like(pos_def_history)
-    for it in range(n_tsteps.value):
-        rot = algebra.quat2rot(quat_history[it, :]).transpose()
-        for inode in range(beam.num_node):
-            glob_pos_def[it, inode, :] = np.dot(rot.T, pos_def_history[it, inode, :])
+    cga = algebra.quat2rot_vec(quat_history[:n_tsteps.value, :])
+    glob_pos_def[:n_tsteps.value, :, :] = np.einsum('tij,tnj->tni',
+                                                    cga,
+                                                    pos_def_history[:n_tsteps.value, :, :])
 
     for i in range(n_tsteps.value - 1):
         beam.timestep_info[i + 1].pos[:] = pos_def_history[i+1, :]
@@ -143,6 +143,22 @@ def skew(vector):
     return matrix
 
 
+def skew_vec(vectors):
+    '''
+    Vectorised version of skew: returns the (n, 3, 3) array of skew-symmetric
+    matrices of the (n, 3) array of vectors.
+    '''
+    vectors = np.asarray(vectors).reshape((-1, 3))
+    matrix = np.zeros((vectors.shape[0], 3, 3))
+    matrix[:, 1, 2] = -vectors[:, 0]
+    matrix[:, 2, 0] = -vectors[:, 1]
+    matrix[:, 0, 1] = -vectors[:, 2]
+    matrix[:, 2, 1] = vectors[:, 0]
+    matrix[:, 0, 2] = vectors[:, 1]
+    matrix[:, 1, 0] = vectors[:, 2]
+    return matrix
+
+
 def triad2rot(xb, yb, zb):
     """
     If the input triad is the "b" coord system given in "a" frame,
@@ -195,6 +211,25 @@ def rot2crv(rot):
     return crv
 
 
+def rot2crv_vec(rot):
+    '''
+    Vectorised version of rot2crv: given the (n, 3, 3) array of rotation
+    matrices, returns the (n, 3) array of Cartesian rotation vectors.
+    '''
+    rot = np.asarray(rot, dtype=float).reshape((-1, 3, 3))
+    if np.any(np.linalg.norm(rot, axis=(1, 2)) < 1e-6):
+        raise AttributeError('Element Vector V is not orthogonal to reference line (51105)')
+
+    crv = quat2crv_vec(mat2quat_vec(rot))
+
+    small = np.linalg.norm(crv, axis=1) < 1.0e-15
+    crv[small, 0] = rot[small, 1, 2]
+    crv[small, 1] = rot[small, 2, 0]
+    crv[small, 2] = rot[small, 0, 1]
+
+    return crv_bounds_vec(crv)
+
+
 def mat2quat(mat):
     matT = mat.T
 
@@ -232,6 +267,48 @@ def mat2quat(mat):
     return quat
 
 
+def mat2quat_vec(mat):
+    '''
+    Vectorised version of mat2quat: given the (n, 3, 3) array of rotation
+    matrices, returns the (n, 4) array of quaternions.
+    '''
+    mat = np.asarray(mat, dtype=float).reshape((-1, 3, 3))
+    n_mat = mat.shape[0]
+    matT = np.transpose(mat, (0, 2, 1))
+
+    s = np.zeros((n_mat, 4, 4))
+
+    s[:, 0, 0] = 1.0 + np.trace(matT, axis1=1, axis2=2)
+    s[:, 0, 1] = matT[:, 2, 1] - matT[:, 1, 2]
+    s[:, 0, 2] = matT[:, 0, 2] - matT[:, 2, 0]
+    s[:, 0, 3] = matT[:, 1, 0] - matT[:, 0, 1]
+
+    s[:, 1, 0] = matT[:, 2, 1] - matT[:, 1, 2]
+    s[:, 1, 1] = 1.0 + matT[:, 0, 0] - matT[:, 1, 1] - matT[:, 2, 2]
+    s[:, 1, 2] = matT[:, 0, 1] + matT[:, 1, 0]
+    s[:, 1, 3] = matT[:, 0, 2] + matT[:, 2, 0]
+
+    s[:, 2, 0] = matT[:, 0, 2] - matT[:, 2, 0]
+    s[:, 2, 1] = matT[:, 1, 0] + matT[:, 0, 1]
+    s[:, 2, 2] = 1.0 - matT[:, 0, 0] + matT[:, 1, 1] - matT[:, 2, 2]
+    s[:, 2, 3] = matT[:, 1, 2] + matT[:, 2, 1]
+
+    s[:, 3, 0] = matT[:, 1, 0] - matT[:, 0, 1]
+    s[:, 3, 1] = matT[:, 0, 2] + matT[:, 2, 0]
+    s[:, 3, 2] = matT[:, 1, 2] + matT[:, 2, 1]
+    s[:, 3, 3] = 1.0 - matT[:, 0, 0] - matT[:, 1, 1] + matT[:, 2, 2]
+
+    # row of the largest diagonal term of every matrix
+    i_mat = np.arange(n_mat)
+    ismax = np.argmax(np.diagonal(s, axis1=1, axis2=2), axis=1)
+    smax = s[i_mat, ismax, ismax]
+
+    qmax = 0.5*np.sqrt(smax)
+    quat = 0.25*s[i_mat, ismax, :]/qmax[:, None]
+    quat[i_mat, ismax] = qmax
+    return quat
+
+
 def matrix2skewvec(matrix):
     vector = np.array([matrix[2, 1] - matrix[1, 2],
                        matrix[0, 2] - matrix[2, 0],
@@ -251,6 +328,19 @@ def quat2crv(quat):
     return psi
 
 
+def quat2crv_vec(quat):
+    '''
+    Vectorised version of quat2crv: given the (n, 4) array of quaternions,
+    returns the (n, 3) array of Cartesian rotation vectors.
+    '''
+    quat = np.asarray(quat, dtype=float).reshape((-1, 4))
+    crv_norm = 2.0*np.arccos(np.clip(quat[:, 0], -1.0, 1.0))
+
+    small = np.abs(crv_norm) < 1e-15
+    factor = np.where(small, 0.0, crv_norm/np.sin(np.where(small, 1.0, crv_norm*0.5)))
+    return factor[:, None]*quat[:, 1:4]
+
+
 def crv_bounds(crv_ini):
     crv = crv_ini.copy()
     # original norm
@@ -271,6 +361,23 @@ def crv_bounds(crv_ini):
     return crv
 
 
+def crv_bounds_vec(crv_ini):
+    '''
+    Vectorised version of crv_bounds for an (n, 3) array of Cartesian
+    rotation vectors.
+    '''
+    crv_ini = np.asarray(crv_ini, dtype=float).reshape((-1, 3))
+    norm_ini = np.linalg.norm(crv_ini, axis=1)
+
+    # force the norm to be in [-pi, pi]
+    norm = norm_ini - 2.0*np.pi*np.trunc(norm_ini/(2*np.pi))
+    norm = np.where(norm > np.pi, norm - 2.0*np.pi, norm)
+
+    zero = norm == 0.0
+    factor = np.where(zero, 0.0, norm/np.where(zero, 1.0, norm_ini))
+    return crv_ini*factor[:, None]
+
+
 def triad2crv(xb, yb, zb):
     return rot2crv(triad2rot(xb, yb, zb))
 
@@ -304,6 +411,28 @@ def crv2rot(psi):
     return rot_matrix
 
 
+def crv2rot_vec(psi):
+    '''
+    Vectorised version of crv2rot: given an array of Cartesian rotation vectors
+    psi of shape (n, 3), returns the (n, 3, 3) array of rotation matrices.
+    '''
+    psi = np.asarray(psi, dtype=float).reshape((-1, 3))
+    norm_psi = np.linalg.norm(psi, axis=1)
+
+    # rot = I + a*skew(psi) + b*skew(psi)^2
+    small = norm_psi < 1e-15
+    safe_norm = np.where(small, 1.0, norm_psi)
+    a = np.where(small, 1.0, np.sin(safe_norm)/safe_norm)
+    b = np.where(small, 0.5, (1.0 - np.cos(safe_norm))/safe_norm**2)
+
+    skew_psi = skew_vec(psi)
+    rot_matrix = np.zeros((psi.shape[0], 3, 3))
+    rot_matrix[:, [0, 1, 2], [0, 1, 2]] = 1.0
+    rot_matrix += a[:, None, None]*skew_psi
+    rot_matrix += b[:, None, None]*np.matmul(skew_psi, skew_psi)
+    return rot_matrix
+
+
 def crv2tan(psi):
     norm_psi = np.linalg.norm(psi)
     psi_skew = skew(psi)
@@ -327,28 +456,58 @@ def crv2tan(psi):
         return np.eye(3) + k1*psi_skew + k2*np.dot(psi_skew, psi_skew)
 
 
+def crv2tan_vec(psi):
+    '''
+    Vectorised version of crv2tan: given an array of Cartesian rotation vectors
+    psi of shape (n, 3), returns the (n, 3, 3) array of tangential operators.
+    '''
+    psi = np.asarray(psi, dtype=float).reshape((-1, 3))
+    norm_psi = np.linalg.norm(psi, axis=1)
+
+    # tan = I + k1*skew(psi) + k2*skew(psi)^2
+    small = norm_psi < 1e-8
+    safe_norm = np.where(small, 1.0, norm_psi)
+    k1 = np.where(small, -0.5, (np.cos(safe_norm) - 1.0)/safe_norm**2)
+    k2 = np.where(small, 1.0/6.0, (1.0 - np.sin(safe_norm)/safe_norm)/safe_norm**2)
+
+    skew_psi = skew_vec(psi)
+    tan = np.zeros((psi.shape[0], 3, 3))
+    tan[:, [0, 1, 2], [0, 1, 2]] = 1.0
+    tan += k1[:, None, None]*skew_psi
+    tan += k2[:, None, None]*np.matmul(skew_psi, skew_psi)
+    return tan
+
+
 def crv2invtant(psi):
     tan = crv2tan(psi).T
     return np.linalg.inv(tan)
 
 
-def triad2crv_vec(v1, v2, v3):
-    n_nodes, _ = v1.shape
-    crv_vec = np.zeros((n_nodes, 3))
-    for inode in range(n_nodes):
-        crv_vec[inode, :] = triad2crv(v1[inode, :], v2[inode, :], v3[inode, :])
+def crv2invtant_vec(psi):
+    '''
+    Vectorised version of crv2invtant: given an array of Cartesian rotation
+    vectors psi of shape (n, 3), returns the (n, 3, 3) array of inverses of the
+    transposed tangential operators.
+    '''
+    tan = crv2tan_vec(psi)
+    return np.linalg.inv(np.transpose(tan, (0, 2, 1)))
 
-    return crv_vec
+
+def triad2crv_vec(v1, v2, v3):
+    '''
+    Vectorised version of triad2crv: given the (n, 3) arrays of the triad
+    vectors, returns the (n, 3) array of Cartesian rotation vectors.
+    '''
+    return rot2crv_vec(np.stack((v1, v2, v3), axis=1))
 
 
 def crv2triad_vec(crv_vec):
-    n_nodes, _ = crv_vec.shape
-    v1 = np.zeros((n_nodes, 3))
-    v2 = np.zeros((n_nodes, 3))
-    v3 = np.zeros((n_nodes, 3))
-    for inode in range(n_nodes):
-        v1[inode, :], v2[inode, :], v3[inode, :] = crv2triad(crv_vec[inode, :])
-    return v1, v2, v3
+    '''
+    Vectorised version of crv2triad: given the (n, 3) array of Cartesian
+    rotation vectors, returns the three (n, 3) arrays of triad vectors.
+    '''
+    rot_matrix = crv2rot_vec(crv_vec)
+    return rot_matrix[:, :, 0].copy(), rot_matrix[:, :, 1].copy(), rot_matrix[:, :, 2].copy()
 
 
 def quat2rot(q1):
@@ -384,6 +543,33 @@ def quat2rot(q1):
     return rot_mat
 
 
+def quat2rot_vec(quat):
+    '''
+    Vectorised version of quat2rot: given the (n, 4) array of quaternions,
+    returns the (n, 3, 3) array of rotation matrices.
+    '''
+    q = np.asarray(quat, dtype=float).reshape((-1, 4))
+    q = q/np.linalg.norm(q, axis=1)[:, None]
+    q0, q1, q2, q3 = q.T
+
+    rot_mat = np.zeros((q.shape[0], 3, 3))
+
+    rot_mat[:, 0, 0] = q0**2 + q1**2 - q2**2 - q3**2
+    rot_mat[:, 1, 1] = q0**2 - q1**2 + q2**2 - q3**2
+    rot_mat[:, 2, 2] = q0**2 - q1**2 - q2**2 + q3**2
+
+    rot_mat[:, 0, 1] = 2.*(q1*q2 + q0*q3)
+    rot_mat[:, 1, 0] = 2.*(q1*q2 - q0*q3)
+
+    rot_mat[:, 0, 2] = 2.*(q1*q3 - q0*q2)
+    rot_mat[:, 2, 0] = 2.*(q1*q3 + q0*q2)
+
+    rot_mat[:, 1, 2] = 2.*(q2*q3 + q0*q1)
+    rot_mat[:, 2, 1] = 2.*(q2*q3 - q0*q1)
+
+    return rot_mat
+
+
 def rot_skew(vec):
     from warnings import warn
     warn("use 'skew' function instead of 'rot_skew'")
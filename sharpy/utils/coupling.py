@@ -0,0 +1,465 @@
+import collections
+
+import numpy as np
+
+
+def initialise_accelerator(method, relaxation_factor, prescribed_factor=None, reuse_steps=0):
+    """
+    Returns the coupling accelerator given by the ``relaxation_method`` setting of the coupled solvers.
+
+    Args:
+        method (str): ``prescribed``, ``aitken`` or ``iqn_ils``
+        relaxation_factor (float): relaxation factor (weight of the previous forces) of the first iteration
+        prescribed_factor (callable): factor as a function of the iteration for ``prescribed``.
+            If ``None``, ``relaxation_factor`` is used in every iteration.
+        reuse_steps (int): number of previous time steps whose iterations are reused by ``iqn_ils``
+
+    Returns:
+        BaseCouplingAccelerator: accelerator
+    """
+    method = method.lower()
+    if method == 'prescribed':
+        if prescribed_factor is None:
+            return PrescribedRelaxation(relaxation_factor)
+        return PrescribedRelaxation(prescribed_factor)
+    elif method == 'aitken':
+        return AitkenRelaxation(relaxation_factor)
+    elif method == 'iqn_ils':
+        return IQNILS(relaxation_factor, reuse_steps)
+    raise NotImplementedError('relaxation_method %s is not implemented' % method)
+
+
+# coefficients of the polynomial extrapolation of a step from the previous ones (oldest first)
+extrapolation_coefficients = {0: (1.0, ),
+                              1: (-1.0, 2.0),
+                              2: (1.0, -3.0, 3.0)}
+
+
+def extrapolate(steps, attributes, out, times=None, time=None):
+    """
+    Polynomial extrapolation of the next step from the previous ones.
+
+    The order of the polynomial is ``len(steps) - 1`` (up to quadratic). The steps are equally spaced in time,
+    unless ``times`` and ``time`` are given.
+
+    Args:
+        steps (list): previous steps, the most recent last
+        attributes (list(str)): names of the array attributes of the steps to extrapolate
+        out: step in which the extrapolated attributes are written
+        times (list(float)): time of every step in ``steps``
+        time (float): time of the extrapolated step
+    """
+    if times is None:
+        coefficients = extrapolation_coefficients[len(steps) - 1]
+    else:
+        coefficients = extrapolation_weights(times, time)
+    for attribute in attributes:
+        destination = getattr(out, attribute)
+        destination[...] = coefficients[0]*getattr(steps[0], attribute)
+        for coefficient, step in zip(coefficients[1:], steps[1:]):
+            destination += coefficient*getattr(step, attribute)
+
+
+def extrapolation_weights(times, time):
+    """
+    Returns the weights of the Lagrange polynomial through ``times`` evaluated at ``time``.
+    """
+    weights = np.ones((len(times), ))
+    for i in range(len(times)):
+        for j in range(len(times)):
+            if not i == j:
+                weights[i] *= (time - times[j])/(times[i] - times[j])
+    return weights
+
+
+def run_structural_substeps(structural_solver, structural_kstep, committed, dt, n_substeps, interpolate=True,
+                            forces=None):
+    """
+    Integrates the structure over ``dt`` in ``n_substeps`` calls to ``structural_solver.run`` of length
+    ``dt/n_substeps``, starting from the state in ``structural_kstep``.
+
+    The loads of every substep are interpolated between the ones of the ``committed`` step and the new ones of
+    ``structural_kstep`` (or held at the new ones if ``interpolate`` is ``False``). The new loads are restored
+    in ``structural_kstep`` at the end. With a single substep this is a single call to ``structural_solver.run``.
+
+    Args:
+        structural_solver: solver advancing ``structural_step`` in place by ``dt``
+        structural_kstep (StructTimeStepInfo): step integrated, holding the new loads
+        committed (StructTimeStepInfo): last committed step, holding the previous loads
+        dt (float): time step
+        n_substeps (int): number of substeps
+        interpolate (bool): interpolate the loads of the substeps
+        forces (tuple(np.ndarray)): buffers for the new steady and unsteady loads. If ``None``, they are allocated.
+
+    Returns:
+        the value returned by the last call to ``structural_solver.run``
+    """
+    if forces is None:
+        forces = (structural_kstep.steady_applied_forces.copy(order='F'),
+                  structural_kstep.unsteady_applied_forces.copy(order='F'))
+    steady_forces, unsteady_forces = forces
+    steady_forces[:] = structural_kstep.steady_applied_forces
+    unsteady_forces[:] = structural_kstep.unsteady_applied_forces
+
+    data = None
+    for i_substep in range(1, n_substeps + 1):
+        if interpolate and i_substep < n_substeps:
+            weight = i_substep/n_substeps
+            for substep_forces, new, old in ((structural_kstep.steady_applied_forces,
+                                              steady_forces,
+                                              committed.steady_applied_forces),
+                                             (structural_kstep.unsteady_applied_forces,
+                                              unsteady_forces,
+                                              committed.unsteady_applied_forces)):
+                np.multiply(old, 1.0 - weight, out=substep_forces)
+                substep_forces += weight*new
+        else:
+            structural_kstep.steady_applied_forces[:] = steady_forces
+            structural_kstep.unsteady_applied_forces[:] = unsteady_forces
+        data = structural_solver.run(structural_step=structural_kstep, dt=dt/n_substeps)
+    return data
+
+
+def input_index(time, dt, n_inputs):
+    """
+    Returns the index of the prescribed input closest to ``time``, for inputs given every ``dt`` from ``t = 0``.
+    The index is clipped to the ``n_inputs`` inputs available.
+    """
+    index = int(round(time/dt))
+    return min(max(index, 0), n_inputs - 1)
+
+
+class AdaptiveTimeStep(object):
+    """
+    Time step controller of the coupled dynamic simulations.
+
+    The local error is estimated with the difference between the structural state predicted by linear
+    extrapolation from the previous steps and the converged one, which is of second order in the time step.
+    The FSI convergence also limits the time step: it is halved after a step that does not converge and it
+    does not grow when more than half of the allowed sub-iterations were needed.
+
+    The steps are never rejected: a step that does not converge or exceeds the tolerance is committed and only
+    the following one is shortened.
+
+    Args:
+        dt_min (float): minimum time step
+        dt_max (float): maximum time step
+        tolerance (float): target local error, relative to ``1 + |q|``
+        max_iterations (int): maximum number of FSI sub-iterations
+        safety (float): safety factor applied to the optimal time step
+        max_growth (float): maximum ratio between consecutive time steps
+    """
+    def __init__(self, dt_min, dt_max, tolerance, max_iterations, safety=0.9, max_growth=2.0):
+        self.dt_min = dt_min
+        self.dt_max = dt_max
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        self.safety = safety
+        self.max_growth = max_growth
+        self.error = None
+
+    def estimate_error(self, predicted, corrected):
+        self.error = np.linalg.norm(corrected - predicted)/(self.tolerance*(1.0 + np.linalg.norm(corrected)))
+        return self.error
+
+    def next_dt(self, dt, n_iterations, converged=True):
+        """
+        Returns the time step following a step of length ``dt``, after ``estimate_error`` has been called on it
+        (the error is not considered otherwise).
+        """
+        if not converged:
+            factor = 0.5
+        elif self.error is None:
+            factor = 1.0
+        elif self.error > 0.:
+            factor = min(max(self.safety*self.error**-0.5, 0.5), self.max_growth)
+        else:
+            factor = self.max_growth
+        if n_iterations > 0.5*self.max_iterations:
+            factor = min(factor, 1.0)
+        self.error = None
+        return min(max(dt*factor, self.dt_min), self.dt_max)
+
+
+class StructuralResidual(object):
+    """
+    Convergence residuals of the structural state (``q``, ``dqdt`` and ``dqddt``) between two FSI sub-iterations.
+
+    The difference of every field is written in a preallocated buffer and the norms are computed on views of
+    it, so no temporaries are allocated. A block converges when
+
+    .. math:: \|x_k - x_{k-1}\| \le \epsilon_{abs} + \epsilon_{rel} \|x_{k-1}\|
+
+    The residuals reported are relative, :math:`\|x_k - x_{k-1}\|/\|x_{k-1}\|`, or absolute if
+    :math:`x_{k-1} = 0`.
+
+    Args:
+        n_dof (int): size of the state vectors
+        rel_tolerance (float): relative tolerance
+        abs_tolerance (float): absolute tolerance
+        blocks (bool): evaluate the flexible, rigid body and quaternion degrees of freedom separately. Otherwise
+            the whole vectors are a single block.
+    """
+    fields = ('q', 'dqdt', 'dqddt')
+
+    def __init__(self, n_dof, rel_tolerance, abs_tolerance=0., blocks=False):
+        self.rel_tolerance = rel_tolerance
+        self.abs_tolerance = abs_tolerance
+        if blocks:
+            self.blocks = [('flexible', slice(0, n_dof - 10)),
+                           ('rigid', slice(n_dof - 10, n_dof - 4)),
+                           ('quaternion', slice(n_dof - 4, n_dof))]
+        else:
+            self.blocks = [('all', slice(0, n_dof))]
+
+        self.difference = np.zeros((n_dof, ))
+        # residual of every field and block
+        self.residual = np.zeros((len(self.fields), len(self.blocks)))
+
+    def __call__(self, tstep, previous_tstep):
+        """
+        Computes the residuals of ``tstep`` with respect to ``previous_tstep``.
+
+        Returns:
+            bool: all the blocks are converged
+        """
+        converged = True
+        for i_field, name in enumerate(self.fields):
+            previous = getattr(previous_tstep, name)
+            np.subtract(getattr(tstep, name), previous, out=self.difference)
+            for i_block, (_, block) in enumerate(self.blocks):
+                error = np.sqrt(np.dot(self.difference[block], self.difference[block]))
+                scale = np.sqrt(np.dot(previous[block], previous[block]))
+                if not error <= self.abs_tolerance + self.rel_tolerance*scale:
+                    converged = False
+                if scale > 0.:
+                    self.residual[i_field, i_block] = error/scale
+                else:
+                    self.residual[i_field, i_block] = error
+        return converged
+
+    def field_residual(self, name):
+        """
+        Returns the largest residual of the blocks of the field ``name``.
+        """
+        return np.max(self.residual[self.fields.index(name), :])
+
+    def is_finite(self):
+        return np.all(np.isfinite(self.residual))
+
+
+def stack(arrays, out=None):
+    """
+    Returns the arrays flattened and concatenated in a single vector.
+    """
+    size = sum([array.size for array in arrays])
+    if out is None or out.size != size:
+        out = np.zeros((size, ))
+    i_start = 0
+    for array in arrays:
+        i_end = i_start + array.size
+        out[i_start:i_end] = array.reshape(-1)
+        i_start = i_end
+    return out
+
+
+def unstack(vector, arrays):
+    """
+    Copies a vector obtained with ``stack`` back into ``arrays``.
+    """
+    i_start = 0
+    for array in arrays:
+        i_end = i_start + array.size
+        array[...] = vector[i_start:i_end].reshape(array.shape)
+        i_start = i_end
+
+
+class BaseCouplingAccelerator(object):
+    """
+    Common interface of the schemes updating the interface forces between the iterations of a partitioned
+    FSI solver.
+
+    In every iteration the solver calls ``update`` with the forces just computed from the aerodynamics and the
+    forces given to the structure in the previous iteration. The forces of the next iteration are written in
+    place of the former. ``reset`` is called before the first iteration of every time (or load) step.
+    """
+    def reset(self):
+        pass
+
+    def update(self, new, previous):
+        """
+        Args:
+            new (list(np.ndarray)): interface forces just computed. They are replaced by the forces to use in the
+                next iteration.
+            previous (list(np.ndarray)): interface forces used in the previous iteration
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def relax(new, previous, coeff):
+        for new_array, previous_array in zip(new, previous):
+            new_array *= 1.0 - coeff
+            new_array += coeff*previous_array
+
+
+class PrescribedRelaxation(BaseCouplingAccelerator):
+    """
+    Relaxation with a given factor (weight of the previous forces).
+
+    Args:
+        factor (float or callable): constant factor, or function returning the factor of every iteration of the
+            time step (starting at ``0``)
+    """
+    def __init__(self, factor):
+        self.factor = factor
+        self.iteration = 0
+
+    def reset(self):
+        self.iteration = 0
+
+    def update(self, new, previous):
+        if callable(self.factor):
+            coeff = self.factor(self.iteration)
+        else:
+            coeff = self.factor
+        self.iteration += 1
+        self.relax(new, previous, coeff)
+
+
+class AitkenRelaxation(BaseCouplingAccelerator):
+    """
+    Aitken's :math:`\\Delta^2` adaptive relaxation of the interface forces of a partitioned FSI iteration.
+
+    The relaxed forces of the iteration :math:`k+1` are
+    :math:`f_{k+1} = f_k + \\omega_k r_k`, with :math:`r_k = \\tilde{f}_{k+1} - f_k` the difference between
+    the newly computed forces and the ones used in the previous iteration. The factor is updated with
+    the successive residuals:
+
+    .. math:: \\omega_k = -\\omega_{k-1} \\frac{r_{k-1}^T (r_k - r_{k-1})}{|r_k - r_{k-1}|^2}
+
+    The factors returned by ``relaxation_factor`` follow the convention of ``relax`` in the coupled solvers,
+    i.e. they are the weight of the previous forces, :math:`1 - \\omega_k`.
+
+    Args:
+        initial_factor (float): factor (weight of the previous forces) of the first iteration of every time step
+        min_omega (float): lower bound of :math:`\\omega`
+        max_omega (float): upper bound of :math:`\\omega`
+    """
+    def __init__(self, initial_factor, min_omega=0.01, max_omega=1.0):
+        self.initial_omega = min(max(1.0 - initial_factor, min_omega), max_omega)
+        self.min_omega = min_omega
+        self.max_omega = max_omega
+
+        self.omega = None
+        self.residual = None
+        self.previous_residual = None
+        self.history = []
+
+    def reset(self):
+        """
+        Starts a new sequence of iterations (a new time or load step).
+        """
+        self.omega = None
+        self.history = []
+
+    def update(self, new, previous):
+        self.relax(new, previous, self.relaxation_factor(new, previous))
+
+    def relaxation_factor(self, new, previous):
+        """
+        Returns the factor to relax ``new`` towards ``previous``.
+
+        Args:
+            new (list(np.ndarray)): interface forces just computed
+            previous (list(np.ndarray)): interface forces used in the previous iteration
+
+        Returns:
+            float: weight of ``previous`` in the relaxed forces
+        """
+        self.residual, self.previous_residual = self.previous_residual, self.residual
+        self.residual = stack(new, self.residual)
+        self.residual -= stack(previous)
+
+        if self.omega is None:
+            self.omega = self.initial_omega
+        else:
+            # previous_residual <- r_k - r_{k-1}
+            self.previous_residual -= self.residual
+            self.previous_residual *= -1.0
+            norm = np.dot(self.previous_residual, self.previous_residual)
+            if norm > 0.:
+                # r_{k-1}^T (r_k - r_{k-1}) = r_k^T (r_k - r_{k-1}) - |r_k - r_{k-1}|^2
+                omega = -self.omega*(np.dot(self.residual, self.previous_residual) - norm)/norm
+                self.omega = min(max(omega, self.min_omega), self.max_omega)
+
+        self.history.append(self.omega)
+        return 1.0 - self.omega
+
+
+class IQNILS(BaseCouplingAccelerator):
+    """
+    Interface quasi-Newton scheme with an inverse Jacobian from a least-squares model (IQN-ILS).
+
+    Being :math:`x_k` the forces used in the iteration :math:`k`, :math:`\\tilde{x}_k` the forces computed in it
+    and :math:`r_k = \\tilde{x}_k - x_k` the residual, the differences between iterations
+    :math:`\\Delta r_i = r_{i+1} - r_i` and :math:`\\Delta \\tilde{x}_i = \\tilde{x}_{i+1} - \\tilde{x}_i` are
+    stored as the columns of :math:`V` and :math:`W`. The next forces are
+
+    .. math:: x_{k+1} = \\tilde{x}_k + W c, \\quad c = \\arg\\min \\|V c + r_k\\|
+
+    Without any pair of differences the forces are relaxed with ``initial_factor``.
+
+    Args:
+        initial_factor (float): relaxation factor (weight of the previous forces) without differences
+        reuse_steps (int): number of previous time steps whose differences are also used
+        rcond (float): cut-off ratio of the singular values in the least-squares problem, which discards
+            (nearly) linearly dependent differences
+    """
+    def __init__(self, initial_factor, reuse_steps=0, rcond=1e-10):
+        self.initial_factor = initial_factor
+        self.rcond = rcond
+        self.reuse_steps = reuse_steps
+
+        # differences of the current step, the most recent first
+        self.v = []
+        self.w = []
+        # (v, w) of the previous steps, the most recent first
+        self.previous_steps = collections.deque(maxlen=max(reuse_steps, 1))
+
+        self.residual = None
+        self.new = None
+
+    def reset(self):
+        if self.reuse_steps and self.v:
+            self.previous_steps.appendleft((self.v, self.w))
+        self.v = []
+        self.w = []
+        self.residual = None
+        self.new = None
+
+    def update(self, new, previous):
+        new_vector = stack(new)
+        residual = new_vector - stack(previous)
+
+        if self.residual is not None:
+            self.v.insert(0, residual - self.residual)
+            self.w.insert(0, new_vector - self.new)
+        self.residual = residual
+        self.new = new_vector
+
+        v = list(self.v)
+        w = list(self.w)
+        if self.reuse_steps:
+            for v_step, w_step in self.previous_steps:
+                v.extend(v_step)
+                w.extend(w_step)
+        # no more columns than unknowns
+        v = v[0:residual.size]
+        w = w[0:residual.size]
+
+        if not v:
+            self.relax(new, previous, self.initial_factor)
+            return
+
+        coefficients = np.linalg.lstsq(np.column_stack(v), -residual, rcond=self.rcond)[0]
+        unstack(new_vector + np.dot(np.column_stack(w), coefficients), new)
@@ -3,95 +3,186 @@ import numpy as np
 import copy
 
 import sharpy.utils.algebra as algebra
-import copy
+from collections import deque
+
+
+def _copy_array(source, destination, order='F'):
+    """
+    Copies ``source`` into ``destination`` in place when their shapes match, otherwise returns a new copy.
+
+    Args:
+        source (np.ndarray): array to copy
+        destination (np.ndarray): preallocated array, can be ``None``
+        order (str): memory layout of the newly allocated array, if needed
+
+    Returns:
+        np.ndarray: ``destination`` filled with the values of ``source`` or a new array
+    """
+    if destination is None or destination is source or destination.shape != source.shape:
+        return source.astype(dtype=ct.c_double, order=order, copy=True)
+    np.copyto(destination, source)
+    return destination
+
+
+class _BufferList(list):
+    """
+    List of per-surface arrays of an ``AeroTimeStepInfo`` field.
+
+    When created with :meth:`allocate`, the arrays are views of a single contiguous ``buffer``, so the whole field
+    can be copied, saved or passed to C at once. ``offsets`` holds the position in the buffer of every
+    ``[i_surf][i_dim, :, :]`` (or ``[i_surf]`` for 2D arrays) block.
+
+    Assigning an array of the same shape to an item copies it into the existing view. Any other change to the
+    list detaches it from the buffer and increases the ``generation`` counter of its owner, so that the ctypes
+    pointer tables are rebuilt.
+    """
+    def __init__(self, owner, iterable=()):
+        super().__init__(iterable)
+        self.owner = owner
+        self.buffer = None
+        self.offsets = None
+
+    @classmethod
+    def allocate(cls, owner, shapes, dtype=ct.c_double):
+        """
+        Returns a list of zero arrays of the given shapes backed by a single buffer.
+
+        Args:
+            owner: object whose ``generation`` counter is updated
+            shapes (list(tuple)): shape of each array
+            dtype: data type of the buffer
+
+        Returns:
+            _BufferList: list of views of the buffer
+        """
+        sizes = [int(np.prod(shape)) for shape in shapes]
+        buffer = np.zeros((sum(sizes), ), dtype=dtype)
+        views = []
+        offsets = []
+        start = 0
+        for shape, size in zip(shapes, sizes):
+            views.append(buffer[start:start + size].reshape(shape))
+            if len(shape) == 3:
+                block = size//shape[0] if shape[0] else 0
+                offsets.extend([start + i_dim*block for i_dim in range(shape[0])])
+            else:
+                offsets.append(start)
+            start += size
+
+        buffer_list = cls(owner, views)
+        buffer_list.buffer = buffer
+        buffer_list.offsets = np.array(offsets, dtype=np.intp)
+        return buffer_list
+
+    def _invalidate(self):
+        self.buffer = None
+        self.offsets = None
+        owner = getattr(self, 'owner', None)
+        if owner is not None:
+            owner.generation += 1
+
+    def __setitem__(self, key, value):
+        if not isinstance(key, slice):
+            current = self[key]
+            if value is current:
+                return
+            if (self.buffer is not None and isinstance(value, np.ndarray)
+                    and value.shape == current.shape):
+                np.copyto(current, value)
+                return
+        self._invalidate()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._invalidate()
+        super().__delitem__(key)
+
+    def append(self, value):
+        self._invalidate()
+        super().append(value)
+
+    def extend(self, values):
+        self._invalidate()
+        super().extend(values)
+
+    def insert(self, index, value):
+        self._invalidate()
+        super().insert(index, value)
+
+    def __reduce_ex__(self, protocol):
+        return list, (list(self),)
+
+
+def _copy_surface_field(source, destination):
+    """
+    Copies the per-surface arrays of ``source`` into ``destination``, with a single copy if both are backed by
+    buffers of the same size.
+    """
+    if (getattr(source, 'buffer', None) is not None and getattr(destination, 'buffer', None) is not None
+            and [array.shape for array in source] == [array.shape for array in destination]):
+        np.copyto(destination.buffer, source.buffer)
+        return
+    for i_surf in range(len(source)):
+        destination[i_surf] = _copy_array(source[i_surf], destination[i_surf], order='C')
 
 
 class AeroTimeStepInfo(object):
+    """
+    Aerodynamic information of a time step.
+
+    Every per-surface field (``zeta``, ``gamma``...) is a list of views of a single contiguous buffer, so it
+    can be copied or saved at once.
+
+    The per-surface arrays are passed to the UVLM library through tables of ctypes pointers, built by
+    :meth:`generate_ctypes_pointers`. The tables are kept between calls and only rebuilt after one of
+    the arrays has been reallocated, which is tracked by the ``generation`` counter. Modifying the arrays
+    in place (``tstep.gamma[i_surf][:] = ...``) does not require rebuilding the tables.
+    """
+    # attributes whose arrays are referenced by the ctypes pointer tables
+    surface_fields = ('zeta', 'zeta_dot', 'normals', 'forces', 'dynamic_forces', 'zeta_star',
+                      'u_ext', 'u_ext_star', 'gamma', 'gamma_star', 'gamma_dot')
+    buffer_fields = ('dimensions', 'dimensions_star') + surface_fields
+
     def __init__(self, dimensions, dimensions_star):
+        self.generation = 0
+        self.ct_generation = None
         self.ct_dimensions = None
         self.ct_dimensions_star = None
 
         self.dimensions = dimensions.copy()
         self.dimensions_star = dimensions_star.copy()
         self.n_surf = self.dimensions.shape[0]
+        # simulation time of the step (set by DynamicCoupled)
+        self.time = 0.
+        # shapes of the per-surface arrays
+        nodes = [(dimensions[i_surf, 0] + 1, dimensions[i_surf, 1] + 1) for i_surf in range(self.n_surf)]
+        panels = [(dimensions[i_surf, 0], dimensions[i_surf, 1]) for i_surf in range(self.n_surf)]
+        nodes_star = [(dimensions_star[i_surf, 0] + 1, dimensions_star[i_surf, 1] + 1) for i_surf in range(self.n_surf)]
+        panels_star = [(dimensions_star[i_surf, 0], dimensions_star[i_surf, 1]) for i_surf in range(self.n_surf)]
+
         # generate placeholder for aero grid zeta coordinates
-        self.zeta = []
-        for i_surf in range(self.n_surf):
-            self.zeta.append(np.zeros((3,
-                                       dimensions[i_surf, 0] + 1,
-                                       dimensions[i_surf, 1] + 1),
-                                      dtype=ct.c_double))
-        self.zeta_dot = []
-        for i_surf in range(self.n_surf):
-            self.zeta_dot.append(np.zeros((3,
-                                           dimensions[i_surf, 0] + 1,
-                                           dimensions[i_surf, 1] + 1),
-                                          dtype=ct.c_double))
+        self.zeta = _BufferList.allocate(self, [(3, ) + shape for shape in nodes])
+        self.zeta_dot = _BufferList.allocate(self, [(3, ) + shape for shape in nodes])
 
         # panel normals
-        self.normals = []
-        for i_surf in range(self.n_surf):
-            self.normals.append(np.zeros((3,
-                                          dimensions[i_surf, 0],
-                                          dimensions[i_surf, 1]),
-                                         dtype=ct.c_double))
+        self.normals = _BufferList.allocate(self, [(3, ) + shape for shape in panels])
 
         # panel forces
-        self.forces = []
-        for i_surf in range(self.n_surf):
-            self.forces.append(np.zeros((6,
-                                         dimensions[i_surf, 0] + 1,
-                                         dimensions[i_surf, 1] + 1),
-                                        dtype=ct.c_double))
+        self.forces = _BufferList.allocate(self, [(6, ) + shape for shape in nodes])
         # panel forces
-        self.dynamic_forces = []
-        for i_surf in range(self.n_surf):
-            self.dynamic_forces.append(np.zeros((6,
-                                                 dimensions[i_surf, 0] + 1,
-                                                 dimensions[i_surf, 1] + 1),
-                                                dtype=ct.c_double))
+        self.dynamic_forces = _BufferList.allocate(self, [(6, ) + shape for shape in nodes])
 
         # generate placeholder for aero grid zeta_star coordinates
-        self.zeta_star = []
-        for i_surf in range(self.n_surf):
-            self.zeta_star.append(np.zeros((3,
-                                            dimensions_star[i_surf, 0] + 1,
-                                            dimensions_star[i_surf, 1] + 1),
-                                           dtype=ct.c_double))
+        self.zeta_star = _BufferList.allocate(self, [(3, ) + shape for shape in nodes_star])
 
         # placeholder for external velocity
-        self.u_ext = []
-        for i_surf in range(self.n_surf):
-            self.u_ext.append(np.zeros((3,
-                                        dimensions[i_surf, 0] + 1,
-                                        dimensions[i_surf, 1] + 1),
-                                       dtype=ct.c_double))
-
-        self.u_ext_star = []
-        for i_surf in range(self.n_surf):
-            self.u_ext_star.append(np.zeros((3,
-                                             dimensions_star[i_surf, 0] + 1,
-                                             dimensions_star[i_surf, 1] + 1),
-                                            dtype=ct.c_double))
+        self.u_ext = _BufferList.allocate(self, [(3, ) + shape for shape in nodes])
+        self.u_ext_star = _BufferList.allocate(self, [(3, ) + shape for shape in nodes_star])
 
         # allocate gamma and gamma star matrices
-        self.gamma = []
-        for i_surf in range(self.n_surf):
-            self.gamma.append(np.zeros((dimensions[i_surf, 0],
-                                        dimensions[i_surf, 1]),
-                                       dtype=ct.c_double))
-
-        self.gamma_star = []
-        for i_surf in range(self.n_surf):
-            self.gamma_star.append(np.zeros((dimensions_star[i_surf, 0],
-                                             dimensions_star[i_surf, 1]),
-                                            dtype=ct.c_double))
-
-        self.gamma_dot = []
-        for i_surf in range(self.n_surf):
-            self.gamma_dot.append(np.zeros((dimensions[i_surf, 0],
-                                            dimensions[i_surf, 1]),
-                                           dtype=ct.c_double))
+        self.gamma = _BufferList.allocate(self, panels)
+        self.gamma_star = _BufferList.allocate(self, panels_star)
+        self.gamma_dot = _BufferList.allocate(self, panels)
 
         # total forces
         self.inertial_total_forces = np.zeros((self.n_surf, 6))
@@ -104,149 +195,118 @@ class AeroTimeStepInfo(object):
         self.postproc_cell = dict()
         self.postproc_node = dict()
 
-    def copy(self):
-        copied = AeroTimeStepInfo(self.dimensions, self.dimensions_star)
-        # generate placeholder for aero grid zeta coordinates
-        for i_surf in range(copied.n_surf):
-            copied.zeta[i_surf] = self.zeta[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
-
-        for i_surf in range(copied.n_surf):
-            copied.zeta_dot[i_surf] = self.zeta_dot[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
+    def copy(self, out=None):
+        """
+        Returns a deep copy of the timestep.
 
-        # panel normals
-        for i_surf in range(copied.n_surf):
-            copied.normals[i_surf] = self.normals[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
+        Args:
+            out (AeroTimeStepInfo, optional): timestep of the same dimensions whose arrays are overwritten
+                with the values of this one instead of allocating a new one.
 
-        # panel forces
-        for i_surf in range(copied.n_surf):
-            copied.forces[i_surf] = self.forces[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
-
-        # panel forces
-        for i_surf in range(copied.n_surf):
-            copied.dynamic_forces[i_surf] = self.dynamic_forces[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
-
-        # generate placeholder for aero grid zeta_star coordinates
-        for i_surf in range(copied.n_surf):
-            copied.zeta_star[i_surf] = self.zeta_star[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
-
-        # placeholder for external velocity
-        for i_surf in range(copied.n_surf):
-            copied.u_ext[i_surf] = self.u_ext[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
-
-        for i_surf in range(copied.n_surf):
-            copied.u_ext_star[i_surf] = self.u_ext_star[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
-
-        # allocate gamma and gamma star matrices
-        for i_surf in range(copied.n_surf):
-            copied.gamma[i_surf] = self.gamma[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
-
-        for i_surf in range(copied.n_surf):
-            copied.gamma_dot[i_surf] = self.gamma_dot[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
-
-        for i_surf in range(copied.n_surf):
-            copied.gamma_star[i_surf] = self.gamma_star[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
+        Returns:
+            AeroTimeStepInfo: the copy (``out`` if given)
+        """
+        if out is None:
+            copied = AeroTimeStepInfo(self.dimensions, self.dimensions_star)
+        else:
+            copied = out
+        copied.time = self.time
+        # per-surface arrays
+        for name in self.surface_fields:
+            _copy_surface_field(getattr(self, name), getattr(copied, name))
 
         # total forces
-        copied.inertial_total_forces = self.inertial_total_forces.astype(dtype=ct.c_double, copy=True, order='C')
-        copied.body_total_forces = self.body_total_forces.astype(dtype=ct.c_double, copy=True, order='C')
-        copied.inertial_steady_forces = self.inertial_steady_forces.astype(dtype=ct.c_double, copy=True, order='C')
-        copied.body_steady_forces = self.body_steady_forces.astype(dtype=ct.c_double, copy=True, order='C')
-        copied.inertial_unsteady_forces = self.inertial_unsteady_forces.astype(dtype=ct.c_double, copy=True, order='C')
-        copied.body_unsteady_forces = self.body_unsteady_forces.astype(dtype=ct.c_double, copy=True, order='C')
+        copied.inertial_total_forces = _copy_array(self.inertial_total_forces, copied.inertial_total_forces, order='C')
+        copied.body_total_forces = _copy_array(self.body_total_forces, copied.body_total_forces, order='C')
+        copied.inertial_steady_forces = _copy_array(self.inertial_steady_forces, copied.inertial_steady_forces, order='C')
+        copied.body_steady_forces = _copy_array(self.body_steady_forces, copied.body_steady_forces, order='C')
+        copied.inertial_unsteady_forces = _copy_array(self.inertial_unsteady_forces, copied.inertial_unsteady_forces, order='C')
+        copied.body_unsteady_forces = _copy_array(self.body_unsteady_forces, copied.body_unsteady_forces, order='C')
 
         copied.postproc_cell = copy.deepcopy(self.postproc_cell)
         copied.postproc_node = copy.deepcopy(self.postproc_node)
 
         return copied
 
+    def __setattr__(self, name, value):
+        if name in self.buffer_fields:
+            if isinstance(value, list) and not (isinstance(value, _BufferList) and value.owner is self):
+                value = _BufferList(self, value)
+            if getattr(self, name, None) is not value:
+                self.generation += 1
+        super().__setattr__(name, value)
+
+    def __getstate__(self):
+        # ctypes pointer tables cannot be pickled, they are rebuilt when needed
+        state = self.__dict__.copy()
+        for k in list(state.keys()):
+            if k.startswith('ct_'):
+                state[k] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for name in self.surface_fields:
+            arrays = state.get(name)
+            if isinstance(arrays, list):
+                field = _BufferList.allocate(self, [array.shape for array in arrays])
+                for i_surf, array in enumerate(arrays):
+                    field[i_surf] = array
+                self.__dict__[name] = field
+        self.ct_generation = None
+
     def generate_ctypes_pointers(self):
+        """
+        Generates the tables of ctypes pointers to the per-surface arrays passed to the UVLM library.
+
+        The tables are only built again if any array has been reallocated since the last call.
+        """
+        if self.ct_generation == self.generation:
+            return
+
         self.ct_dimensions = self.dimensions.astype(dtype=ct.c_uint, copy=True)
         self.ct_dimensions_star = self.dimensions_star.astype(dtype=ct.c_uint, copy=True)
 
         n_surf = len(self.dimensions)
 
-        from sharpy.utils.constants import NDIM
-
-        self.ct_zeta_list = []
-        for i_surf in range(self.n_surf):
-            for i_dim in range(NDIM):
-                self.ct_zeta_list.append(self.zeta[i_surf][i_dim, :, :].reshape(-1))
-
-        self.ct_zeta_dot_list = []
-        for i_surf in range(self.n_surf):
-            for i_dim in range(NDIM):
-                self.ct_zeta_dot_list.append(self.zeta_dot[i_surf][i_dim, :, :].reshape(-1))
-
-        self.ct_zeta_star_list = []
-        for i_surf in range(self.n_surf):
-            for i_dim in range(NDIM):
-                self.ct_zeta_star_list.append(self.zeta_star[i_surf][i_dim, :, :].reshape(-1))
-
-        self.ct_u_ext_list = []
-        for i_surf in range(self.n_surf):
-            for i_dim in range(NDIM):
-                self.ct_u_ext_list.append(self.u_ext[i_surf][i_dim, :, :].reshape(-1))
-
-        self.ct_u_ext_star_list = []
-        for i_surf in range(self.n_surf):
-            for i_dim in range(NDIM):
-                self.ct_u_ext_star_list.append(self.u_ext_star[i_surf][i_dim, :, :].reshape(-1))
-
-        self.ct_gamma_list = []
-        for i_surf in range(self.n_surf):
-            self.ct_gamma_list.append(self.gamma[i_surf][:, :].reshape(-1))
-
-        self.ct_gamma_dot_list = []
-        for i_surf in range(self.n_surf):
-            self.ct_gamma_dot_list.append(self.gamma_dot[i_surf][:, :].reshape(-1))
-
-        self.ct_gamma_star_list = []
-        for i_surf in range(self.n_surf):
-            self.ct_gamma_star_list.append(self.gamma_star[i_surf][:, :].reshape(-1))
-
-        self.ct_normals_list = []
-        for i_surf in range(self.n_surf):
-            for i_dim in range(NDIM):
-                self.ct_normals_list.append(self.normals[i_surf][i_dim, :, :].reshape(-1))
-
-        self.ct_forces_list = []
-        for i_surf in range(self.n_surf):
-            for i_dim in range(NDIM*2):
-                self.ct_forces_list.append(self.forces[i_surf][i_dim, :, :].reshape(-1))
-
-        self.ct_dynamic_forces_list = []
-        for i_surf in range(self.n_surf):
-            for i_dim in range(NDIM*2):
-                self.ct_dynamic_forces_list.append(self.dynamic_forces[i_surf][i_dim, :, :].reshape(-1))
-
         self.ct_p_dimensions = ((ct.POINTER(ct.c_uint)*n_surf)
                                 (* np.ctypeslib.as_ctypes(self.ct_dimensions)))
         self.ct_p_dimensions_star = ((ct.POINTER(ct.c_uint)*n_surf)
                                      (* np.ctypeslib.as_ctypes(self.ct_dimensions_star)))
-        self.ct_p_zeta = ((ct.POINTER(ct.c_double)*len(self.ct_zeta_list))
-                          (* [np.ctypeslib.as_ctypes(array) for array in self.ct_zeta_list]))
-        self.ct_p_zeta_dot = ((ct.POINTER(ct.c_double)*len(self.ct_zeta_dot_list))
-                          (* [np.ctypeslib.as_ctypes(array) for array in self.ct_zeta_dot_list]))
-        self.ct_p_zeta_star = ((ct.POINTER(ct.c_double)*len(self.ct_zeta_star_list))
-                               (* [np.ctypeslib.as_ctypes(array) for array in self.ct_zeta_star_list]))
-        self.ct_p_u_ext = ((ct.POINTER(ct.c_double)*len(self.ct_u_ext_list))
-                           (* [np.ctypeslib.as_ctypes(array) for array in self.ct_u_ext_list]))
-        self.ct_p_u_ext_star = ((ct.POINTER(ct.c_double)*len(self.ct_u_ext_star_list))
-                           (* [np.ctypeslib.as_ctypes(array) for array in self.ct_u_ext_star_list]))
-        self.ct_p_gamma = ((ct.POINTER(ct.c_double)*len(self.ct_gamma_list))
-                           (* [np.ctypeslib.as_ctypes(array) for array in self.ct_gamma_list]))
-        self.ct_p_gamma_dot = ((ct.POINTER(ct.c_double)*len(self.ct_gamma_dot_list))
-                               (* [np.ctypeslib.as_ctypes(array) for array in self.ct_gamma_dot_list]))
-        self.ct_p_gamma_star = ((ct.POINTER(ct.c_double)*len(self.ct_gamma_star_list))
-                                (* [np.ctypeslib.as_ctypes(array) for array in self.ct_gamma_star_list]))
-        self.ct_p_normals = ((ct.POINTER(ct.c_double)*len(self.ct_normals_list))
-                             (* [np.ctypeslib.as_ctypes(array) for array in self.ct_normals_list]))
-        self.ct_p_forces = ((ct.POINTER(ct.c_double)*len(self.ct_forces_list))
-                            (* [np.ctypeslib.as_ctypes(array) for array in self.ct_forces_list]))
-        self.ct_p_dynamic_forces = ((ct.POINTER(ct.c_double)*len(self.ct_dynamic_forces_list))
-                            (* [np.ctypeslib.as_ctypes(array) for array in self.ct_dynamic_forces_list]))
+        self.ct_p_zeta = self.ctypes_pointer_table('zeta')
+        self.ct_p_zeta_dot = self.ctypes_pointer_table('zeta_dot')
+        self.ct_p_zeta_star = self.ctypes_pointer_table('zeta_star')
+        self.ct_p_u_ext = self.ctypes_pointer_table('u_ext')
+        self.ct_p_u_ext_star = self.ctypes_pointer_table('u_ext_star')
+        self.ct_p_gamma = self.ctypes_pointer_table('gamma')
+        self.ct_p_gamma_dot = self.ctypes_pointer_table('gamma_dot')
+        self.ct_p_gamma_star = self.ctypes_pointer_table('gamma_star')
+        self.ct_p_normals = self.ctypes_pointer_table('normals')
+        self.ct_p_forces = self.ctypes_pointer_table('forces')
+        self.ct_p_dynamic_forces = self.ctypes_pointer_table('dynamic_forces')
+
+        self.ct_generation = self.generation
+
+    def ctypes_pointer_table(self, name):
+        """
+        Returns the table of ctypes pointers to the ``[i_surf][i_dim, :, :]`` blocks (``[i_surf]`` for 2D arrays)
+        of the field ``name``.
+
+        For fields backed by a single buffer, the pointers are its base address plus the offset of every block.
+        Otherwise, the list of flattened blocks is kept as ``ct_<name>_list``.
+        """
+        field = getattr(self, name)
+        if getattr(field, 'buffer', None) is not None:
+            addresses = (field.buffer.ctypes.data + field.offsets*field.buffer.itemsize).astype(np.uintp)
+            # the table shares the memory of (and keeps a reference to) the array of addresses
+            return (ct.POINTER(ct.c_double)*len(addresses)).from_buffer(addresses)
+
+        ct_list, ct_pointer = standalone_ctypes_pointer(field)
+        setattr(self, 'ct_%s_list' % name, ct_list)
+        return ct_pointer
 
     def remove_ctypes_pointers(self):
+        self.ct_generation = None
         try:
             del self.ct_p_dimensions
         except AttributeError:
@@ -361,6 +421,8 @@ class StructTimeStepInfo(object):
         self.num_node = num_node
         self.num_elem = num_elem
         self.num_node_elem = num_node_elem
+        # simulation time of the step (set by DynamicCoupled)
+        self.time = 0.
         # generate placeholder for node coordinates
         self.pos = np.zeros((self.num_node, 3), dtype=ct.c_double, order='F')
         self.pos_dot = np.zeros((self.num_node, 3), dtype=ct.c_double, order='F')
@@ -390,39 +452,52 @@ class StructTimeStepInfo(object):
         self.postproc_cell = dict()
         self.postproc_node = dict()
 
-    def copy(self):
-        copied = StructTimeStepInfo(self.num_node, self.num_elem)
+    def copy(self, out=None):
+        """
+        Returns a deep copy of the timestep.
+
+        Args:
+            out (StructTimeStepInfo, optional): timestep of the same dimensions whose arrays are overwritten
+                with the values of this one instead of allocating a new one.
+
+        Returns:
+            StructTimeStepInfo: the copy (``out`` if given)
+        """
+        if out is None:
+            copied = StructTimeStepInfo(self.num_node, self.num_elem, self.num_node_elem)
+        else:
+            copied = out
 
         copied.num_node = self.num_node
         copied.num_elem = self.num_elem
         copied.num_node_elem = self.num_node_elem
+        copied.time = self.time
 
         # generate placeholder for node coordinates
-        copied.pos = self.pos.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.pos_dot = self.pos_dot.astype(dtype=ct.c_double, order='F', copy=True)
-        # self.pos_dot = np.zeros((self.num_node, 3), dtype=ct.c_double, order='F')
+        copied.pos = _copy_array(self.pos, copied.pos)
+        copied.pos_dot = _copy_array(self.pos_dot, copied.pos_dot)
 
         # placeholder for CRV
-        copied.psi = self.psi.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.psi_dot = self.psi_dot.astype(dtype=ct.c_double, order='F', copy=True)
+        copied.psi = _copy_array(self.psi, copied.psi)
+        copied.psi_dot = _copy_array(self.psi_dot, copied.psi_dot)
 
         # FoR data
-        copied.quat = self.quat.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.for_pos = self.for_pos.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.for_vel = self.for_vel.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.for_acc = self.for_acc.astype(dtype=ct.c_double, order='F', copy=True)
+        copied.quat = _copy_array(self.quat, copied.quat)
+        copied.for_pos = _copy_array(self.for_pos, copied.for_pos)
+        copied.for_vel = _copy_array(self.for_vel, copied.for_vel)
+        copied.for_acc = _copy_array(self.for_acc, copied.for_acc)
 
-        copied.gravity_vector_inertial = self.gravity_vector_inertial.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.gravity_vector_body = self.gravity_vector_body.astype(dtype=ct.c_double, order='F', copy=True)
+        copied.gravity_vector_inertial = _copy_array(self.gravity_vector_inertial, copied.gravity_vector_inertial)
+        copied.gravity_vector_body = _copy_array(self.gravity_vector_body, copied.gravity_vector_body)
 
-        copied.steady_applied_forces = self.steady_applied_forces.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.unsteady_applied_forces = self.unsteady_applied_forces.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.gravity_forces = self.gravity_forces.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.total_gravity_forces = self.total_gravity_forces.astype(dtype=ct.c_double, order='F', copy=True)
+        copied.steady_applied_forces = _copy_array(self.steady_applied_forces, copied.steady_applied_forces)
+        copied.unsteady_applied_forces = _copy_array(self.unsteady_applied_forces, copied.unsteady_applied_forces)
+        copied.gravity_forces = _copy_array(self.gravity_forces, copied.gravity_forces)
+        copied.total_gravity_forces = _copy_array(self.total_gravity_forces, copied.total_gravity_forces)
 
-        copied.q = self.q.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.dqdt = self.dqdt.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.dqddt = self.dqddt.astype(dtype=ct.c_double, order='F', copy=True)
+        copied.q = _copy_array(self.q, copied.q)
+        copied.dqdt = _copy_array(self.dqdt, copied.dqdt)
+        copied.dqddt = _copy_array(self.dqddt, copied.dqddt)
 
         copied.postproc_cell = copy.deepcopy(self.postproc_cell)
         copied.postproc_node = copy.deepcopy(self.postproc_node)
@@ -430,12 +505,10 @@ class StructTimeStepInfo(object):
         return copied
 
     def glob_pos(self, include_rbm=True):
-        coords = self.pos.copy()
-        c = self.cga()
-        for i_node in range(self.num_node):
-            coords[i_node, :] = np.dot(c, coords[i_node, :])
-            if include_rbm:
-                coords[i_node, :] += self.for_pos[0:3]
+        # row-wise cga*pos
+        coords = np.dot(self.pos, self.cag())
+        if include_rbm:
+            coords += self.for_pos[0:3]
         return coords
 
     def cag(self):
@@ -445,7 +518,161 @@ class StructTimeStepInfo(object):
         return self.cag().T
 
 
-
-
-
-
+class TimeStepHistory(object):
+    """
+    Time history of ``AeroTimeStepInfo`` or ``StructTimeStepInfo`` instances.
+
+    Behaves like the list previously used for ``timestep_info``: it is indexed by the absolute time step
+    number, supports negative indices and slices, and ``len`` returns the number of steps added so far.
+
+    With a retention policy set (see :meth:`set_retention`), only the last ``n_keep`` steps are kept in memory.
+    Older steps are passed to the ``spill`` callback (if any) and their storage is reused for the next step
+    added with :meth:`append_copy`, so the memory footprint does not grow with the number of time steps.
+    Indexing an evicted step raises ``IndexError``.
+
+    Args:
+        n_keep (int): number of steps kept in memory. ``0`` keeps every step.
+        spill (callable, optional): function ``spill(ts, tstep)`` called with every evicted step.
+    """
+    def __init__(self, n_keep=0, spill=None):
+        self._steps = deque()
+        self._first = 0
+        self._recycled = None
+        self.n_keep = 0
+        self.spill = None
+        self.set_retention(n_keep, spill)
+
+    def set_retention(self, n_keep, spill=None):
+        """
+        Sets the retention policy, evicting the steps that fall outside it straight away.
+
+        Args:
+            n_keep (int): number of steps kept in memory. ``0`` keeps every step.
+            spill (callable, optional): function ``spill(ts, tstep)`` called with every evicted step.
+        """
+        if n_keep < 0:
+            raise ValueError('The number of time steps kept in memory cannot be negative')
+        self.n_keep = n_keep
+        self.spill = spill
+        self._evict()
+
+    @property
+    def first_index(self):
+        """int: absolute index of the oldest step still in memory"""
+        return self._first
+
+    def _evict(self):
+        if not self.n_keep:
+            return
+        while len(self._steps) > self.n_keep:
+            tstep = self._steps.popleft()
+            if self.spill is not None and tstep is not None:
+                self.spill(self._first, tstep)
+            self._first += 1
+            self._recycled = tstep
+
+    def _position(self, i_ts):
+        if i_ts < 0:
+            i_ts += len(self)
+        if i_ts < 0 or i_ts >= len(self):
+            raise IndexError('Time step %u is out of range' % i_ts)
+        if i_ts < self._first:
+            raise IndexError('Time step %u is no longer kept in memory (oldest is %u)' % (i_ts, self._first))
+        return i_ts - self._first
+
+    def __len__(self):
+        return self._first + len(self._steps)
+
+    def __iter__(self):
+        return iter(list(self._steps))
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self._steps[i_ts - self._first]
+                    for i_ts in range(*item.indices(len(self)))
+                    if i_ts >= self._first]
+        return self._steps[self._position(item)]
+
+    def __setitem__(self, item, value):
+        if isinstance(item, slice):
+            raise TypeError('TimeStepHistory does not support slice assignment')
+        if value is None and 0 <= item < self._first:
+            # already released
+            return
+        self._steps[self._position(item)] = value
+
+    def __delitem__(self, item):
+        position = self._position(item)
+        if position != len(self._steps) - 1:
+            raise IndexError('Only the last time step can be deleted from a TimeStepHistory')
+        self._steps.pop()
+
+    def append(self, tstep):
+        """
+        Adds ``tstep`` (without copying it) as the newest step.
+        """
+        self._steps.append(tstep)
+        self._evict()
+
+    def append_copy(self, tstep):
+        """
+        Adds a copy of ``tstep`` as the newest step, reusing the storage of the last evicted step when possible.
+
+        Returns:
+            the new step
+        """
+        recycled = self._recycled
+        self._recycled = None
+        if recycled is None:
+            new_step = tstep.copy()
+        else:
+            new_step = tstep.copy(out=recycled)
+        self.append(new_step)
+        return new_step
+
+    def snapshot(self, n_steps=1, out=None):
+        """
+        Returns a new history holding copies of the last ``n_steps`` steps, with the same time step numbers.
+
+        Args:
+            n_steps (int): number of steps copied
+            out (TimeStepHistory, optional): previous snapshot of the same model, whose steps are reused as
+                storage of the copies
+
+        Returns:
+            TimeStepHistory: the snapshot
+        """
+        n_steps = min(n_steps, len(self._steps))
+        steps = list(self._steps)[len(self._steps) - n_steps:]
+        if out is None or len(out._steps) != n_steps:
+            out = TimeStepHistory()
+            out._steps.extend([None]*n_steps)
+        for i_step, tstep in enumerate(steps):
+            if tstep is None:
+                out._steps[i_step] = None
+            elif out._steps[i_step] is None:
+                out._steps[i_step] = tstep.copy()
+            else:
+                out._steps[i_step] = tstep.copy(out=out._steps[i_step])
+        out._first = len(self) - n_steps
+        out._recycled = None
+        return out
+
+    def clear(self):
+        """
+        Removes every step.
+        """
+        self._steps.clear()
+        self._first = 0
+        self._recycled = None
+
+    def restart(self):
+        """
+        Keeps only the newest step and renumbers it as step 0.
+        """
+        if not len(self._steps):
+            self.clear()
+            return
+        last = self._steps[-1]
+        self.clear()
+        self._steps.append(last)
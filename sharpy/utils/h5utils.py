@@ -9,6 +9,7 @@
 import h5py as h5
 import os
 import errno
+import warnings
 import numpy as np
 
 
@@ -33,7 +34,7 @@ def load_h5_in_dict(handle, path='/'):
     dictionary = {}
     for k,i in handle[path].items():
         if isinstance(i, h5._hl.dataset.Dataset):
-            dictionary[k] = i.value
+            dictionary[k] = read_dataset(i)
         elif isinstance(i, h5._hl.group.Group):
             dictionary[k] = load_h5_in_dict(handle, path + k + '/')
 
@@ -43,6 +44,22 @@ def load_h5_in_dict(handle, path='/'):
     return dictionary
 
 
+def read_dataset(dataset):
+    """
+    Reads the whole dataset. Strings, returned as ``bytes`` by h5py, are decoded.
+
+    Args:
+        dataset (h5py.Dataset): dataset to read
+
+    Returns:
+        the value of the dataset
+    """
+    value = dataset[()]
+    if isinstance(value, bytes):
+        value = value.decode()
+    return value
+
+
 def load_attributes(handle, path):
     attributes = []
     for k, i in handle[path].attrs.items():
@@ -51,6 +68,190 @@ def load_attributes(handle, path):
     return attributes
 
 
+class TimeStepAppender(object):
+    """
+    Appends time steps (``AeroTimeStepInfo`` or ``StructTimeStepInfo``) to an HDF5 group, with one chunked
+    dataset per field and a leading time axis that is extended as time steps are added.
+
+    * Arrays are saved in the dataset of the same name.
+    * Lists of arrays (the per-surface fields of ``AeroTimeStepInfo``) are saved as one dataset per surface,
+      ``field/00000``, ``field/00001``...
+    * Numbers are saved in 1D datasets.
+
+    The time step numbers are saved in the dataset ``ts``. The fields saved are those of the first time step;
+    a field whose shape changes afterwards is no longer saved. If ``grp`` already holds a history, its datasets
+    are reopened and the new time steps are appended to them (``last_ts`` is the last one saved). See
+    :func:`read_time_series` for the reader.
+
+    Args:
+        grp (h5py.Group): group the datasets are created in
+        chunk_steps (int): number of time steps per chunk
+        skip_attr (list(str)): attributes not saved
+        compress_float (bool): save the double precision fields in single precision
+        compression (str): ``gzip`` or ``lzf`` compression filter, none if empty
+        compression_opts (int): compression level of the ``gzip`` filter
+        shuffle (bool): apply the shuffle filter, which usually improves the compression ratio
+    """
+    def __init__(self, grp, chunk_steps=10, skip_attr=(), compress_float=False,
+                 compression='', compression_opts=4, shuffle=False):
+        self.grp = grp
+        self.chunk_steps = max(int(chunk_steps), 1)
+        self.skip_attr = skip_attr
+        self.compress_float = compress_float
+        self.filters = dict()
+        if compression:
+            self.filters['compression'] = compression
+            if compression == 'gzip':
+                self.filters['compression_opts'] = compression_opts
+        if shuffle:
+            self.filters['shuffle'] = True
+        self.n_steps = 0
+        self.last_ts = -1
+        self.datasets = None
+        if 'ts' in self.grp:
+            self.reopen()
+
+    def reopen(self):
+        """
+        Continues the history saved in ``grp``. The fields that were no longer saved, shorter than ``ts``,
+        are not reopened.
+        """
+        self.n_steps = self.grp['ts'].shape[0]
+        if self.n_steps:
+            self.last_ts = int(self.grp['ts'][-1])
+
+        def add_dataset(path, obj):
+            if isinstance(obj, h5.Dataset) and obj.shape[:1] == (self.n_steps, ) and obj.maxshape[0] is None:
+                self.datasets[path] = obj
+
+        self.datasets = dict()
+        self.grp.visititems(add_dataset)
+
+    def fields(self, tstep):
+        """
+        Returns the dictionary ``{path: array}`` of the fields of ``tstep``.
+        """
+        fields = dict()
+        for attr, value in tstep.__dict__.items():
+            if attr in self.skip_attr or attr.startswith('ct_'):
+                continue
+            if isinstance(value, np.ndarray):
+                if value.size > 0 and value.dtype.kind in 'biufc':
+                    fields[attr] = value
+            elif isinstance(value, (int, float, complex, np.number)):
+                fields[attr] = np.array(value)
+            elif isinstance(value, list) and len(value) > 0 and all([isinstance(v, np.ndarray) for v in value]):
+                for i_surf in range(len(value)):
+                    fields[attr + '/%.5d' % i_surf] = value[i_surf]
+        return fields
+
+    def create_dataset(self, path, value):
+        dtype = value.dtype
+        if self.compress_float and dtype == np.float64:
+            dtype = np.float32
+        return self.grp.create_dataset(path,
+                                       shape=(0, ) + value.shape,
+                                       maxshape=(None, ) + value.shape,
+                                       chunks=(self.chunk_steps, ) + value.shape,
+                                       dtype=dtype,
+                                       **self.filters)
+
+    def append(self, ts, tstep):
+        """
+        Appends the time step ``tstep``, of number ``ts``.
+        """
+        self.append_steps([ts], [tstep])
+
+    def append_steps(self, ts_list, tsteps):
+        """
+        Appends the time steps ``tsteps``, of numbers ``ts_list``, extending every dataset once.
+        """
+        if not len(tsteps):
+            return
+        fields = [self.fields(tstep) for tstep in tsteps]
+        for i_step in range(len(tsteps)):
+            fields[i_step]['ts'] = np.array(ts_list[i_step])
+        if self.datasets is None:
+            self.datasets = dict()
+            for path, value in fields[0].items():
+                self.datasets[path] = self.create_dataset(path, value)
+
+        n_new = len(tsteps)
+        for path in list(self.datasets.keys()):
+            dataset = self.datasets[path]
+            # number of steps with a valid value of the field
+            n_valid = 0
+            for step_fields in fields:
+                value = step_fields.get(path)
+                if value is None or value.shape != dataset.shape[1:]:
+                    break
+                n_valid += 1
+            if n_valid < n_new:
+                warnings.warn('%s: field %s no longer saved from time step %u' %
+                              (self.grp.name, path, ts_list[n_valid]))
+                del self.datasets[path]
+                if not n_valid:
+                    continue
+            dataset.resize(self.n_steps + n_valid, axis=0)
+            dataset[self.n_steps:self.n_steps + n_valid, ...] = np.stack([step_fields[path]
+                                                                          for step_fields in fields[:n_valid]])
+
+        self.n_steps += n_new
+        self.last_ts = ts_list[-1]
+
+
+def time_series_fields(filename, history):
+    """
+    Returns the names of the fields of a time step history saved by :class:`TimeStepAppender`.
+
+    Args:
+        filename (str): path to the HDF5 file
+        history (str): path to the group of the history in the file (for example ``timesteps/aero``)
+
+    Returns:
+        list(str): names of the fields
+    """
+    check_file_exists(filename)
+    with h5.File(filename, 'r') as hdfile:
+        return [name for name in hdfile[history].keys() if name != 'ts']
+
+
+def read_time_series(filename, history, field, start=None, stop=None, i_surf=None):
+    """
+    Reads a field of a time step history saved by :class:`TimeStepAppender`, only for the time steps
+    ``start <= ts < stop``. Only the requested slice is read from the file.
+
+    Args:
+        filename (str): path to the HDF5 file
+        history (str): path to the group of the history in the file (for example ``timesteps/aero``)
+        field (str): name of the field
+        start (int): first time step. If ``None``, the first time step saved.
+        stop (int): time step after the last one. If ``None``, after the last time step saved.
+        i_surf (int): for per-surface fields, surface to read. If ``None``, all of them.
+
+    Returns:
+        tuple: time steps read (``np.ndarray``) and the ``(n_steps, ...)`` values of the field. For per-surface
+        fields and ``i_surf=None``, the values are a list with the array of every surface.
+    """
+    check_file_exists(filename)
+    with h5.File(filename, 'r') as hdfile:
+        grp = hdfile[history]
+        ts = grp['ts'][()]
+        # rows of the requested time steps (ts is increasing)
+        row_start = 0 if start is None else int(np.searchsorted(ts, start, side='left'))
+        row_stop = len(ts) if stop is None else int(np.searchsorted(ts, stop, side='left'))
+        rows = slice(row_start, max(row_start, row_stop))
+
+        item = grp[field]
+        if isinstance(item, h5.Group):
+            if i_surf is not None:
+                return ts[rows], item['%.5d' % i_surf][rows, ...]
+            return ts[rows], [item[name][rows, ...] for name in sorted(item.keys())]
+        values = item[rows, ...]
+        # a field no longer saved has less rows than ts
+        return ts[rows][:values.shape[0]], values
+
+
 def check_fem_dict(fem_dict):
     print('\tRunning tests for the FEM input file...', end='')
     # import pdb; pdb.set_trace()
@@ -84,13 +285,8 @@ def readh5(filename):
     ### read and scan file
     hdfile=h5.File(filename,'r')
 
-    NamesList=[]                   # dataset names
-    hdfile.visit(NamesList.append)
-    
     ### Identify higher level groups / attributes
-    MainLev=[]
-    for name in NamesList:
-        if '/' not in name: MainLev.append(name)
+    MainLev=list(hdfile.keys())
 
     ### Loop through higher level
     for name in MainLev:
@@ -100,7 +296,7 @@ def readh5(filename):
             Ginst.name=name
             setattr(Hinst,name,Ginst)
         else:
-            setattr(Hinst,name,hdfile[name].value)
+            setattr(Hinst,name,read_dataset(hdfile[name]))
 
     # close and return
     hdfile.close()  
@@ -111,18 +307,13 @@ def readh5(filename):
 def read_group(Grp):
     ''' Read an hdf5 group '''
 
-    NamesList=[]
-    Grp.visit(NamesList.append)
-
     ### identify higher level
-    MainLev=[]
-    for name in NamesList:
-        if '/' not in name: MainLev.append(name)
+    MainLev=list(Grp.keys())
 
     ### determine output format
     read_as='class'
     if '_read_as' in MainLev:
-        read_as=Grp['_read_as'].value
+        read_as=read_dataset(Grp['_read_as'])
 
     ### initialise output
     if read_as=='class':
@@ -135,16 +326,30 @@ def read_group(Grp):
     ### Loop through higher level
     if read_as=='list' or read_as=='tuple':
         if '_as_array' in MainLev:       
-            Hinst=list(Grp['_as_array'].value)
+            Hinst=list(Grp['_as_array'][()])
+        elif '_as_buffer' in MainLev:
+            # arrays saved as a single buffer
+            Buffer=Grp['_as_buffer'][()]
+            Start=0
+            for shape in Grp['_shapes'][()]:
+                Size=int(np.prod(shape))
+                Hinst.append(Buffer[Start:Start+Size].reshape(shape))
+                Start+=Size
         else:
-            N=len(MainLev)-1
+            # time histories saved with a retention policy do not include 
+            # the first steps: these are read as None
+            Indices=[int(name) for name in MainLev if name!='_read_as']
+            N=max(Indices)+1 if Indices else 0
             for nn in range(N):
                 name='%.5d'%nn 
+                if name not in MainLev:
+                    Hinst.append(None)
+                    continue
                 ### extract value
                 if type(Grp[name]) is h5._hl.group.Group:
                     value=read_group(Grp[name])
                 else:
-                    value=Grp[name].value   
+                    value=read_dataset(Grp[name])
                 Hinst.append(value)           
         if read_as=='tuple': tuple(Hinst)
     else:
@@ -155,7 +360,7 @@ def read_group(Grp):
             if type(Grp[name]) is h5._hl.group.Group:
                 value=read_group(Grp[name])
             else:
-                value=Grp[name].value
+                value=read_dataset(Grp[name])
 
             ### allocate
             if read_as=='class':
@@ -170,3 +375,174 @@ class ReadInto:
     pass
 
 
+def readh5_lazy(filename):
+    '''
+    Opens the HDF5 file 'filename' for lazy reading. The object returned 
+    mirrors the tree built by readh5 (groups are read as classes, dictionaries,
+    lists or tuples as in read_group), but datasets are only read when 
+    accessed:
+    - scalar and string datasets are read when the attribute is accessed.
+    - arrays are returned as LazyDataset proxies, which read the slice they
+    are indexed with (or the whole array, through np.asarray or [()]).
+
+    The file is kept open until the object is closed, which is done when it is
+    used as a context manager:
+
+        with readh5_lazy('case.data.h5') as data:
+            pos = data.data.structure.timestep_info[100].pos[:, 2]
+    '''
+    check_file_exists(filename)
+    return LazyFile(h5.File(filename,'r'))
+
+
+def lazy_item(Item):
+    ''' Returns the lazy proxy of a group or dataset '''
+    if isinstance(Item,h5.Group):
+        read_as='class'
+        if '_read_as' in Item:
+            read_as=read_dataset(Item['_read_as'])
+        if read_as in ('list','tuple'):
+            return LazyList(Item)
+        return LazyGroup(Item)
+    if Item.shape==() or Item.dtype.kind in ('S','O','U'):
+        return read_dataset(Item)
+    return LazyDataset(Item)
+
+
+class LazyDataset:
+    ''' Proxy of an hdf5 dataset, read only where indexed '''
+
+    def __init__(self,Dataset):
+        self.dataset=Dataset
+
+    @property
+    def shape(self):
+        return self.dataset.shape
+
+    @property
+    def dtype(self):
+        return self.dataset.dtype
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self,key):
+        return self.dataset[key]
+
+    def __array__(self,dtype=None,copy=None):
+        value=self.dataset[()]
+        if dtype is not None:
+            value=value.astype(dtype)
+        return value
+
+    def __repr__(self):
+        return '<LazyDataset %s: shape %s, type %s>'%(
+                            self.dataset.name,self.shape,self.dtype)
+
+
+class LazyGroup:
+    ''' 
+    Proxy of an hdf5 group read as a class (or a dictionary): members are 
+    accessed as attributes (or items) 
+    '''
+
+    def __init__(self,Grp):
+        self._group=Grp
+        self._members={}
+
+    def keys(self):
+        return [name for name in self._group.keys() if name!='_read_as']
+
+    def __getitem__(self,name):
+        if not name in self._members:
+            if name=='_read_as' or not name in self._group:
+                raise KeyError(name)
+            self._members[name]=lazy_item(self._group[name])
+        return self._members[name]
+
+    def __getattr__(self,name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __contains__(self,name):
+        return name!='_read_as' and name in self._group
+
+    def __dir__(self):
+        return self.keys()
+
+    def __repr__(self):
+        return '<LazyGroup %s: %s>'%(self._group.name,', '.join(self.keys()))
+
+
+class LazyList:
+    ''' 
+    Proxy of an hdf5 group read as a list or tuple (see read_group): the 
+    elements are read when indexed 
+    '''
+
+    def __init__(self,Grp):
+        self._group=Grp
+        self._members={}
+        names=list(Grp.keys())
+        if '_as_array' in names:
+            self._format='array'
+            self._len=Grp['_as_array'].shape[0]
+        elif '_as_buffer' in names:
+            self._format='buffer'
+            self._shapes=Grp['_shapes'][()]
+            Sizes=[int(np.prod(shape)) for shape in self._shapes]
+            self._starts=np.concatenate(([0],np.cumsum(Sizes))).astype(int)
+            self._len=len(self._shapes)
+        else:
+            self._format='groups'
+            Indices=[int(name) for name in names if name!='_read_as']
+            self._len=max(Indices)+1 if Indices else 0
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for nn in range(self._len):
+            yield self[nn]
+
+    def __getitem__(self,nn):
+        if isinstance(nn,slice):
+            return [self[ii] for ii in range(*nn.indices(self._len))]
+        if nn<0:
+            nn+=self._len
+        if not 0<=nn<self._len:
+            raise IndexError('list index out of range')
+
+        if self._format=='array':
+            return self._group['_as_array'][nn]
+        if self._format=='buffer':
+            return self._group['_as_buffer'][
+                        self._starts[nn]:self._starts[nn+1]].reshape(self._shapes[nn])
+        if not nn in self._members:
+            name='%.5d'%nn
+            # steps evicted by a retention policy are read as None
+            if name in self._group:
+                self._members[nn]=lazy_item(self._group[name])
+            else:
+                self._members[nn]=None
+        return self._members[nn]
+
+    def __repr__(self):
+        return '<LazyList %s: %u elements>'%(self._group.name,self._len)
+
+
+class LazyFile(LazyGroup):
+    ''' Lazy proxy of an open hdf5 file, see readh5_lazy '''
+
+    def close(self):
+        self._group.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,exc_type,exc_value,traceback):
+        self.close()
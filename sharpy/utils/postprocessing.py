@@ -0,0 +1,138 @@
+import copy
+import queue
+import threading
+import time
+
+
+def snapshot_data(data, n_steps=1, out=None):
+    """
+    Returns a shallow copy of ``data`` whose ``aero`` and ``structure`` hold snapshots (see
+    ``TimeStepHistory.snapshot``) of the last ``n_steps`` steps of their ``timestep_info``. The caches the
+    solver keeps filling (the nodal operators of the beam and the strips of the grid) start empty in the
+    snapshot. The rest of the attributes are shared with ``data``.
+
+    Args:
+        data (PreSharpy): problem data
+        n_steps (int): number of steps copied
+        out (PreSharpy, optional): previous snapshot, whose time steps are reused as storage
+
+    Returns:
+        PreSharpy: the snapshot
+    """
+    snapshot = copy.copy(data)
+    for name in ('aero', 'structure'):
+        model = getattr(data, name, None)
+        if model is None:
+            continue
+        model_snapshot = copy.copy(model)
+        previous = None
+        if out is not None:
+            previous = getattr(out, name).timestep_info
+        model_snapshot.timestep_info = model.timestep_info.snapshot(n_steps, out=previous)
+        # the caches are not shared between threads
+        if hasattr(model, 'nodal_operators'):
+            model_snapshot.nodal_operators = model.nodal_operators.__class__()
+        if hasattr(model, 'undeformed_strip_db'):
+            model_snapshot.undeformed_strip_db = dict()
+            model_snapshot.strip_cache = None
+            model_snapshot.strip_cache_deflection = None
+        setattr(snapshot, name, model_snapshot)
+    return snapshot
+
+
+def history_length(data):
+    """
+    Returns the number of time steps of the longest ``timestep_info`` of ``data.aero`` and ``data.structure``.
+    """
+    lengths = [len(getattr(data, name).timestep_info) for name in ('aero', 'structure')
+               if getattr(data, name, None) is not None]
+    return max(lengths, default=0)
+
+
+class BackgroundPostprocessors(object):
+    """
+    Runs online postprocessors in a worker thread, so that the solver does not wait for their output.
+
+    Every call to :meth:`submit` takes a snapshot of the time steps committed since the previous call, or of the
+    last one if none (see :func:`snapshot_data`), and puts it in a queue of at most ``queue_size`` snapshots,
+    which the worker passes in order to every postprocessor as its ``data`` before calling
+    ``run(online=True)``. When the queue is full, :meth:`submit` waits for the worker (back-pressure), so the
+    memory used is bounded. The storage of the snapshots already processed is reused.
+
+    The postprocessors only see the snapshot: what they write into the time steps is not copied back to the
+    solver data. An exception raised by a postprocessor is raised again by the next call to :meth:`submit`,
+    :meth:`flush` or :meth:`close`.
+
+    Args:
+        postprocessors (list): initialised postprocessors, run in this order
+        queue_size (int): maximum number of snapshots waiting to be processed
+    """
+    def __init__(self, postprocessors, queue_size=2):
+        self.postprocessors = list(postprocessors)
+        self.queue = queue.Queue(maxsize=max(queue_size, 1))
+        self.free = queue.Queue()
+        self.error = None
+        # time spent by submit waiting for room in the queue
+        self.wait_time = 0.
+        # number of steps of the histories at the previous submit
+        self.n_submitted = 0
+        self.thread = threading.Thread(target=self.work, name='postprocessors', daemon=True)
+        self.thread.start()
+
+    def work(self):
+        while True:
+            snapshot = self.queue.get()
+            if snapshot is None:
+                self.queue.task_done()
+                return
+            try:
+                if self.error is None:
+                    for postproc in self.postprocessors:
+                        data = postproc.data
+                        postproc.data = snapshot
+                        try:
+                            postproc.run(online=True)
+                        finally:
+                            postproc.data = data
+            except Exception as error:
+                self.error = error
+            finally:
+                self.free.put(snapshot)
+                self.queue.task_done()
+
+    def check(self):
+        if self.error is not None:
+            raise RuntimeError('Postprocessing failed in the background') from self.error
+
+    def submit(self, data):
+        """
+        Queues a snapshot of the time steps of ``data`` committed since the previous call. The first call
+        includes the steps committed before the postprocessors were started, as far as they are in memory.
+        """
+        self.check()
+        try:
+            previous = self.free.get_nowait()
+        except queue.Empty:
+            previous = None
+        n_total = history_length(data)
+        snapshot = snapshot_data(data, max(n_total - self.n_submitted, 1), out=previous)
+        self.n_submitted = n_total
+        start = time.perf_counter()
+        self.queue.put(snapshot)
+        self.wait_time += time.perf_counter() - start
+
+    def flush(self):
+        """
+        Waits until every snapshot submitted has been processed.
+        """
+        self.queue.join()
+        self.check()
+
+    def close(self):
+        """
+        Processes the remaining snapshots and stops the worker.
+        """
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self.check()
@@ -0,0 +1,2 @@
+from tests.postproc.aerogridplot_test import *
+from tests.postproc.savedata_test import *
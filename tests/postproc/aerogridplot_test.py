@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from tvtk.api import tvtk
+
+from sharpy.utils.datastructures import AeroTimeStepInfo, StructTimeStepInfo
+import sharpy.postproc.aerogridplot as aerogridplot
+
+
+def read_grid(filename):
+    reader = tvtk.XMLUnstructuredGridReader(file_name=filename)
+    reader.update()
+    return reader.output
+
+
+class TestAerogridPlot(unittest.TestCase):
+    """
+    Tests the grids written by AerogridPlot against hand-built ones
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+        class Data(object):
+            pass
+
+        # one surface of 2x2 panels with a wake of 3x2 panels: x chordwise, y spanwise
+        dimensions = np.array([[2, 2]])
+        dimensions_star = np.array([[3, 2]])
+        self.data = Data()
+        self.data.settings = {'SHARPy': {'case': 'case'}}
+        self.data.aero = Data()
+        self.data.structure = Data()
+        self.data.aero.aero2struct_mapping = [[0, 1, 2]]
+        self.data.aero.timestep_info = []
+        self.data.structure.timestep_info = []
+        for ts in range(2):
+            tstep = AeroTimeStepInfo(dimensions, dimensions_star)
+            for i_m in range(3):
+                for i_n in range(3):
+                    tstep.zeta[0][:, i_m, i_n] = [i_m, 10.0*i_n, ts]
+            for i_m in range(4):
+                for i_n in range(3):
+                    tstep.zeta_star[0][:, i_m, i_n] = [2.0 + i_m, 10.0*i_n, ts]
+            tstep.gamma[0][:] = [[1.0, 2.0], [3.0, 4.0]]
+            tstep.gamma_star[0][:] = [[5.0, 6.0], [7.0, 8.0], [9.0, 10.0]]
+            self.data.aero.timestep_info.append(tstep)
+            structure_tstep = StructTimeStepInfo(3, 1)
+            structure_tstep.for_pos[0:3] = [0.0, 0.0, 100.0]
+            self.data.structure.timestep_info.append(structure_tstep)
+        self.data.ts = 1
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_connectivity(self):
+        plot = aerogridplot.AerogridPlot()
+        # points and panels numbered chordwise first
+        np.testing.assert_array_equal(plot.connectivity(2, 2), [[0, 1, 4, 3],
+                                                                [1, 2, 5, 4],
+                                                                [3, 4, 7, 6],
+                                                                [4, 5, 8, 7]])
+        self.assertIs(plot.connectivity(2, 2), plot.connectivity(2, 2))
+
+    def test_grids(self):
+        for num_cores in (1, 2):
+            folder = os.path.join(self.folder, str(num_cores))
+            plot = aerogridplot.AerogridPlot()
+            plot.initialise(self.data, {'folder': folder,
+                                        'minus_m_star': 1,
+                                        'include_forward_motion': True,
+                                        'u_inf': 10.0,
+                                        'dt': 0.1,
+                                        'num_cores': num_cores})
+            plot.run()
+
+            body = read_grid(os.path.join(folder, 'case/aero/body_case_00_000001.vtu'))
+            # rigid body and forward motion
+            points = np.array([[i_m - 1.0, 10.0*i_n, 101.0] for i_n in range(3) for i_m in range(3)])
+            np.testing.assert_allclose(body.points.to_array(), points)
+            np.testing.assert_array_equal(body.get_cells().to_array().reshape((-1, 5)),
+                                          [[4, 0, 1, 4, 3],
+                                           [4, 1, 2, 5, 4],
+                                           [4, 3, 4, 7, 6],
+                                           [4, 4, 5, 8, 7]])
+            np.testing.assert_array_equal(body.cell_data.get_array('panel_gamma').to_array(), [1.0, 3.0, 2.0, 4.0])
+            np.testing.assert_array_equal(body.point_data.get_array('point_struct_id').to_array(),
+                                          [0, 0, 0, 1, 1, 1, 2, 2, 2])
+
+            # the last row of the wake is not plotted
+            wake = read_grid(os.path.join(folder, 'case/aero/wake_case_00_000000.vtu'))
+            points = np.array([[2.0 + i_m, 10.0*i_n, 100.0] for i_n in range(3) for i_m in range(3)])
+            np.testing.assert_allclose(wake.points.to_array(), points)
+            self.assertEqual(wake.number_of_cells, 4)
+            np.testing.assert_array_equal(wake.cell_data.get_array('panel_gamma').to_array(), [5.0, 7.0, 6.0, 8.0])
+            # the wake dimensions are not modified
+            self.assertEqual(self.data.aero.timestep_info[0].dimensions_star[0, 0], 3)
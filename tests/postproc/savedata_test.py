@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import sharpy.presharpy.presharpy
+import sharpy.postproc.savedata as savedata
+import sharpy.utils.h5utils as h5utils
+from sharpy.utils.postprocessing import BackgroundPostprocessors
+from tests.utils.aerogrid_test import generate_wing
+
+
+class TestSaveData(unittest.TestCase):
+    """
+    Tests the round trip of the models through the SaveData output
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+        class Data(object):
+            pass
+
+        self.grid, self.structure = generate_wing()
+        self.data = Data()
+        self.data.settings = {'SHARPy': {'case': 'wing'}}
+        self.data.aero = self.grid
+        self.data.structure = self.structure
+        self.data.ts = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def save(self, folder, custom_settings=None):
+        settings = {'folder': os.path.join(self.folder, folder)}
+        if custom_settings is not None:
+            settings.update(custom_settings)
+        save_data = savedata.SaveData()
+        save_data.initialise(self.data, settings)
+        save_data.run()
+        return os.path.join(self.folder, folder, 'wing.data.h5')
+
+    def test_aerogrid(self):
+        # the strip caches of the grid are not saved
+        self.assertTrue(len(self.grid.undeformed_strip_db))
+        out = h5utils.readh5(self.save('h5')).data.aero
+        np.testing.assert_array_equal(out.aero_dimensions, self.grid.aero_dimensions)
+        np.testing.assert_array_equal(out.timestep_info[0].zeta[0], self.grid.timestep_info[0].zeta[0])
+        for attr in ('undeformed_strip_db', 'strip_cache', 'strip_cache_deflection', 'force_mapping'):
+            self.assertFalse(hasattr(out, attr))
+
+        filename = self.save('columnar', {'format': 'columnar'})
+        out = h5utils.readh5(filename).data.aero
+        np.testing.assert_array_equal(out.aero_dimensions, self.grid.aero_dimensions)
+        ts, zeta = h5utils.read_time_series(filename, 'timesteps/aero', 'zeta', i_surf=0)
+        np.testing.assert_array_equal(ts, [0])
+        np.testing.assert_array_equal(zeta[0], self.grid.timestep_info[0].zeta[0])
+
+    def test_time(self):
+        self.grid.timestep_info[0].time = 0.25
+        out = h5utils.readh5(self.save('h5')).data.aero
+        self.assertEqual(out.timestep_info[0].time, 0.25)
+
+        filename = self.save('columnar', {'format': 'columnar'})
+        ts, time = h5utils.read_time_series(filename, 'timesteps/aero', 'time')
+        np.testing.assert_array_equal(ts, [0])
+        np.testing.assert_array_equal(time, [0.25])
+
+    def test_dynamic_input(self):
+        n_steps = 3
+        dynamic_forces = np.random.rand(n_steps, self.structure.num_node, 6)
+        for_vel = np.random.rand(n_steps, 6)
+        self.structure.add_unsteady_information({'dynamic_forces': dynamic_forces, 'for_vel': for_vel}, n_steps)
+
+        out = h5utils.readh5(self.save('h5')).data.structure.dynamic_input
+        self.assertEqual(out.n_steps, n_steps)
+        np.testing.assert_array_equal(out.columns['dynamic_forces'], dynamic_forces)
+        np.testing.assert_array_equal(out.columns['for_vel'], for_vel)
+        # the missing inputs keep their zero default
+        np.testing.assert_array_equal(out.zeros['for_acc'], np.zeros(6))
+
+    def test_background(self):
+        save_data = savedata.SaveData()
+        save_data.initialise(self.data, {'folder': os.path.join(self.folder, 'background'), 'format': 'columnar'})
+        background = BackgroundPostprocessors([save_data])
+        n_steps = 4
+        for ts in range(1, n_steps):
+            self.grid.timestep_info.append_copy(self.grid.timestep_info[-1])
+            self.grid.timestep_info[-1].zeta[0][:] = ts
+            self.grid.timestep_info[-1].time = 0.1*ts
+            self.structure.timestep_info.append_copy(self.structure.timestep_info[-1])
+            self.data.ts = ts
+            background.submit(self.data)
+            # the solver keeps using its caches while the snapshot is saved
+            self.grid.invalidate_strip_cache()
+        background.close()
+        save_data.run()
+
+        filename = os.path.join(self.folder, 'background', 'wing.data.h5')
+        ts, zeta = h5utils.read_time_series(filename, 'timesteps/aero', 'zeta', i_surf=0)
+        np.testing.assert_array_equal(ts, np.arange(n_steps))
+        np.testing.assert_array_equal(zeta[1:, 0, 0, 0], [1., 2., 3.])
+        _, time = h5utils.read_time_series(filename, 'timesteps/aero', 'time')
+        np.testing.assert_allclose(time, [0., 0.1, 0.2, 0.3])
+        out = h5utils.readh5(filename).data.aero
+        np.testing.assert_array_equal(out.aero_dimensions, self.grid.aero_dimensions)
@@ -1,2 +1,11 @@
 from tests.utils.settings_test import *
 from tests.utils.algebra_test import *
+from tests.utils.datastructures_test import *
+from tests.utils.mapping_test import *
+from tests.utils.turbsim_test import *
+from tests.utils.coupling_test import *
+from tests.utils.aerogrid_test import *
+from tests.utils.beam_test import *
+from tests.utils.h5utils_test import *
+from tests.utils.postprocessing_test import *
+from tests.utils.gustvelocityfield_test import *
@@ -0,0 +1,273 @@
+import ctypes as ct
+import numpy as np
+import unittest
+
+import sharpy.aero.models.aerogrid as aerogrid
+import sharpy.aero.utils.mapping as mapping
+import sharpy.structure.models.beam as beam
+import sharpy.utils.algebra as algebra
+from sharpy.utils.datastructures import AeroTimeStepInfo
+
+
+def loop_strip(node_info, airfoil_db, orientation_in=np.array([1, 0, 0])):
+    """
+    Strip coordinates and velocities in the G frame, computed point by point
+    """
+    n_points = node_info['M'] + 1
+    strip_b = np.zeros((3, n_points))
+    if node_info['M_distribution'] == 'uniform':
+        strip_b[1, :] = np.linspace(0.0, 1.0, n_points)
+    else:
+        strip_b[1, :] = 0.5*(1.0 - np.cos(np.linspace(0, 1.0, n_points)*np.pi))
+    strip_b[2, :] = airfoil_db[node_info['airfoil']](strip_b[1, :])
+    strip_b[1, :] -= node_info['eaxis']
+
+    if node_info['control_surface'] is not None:
+        i_hinge = node_info['M'] - node_info['control_surface']['chord']
+        hinge = strip_b[:, i_hinge].copy()
+        for i_m in range(i_hinge, n_points):
+            strip_b[:, i_m] = np.dot(algebra.rotation3d_x(-node_info['control_surface']['deflection']),
+                                     strip_b[:, i_m] - hinge) + hinge
+    strip_b *= node_info['chord']
+
+    cab = algebra.crv2rot(node_info['beam_psi'])
+    c_rot = algebra.rotation3d_z(-algebra.angle_between_vectors_sign(orientation_in, cab[:, 1], cab[:, 2]))
+    omega_b = algebra.crv_dot2Omega(node_info['beam_psi'], node_info['psi_dot'])
+    zeta = np.zeros((3, n_points))
+    zeta_dot = np.zeros((3, n_points))
+    for i_m in range(n_points):
+        point_b = np.dot(algebra.rotation3d_z(node_info['sweep']),
+                         np.dot(c_rot, np.dot(algebra.rotation3d_x(node_info['twist']), strip_b[:, i_m])))
+        point_a = np.dot(cab, point_b)
+        zeta_dot[:, i_m] = np.dot(node_info['cga'], node_info['pos_dot'] + np.dot(algebra.skew(omega_b), point_a))
+        zeta[:, i_m] = np.dot(node_info['cga'], point_a + node_info['beam_coord'])
+    return zeta, zeta_dot
+
+
+def generate_wing(num_elem=4, m=4):
+    """
+    Returns a straight wing of 3-noded elements along y, with a control surface on the outer half
+    """
+    num_node = 2*num_elem + 1
+    coordinates = np.zeros((num_node, 3))
+    coordinates[:, 1] = np.linspace(0.0, 8.0, num_node)
+    connectivities = np.zeros((num_elem, 3), dtype=int)
+    for i_elem in range(num_elem):
+        connectivities[i_elem, :] = [2*i_elem, 2*i_elem + 2, 2*i_elem + 1]
+    frame_of_reference_delta = np.zeros((num_elem, 3, 3))
+    frame_of_reference_delta[:, :, 0] = [-1.0, 0.0, 0.0]
+    boundary_conditions = np.zeros((num_node, ), dtype=int)
+    boundary_conditions[0] = 1
+    boundary_conditions[-1] = -1
+    in_data = {'num_node_elem': 3,
+               'num_node': num_node,
+               'num_elem': num_elem,
+               'coordinates': coordinates,
+               'connectivities': connectivities,
+               'elem_stiffness': np.zeros((num_elem, ), dtype=int),
+               'stiffness_db': 1e4*np.eye(6)[None, :, :],
+               'elem_mass': np.zeros((num_elem, ), dtype=int),
+               'mass_db': np.eye(6)[None, :, :],
+               'frame_of_reference_delta': frame_of_reference_delta,
+               'structural_twist': np.zeros((num_node, )),
+               'boundary_conditions': boundary_conditions,
+               'app_forces': np.zeros((num_node, 6))}
+    structure = beam.Beam()
+    structure.generate(in_data, {'orientation': np.array([1.0, 0.0, 0.0, 0.0]), 'unsteady': False})
+
+    airfoil = np.zeros((20, 2))
+    airfoil[:, 0] = np.linspace(0.0, 1.0, 20)
+    airfoil[:, 1] = 0.05*np.sin(np.pi*airfoil[:, 0])
+    twist = np.zeros((num_elem, 3))
+    twist[num_elem//2:, :] = 0.05
+    control_surface = np.zeros((num_elem, 3), dtype=int) - 1
+    control_surface[num_elem//2:, :] = 0
+    aero_dict = {'aero_node': np.ones((num_node, ), dtype=bool),
+                 'surface_distribution': np.zeros((num_elem, ), dtype=int),
+                 'surface_m': np.array([m]),
+                 'chord': np.ones((num_elem, 3)),
+                 'elastic_axis': 0.25*np.ones((num_elem, 3)),
+                 'twist': twist,
+                 'sweep': np.zeros((num_elem, 3)),
+                 'm_distribution': b'uniform',
+                 'airfoil_distribution': np.zeros((num_elem, 3), dtype=int),
+                 'airfoils': {'0': airfoil},
+                 'control_surface': control_surface,
+                 'control_surface_type': np.array([0]),
+                 'control_surface_deflection': np.array([0.1]),
+                 'control_surface_chord': np.array([2])}
+    grid = aerogrid.Aerogrid()
+    grid.generate(aero_dict, structure, {'mstar': ct.c_int(5), 'freestream_dir': np.array([1.0, 0.0, 0.0])}, 0)
+    return grid, structure
+
+
+class TestAerogrid(unittest.TestCase):
+    """
+    Tests the generation of the aerodynamic grid and its handling of a variable time step
+    """
+
+    def test_rediscretise_wake(self):
+        dimensions = np.array([[2, 3]])
+        dimensions_star = np.array([[8, 3]])
+        tstep = AeroTimeStepInfo(dimensions, dimensions_star)
+        # straight wake with panels of length 0.5 and linear circulation
+        for i_row in range(9):
+            tstep.zeta_star[0][0, i_row, :] = 1.0 + 0.5*i_row
+            tstep.zeta_star[0][1, i_row, :] = np.arange(4)
+        tstep.gamma_star[0][:] = (np.arange(8) + 0.5).reshape(-1, 1)
+
+        aerogrid.rediscretise_wake(tstep, 0.5)
+        np.testing.assert_allclose(tstep.zeta_star[0][0, :, 0], 1.0 + 0.25*np.arange(9))
+        np.testing.assert_allclose(tstep.zeta_star[0][1, :, 2], 2.0)
+        # the first panel is closer to the trailing edge than the first old centre
+        np.testing.assert_allclose(tstep.gamma_star[0][1:, 1], 0.5*(np.arange(1, 8) + 0.5))
+        self.assertEqual(tstep.gamma_star[0][0, 1], 0.5)
+
+        # longer panels extrapolate the wake
+        aerogrid.rediscretise_wake(tstep, 4.0)
+        np.testing.assert_allclose(tstep.zeta_star[0][0, :, 0], 1.0 + np.arange(9))
+        self.assertEqual(tstep.gamma_star[0][-1, 0], tstep.gamma_star[0][-2, 0])
+
+    def test_gamma_dot_variable_dt(self):
+        dimensions = np.array([[2, 3]])
+        dimensions_star = np.array([[4, 3]])
+        steps = [AeroTimeStepInfo(dimensions, dimensions_star) for _ in range(3)]
+        # gamma = t**2 at t = 0.0, 0.3 and 0.4
+        for step, t in zip(steps, [0.0, 0.3, 0.4]):
+            step.gamma[0][:] = t**2
+
+        aerogrid.Aerogrid.compute_gamma_dot(0.1, steps[2], steps[0:2], previous_dt=0.3)
+        np.testing.assert_allclose(steps[2].gamma_dot[0], 0.8)
+
+    def test_generate_strips(self):
+        """
+        The batched strips match the ones computed point by point
+        """
+        np.random.seed(0)
+        airfoil_db = {0: lambda x: 0.05*np.sin(np.pi*x)}
+        n_strips = 5
+        node_infos = []
+        for i_strip in range(n_strips):
+            node_info = {'M': 6,
+                         'M_distribution': ['uniform', '1-cos'][i_strip % 2],
+                         'airfoil': 0,
+                         'chord': 1.0 + np.random.rand(),
+                         'eaxis': np.random.rand(),
+                         'twist': 0.2*np.random.rand() - 0.1,
+                         'sweep': 0.2*np.random.rand() - 0.1,
+                         'control_surface': None,
+                         'beam_coord': np.random.rand(3),
+                         'pos_dot': np.random.rand(3),
+                         'beam_psi': 0.2*np.random.rand(3),
+                         'psi_dot': np.random.rand(3),
+                         'cga': algebra.crv2rot(np.array([0.1, -0.05, 0.2]))}
+            if i_strip > 2:
+                node_info['control_surface'] = {'type': 'static',
+                                                'deflection': 0.2,
+                                                'chord': 2,
+                                                'hinge_coords': None}
+            node_infos.append(node_info)
+
+        undeformed = np.array([aerogrid.generate_undeformed_strip(node_info, airfoil_db)
+                               for node_info in node_infos])
+        zeta, zeta_dot = aerogrid.generate_strips(undeformed,
+                                                  np.array([node_info['beam_coord'] for node_info in node_infos]),
+                                                  np.array([node_info['pos_dot'] for node_info in node_infos]),
+                                                  np.array([node_info['beam_psi'] for node_info in node_infos]),
+                                                  np.array([node_info['psi_dot'] for node_info in node_infos]),
+                                                  node_infos[0]['cga'],
+                                                  calculate_zeta_dot=True)
+        for i_strip, node_info in enumerate(node_infos):
+            expected_zeta, expected_zeta_dot = loop_strip(node_info, airfoil_db)
+            np.testing.assert_allclose(zeta[:, :, i_strip], expected_zeta, rtol=1e-12, atol=1e-12)
+            np.testing.assert_allclose(zeta_dot[:, :, i_strip], expected_zeta_dot, rtol=1e-12, atol=1e-12)
+
+            strip_zeta, strip_zeta_dot = aerogrid.generate_strip(node_info, airfoil_db, True,
+                                                                 calculate_zeta_dot=True)
+            np.testing.assert_allclose(strip_zeta, expected_zeta, rtol=1e-12, atol=1e-12)
+            np.testing.assert_allclose(strip_zeta_dot, expected_zeta_dot, rtol=1e-12, atol=1e-12)
+
+    def check_grid(self, grid, structure, tstep):
+        """
+        Compares the grid of ``tstep`` with the strips computed point by point from the deformed beam
+        """
+        structure_tstep = structure.timestep_info[-1]
+        visited = []
+        for i_elem in range(structure.num_elem):
+            for i_local_node in range(structure.num_node_elem):
+                i_global_node = structure.connectivities[i_elem, i_local_node]
+                if i_global_node in visited:
+                    continue
+                visited.append(i_global_node)
+                master_elem, master_elem_node = structure.master[i_elem, i_local_node, :]
+                if master_elem < 0:
+                    master_elem, master_elem_node = i_elem, i_local_node
+                i_n = grid.struct2aero_mapping[i_global_node][0]['i_n']
+                control_surface = None
+                if grid.aero_dict['control_surface'][i_elem, i_local_node] >= 0:
+                    control_surface = {'deflection': grid.aero_dict['control_surface_deflection'][0],
+                                       'chord': grid.aero_dict['control_surface_chord'][0]}
+                node_info = {'M': grid.aero_dimensions[0, 0],
+                             'M_distribution': 'uniform',
+                             'airfoil': 0,
+                             'chord': grid.aero_dict['chord'][i_elem, i_local_node],
+                             'eaxis': grid.aero_dict['elastic_axis'][i_elem, i_local_node],
+                             'twist': grid.aero_dict['twist'][i_elem, i_local_node],
+                             'sweep': grid.aero_dict['sweep'][i_elem, i_local_node],
+                             'control_surface': control_surface,
+                             'beam_coord': structure_tstep.pos[i_global_node, :],
+                             'pos_dot': structure_tstep.pos_dot[i_global_node, :],
+                             'beam_psi': structure_tstep.psi[master_elem, master_elem_node, :],
+                             'psi_dot': structure_tstep.psi_dot[master_elem, master_elem_node, :],
+                             'cga': structure_tstep.cga()}
+                zeta, zeta_dot = loop_strip(node_info, grid.airfoil_db)
+                np.testing.assert_allclose(tstep.zeta[0][:, :, i_n], zeta, rtol=1e-12, atol=1e-12)
+                np.testing.assert_allclose(tstep.zeta_dot[0][:, :, i_n], zeta_dot, rtol=1e-12, atol=1e-12)
+
+    def test_strip_cache(self):
+        grid, structure = generate_wing()
+        self.assertIsInstance(grid.force_mapping, mapping.Aero2StructForceMapping)
+        # undeformed strips are shared by the nodes with the same geometry
+        self.assertEqual(len(grid.undeformed_strip_db), 2)
+        self.check_grid(grid, structure, grid.timestep_info[0])
+
+        # deformed beam: only the deformation is applied to the cached strips
+        np.random.seed(1)
+        structure_tstep = structure.timestep_info[-1]
+        structure_tstep.pos += 0.1*np.random.rand(*structure_tstep.pos.shape)
+        structure_tstep.pos_dot[:] = np.random.rand(*structure_tstep.pos_dot.shape)
+        structure_tstep.psi += 0.1*np.random.rand(*structure_tstep.psi.shape)
+        structure_tstep.psi_dot[:] = np.random.rand(*structure_tstep.psi_dot.shape)
+        strip_cache = grid.strip_cache
+        grid.generate_zeta(structure, grid.aero_settings, 0)
+        self.assertIs(grid.strip_cache, strip_cache)
+        self.check_grid(grid, structure, grid.timestep_info[0])
+
+    def test_strip_cache_invalidation(self):
+        grid, structure = generate_wing()
+        clean_node_info = {'airfoil': 0,
+                           'M': 4,
+                           'M_distribution': 'uniform',
+                           'chord': 1.0,
+                           'eaxis': 0.25,
+                           'twist': 0.0,
+                           'sweep': 0.0,
+                           'control_surface': None}
+        clean_strip = grid.get_undeformed_strip(clean_node_info)
+        deflected_zeta = grid.timestep_info[0].zeta[0].copy()
+
+        grid.set_control_surface_deflection(0, 0.3)
+        self.assertIsNone(grid.strip_cache)
+        grid.generate_zeta(structure, grid.aero_settings, 0)
+        self.check_grid(grid, structure, grid.timestep_info[0])
+        self.assertFalse(np.allclose(grid.timestep_info[0].zeta[0], deflected_zeta))
+        # the strips without control surface are reused
+        self.assertEqual(len(grid.undeformed_strip_db), 2)
+        self.assertIs(grid.get_undeformed_strip(clean_node_info), clean_strip)
+        np.testing.assert_array_equal(grid.strip_cache[0]['undeformed'][0], clean_strip)
+
+        # a deflection modified in aero_dict directly is detected
+        grid.aero_dict['control_surface_deflection'][0] = 0.1
+        self.assertFalse(grid.strip_cache_is_valid())
+        grid.generate_zeta(structure, grid.aero_settings, 0)
+        np.testing.assert_allclose(grid.timestep_info[0].zeta[0], deflected_zeta, rtol=1e-12, atol=1e-12)
@@ -42,13 +42,80 @@ class TestAlgebra(unittest.TestCase):
     #     angle = 90
     #     self.assert
 
+    def test_crv2rot_vec(self):
+        """
+        Tests the vectorised rotation matrices against crv2rot
+        """
+        psi = np.array([[0., 0., 0.],
+                        [1e-16, 0., 0.],
+                        [0.1, -0.2, 0.3],
+                        [2., 1., -1.]])
+        rot = algebra.crv2rot_vec(psi)
+        for i in range(psi.shape[0]):
+            np.testing.assert_allclose(rot[i, :, :], algebra.crv2rot(psi[i, :]), atol=1e-14)
+
+    def test_crv2tan_vec(self):
+        """
+        Tests the vectorised tangential operators against crv2tan
+        """
+        psi = np.array([[0., 0., 0.],
+                        [1e-9, 0., 0.],
+                        [0.1, -0.2, 0.3],
+                        [2., 1., -1.]])
+        tan = algebra.crv2tan_vec(psi)
+        for i in range(psi.shape[0]):
+            np.testing.assert_allclose(tan[i, :, :], algebra.crv2tan(psi[i, :]), atol=1e-14)
+
+    def test_crv2invtant_vec(self):
+        """
+        Tests the vectorised inverse transposed tangential operators against crv2invtant
+        """
+        psi = np.array([[0., 0., 0.],
+                        [1e-9, 0., 0.],
+                        [0.1, -0.2, 0.3],
+                        [2., 1., -1.]])
+        inv_tant = algebra.crv2invtant_vec(psi)
+        for i in range(psi.shape[0]):
+            np.testing.assert_allclose(inv_tant[i, :, :], algebra.crv2invtant(psi[i, :]), atol=1e-13)
+
+    def test_skew_vec(self):
+        """
+        Tests the vectorised skew-symmetric matrices against skew
+        """
+        vectors = np.array([[0., 0., 0.],
+                            [1., -2., 3.]])
+        matrices = algebra.skew_vec(vectors)
+        for i in range(vectors.shape[0]):
+            np.testing.assert_array_equal(matrices[i, :, :], algebra.skew(vectors[i, :]))
 
-
-
-
-
-
-
-
-
-
+    def test_quat2rot_vec(self):
+        """
+        Tests the vectorised rotation matrices against quat2rot
+        """
+        quat = np.array([[1., 0., 0., 0.],
+                         [0.9, 0.1, -0.2, 0.3],
+                         [0., 1., 0., 0.],
+                         [-0.5, 2., 1., 0.]])
+        rot = algebra.quat2rot_vec(quat)
+        for i in range(quat.shape[0]):
+            np.testing.assert_allclose(rot[i, :, :], algebra.quat2rot(quat[i, :]), atol=1e-14)
+
+    def test_triad_crv_vec(self):
+        """
+        Tests triad2crv_vec and crv2triad_vec against the scalar versions, including
+        the small angle branches and angles beyond pi
+        """
+        psi = np.array([[0., 0., 0.],
+                        [1e-16, 0., 0.],
+                        [0.1, -0.2, 0.3],
+                        [2., 1., -1.],
+                        [0., 0., -3.],
+                        [0., 4., 0.]])
+        v1, v2, v3 = algebra.crv2triad_vec(psi)
+        for i in range(psi.shape[0]):
+            for v, v_ref in zip((v1, v2, v3), algebra.crv2triad(psi[i, :])):
+                np.testing.assert_allclose(v[i, :], v_ref, atol=1e-14)
+
+        crv = algebra.triad2crv_vec(v1, v2, v3)
+        for i in range(psi.shape[0]):
+            np.testing.assert_allclose(crv[i, :], algebra.triad2crv(v1[i, :], v2[i, :], v3[i, :]), atol=1e-14)
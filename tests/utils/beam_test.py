@@ -0,0 +1,80 @@
+import numpy as np
+import unittest
+
+import sharpy.utils.algebra as algebra
+import sharpy.structure.models.beam as beam
+
+
+class TestBeam(unittest.TestCase):
+    """
+    Tests the batched nodal transformations of the beam
+    """
+
+    def test_premultiply_nodal(self):
+        np.random.seed(0)
+        num_node = 7
+        psi = np.random.rand(num_node, 3)
+        nodal = np.asfortranarray(np.random.rand(num_node, 6))
+        filter = np.array([True, False, True, True, True, False])
+
+        cab = algebra.crv2rot_vec(psi)
+        result = beam.premultiply_nodal(cab, nodal, filter)
+        for i_node in range(num_node):
+            expected = nodal[i_node, :].copy()
+            rotated = np.concatenate((np.dot(algebra.crv2rot(psi[i_node, :]), nodal[i_node, 0:3]),
+                                      np.dot(algebra.crv2rot(psi[i_node, :]), nodal[i_node, 3:6])))
+            expected[filter] = rotated[filter]
+            np.testing.assert_allclose(result[i_node, :], expected, rtol=1e-13, atol=1e-14)
+
+    def test_nodal_operator_cache(self):
+        class Step(object):
+            pass
+
+        cache = beam.NodalOperatorCache()
+        tstep = Step()
+        psi = np.random.rand(5, 3)
+        cab = cache.get(tstep, 'cab', psi, algebra.crv2rot_vec)
+        self.assertIs(cache.get(tstep, 'cab', psi.copy(), algebra.crv2rot_vec), cab)
+
+        # modified CRVs are detected
+        psi[2, 1] += 0.1
+        new_cab = cache.get(tstep, 'cab', psi, algebra.crv2rot_vec)
+        self.assertIsNot(new_cab, cab)
+        np.testing.assert_allclose(new_cab[2, :, :], algebra.crv2rot(psi[2, :]), atol=1e-14)
+
+
+class TestDynamicInput(unittest.TestCase):
+    """
+    Tests the columnar storage of the time dependent input
+    """
+
+    def test_dynamic_input(self):
+        num_node = 5
+        n_steps = 4
+        dyn_dict = {'dynamic_forces': np.random.rand(n_steps, num_node, 6),
+                    'for_vel': np.random.rand(n_steps, 6)}
+        dynamic_input = beam.DynamicInput(num_node, n_steps, dyn_dict)
+
+        self.assertEqual(len(dynamic_input), n_steps)
+        # present inputs are views of the dyn_dict arrays
+        self.assertTrue(np.shares_memory(dynamic_input[2]['dynamic_forces'], dyn_dict['dynamic_forces']))
+        np.testing.assert_array_equal(dynamic_input[-1]['for_vel'], dyn_dict['for_vel'][-1, :])
+
+        # missing inputs share a read-only zero array
+        for_acc = dynamic_input[1]['for_acc']
+        self.assertEqual(for_acc.shape, (6, ))
+        self.assertFalse(np.any(for_acc))
+        self.assertTrue(np.shares_memory(for_acc, dynamic_input[3]['for_acc']))
+        with self.assertRaises(ValueError):
+            for_acc[0] = 1.
+        self.assertEqual(dynamic_input[0]['enforce_trajectory'].dtype, bool)
+
+        # until they are written
+        dynamic_input[1]['for_acc'] = 1.
+        dynamic_input.writable('for_acc')[2, 0] = 2.
+        np.testing.assert_array_equal(dynamic_input.values('for_acc')[:, 0], [0., 1., 2., 0.])
+
+        with self.assertRaises(IndexError):
+            dynamic_input[n_steps]
+        with self.assertRaises(KeyError):
+            dynamic_input[0]['unknown']
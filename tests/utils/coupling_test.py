@@ -0,0 +1,250 @@
+import numpy as np
+import unittest
+
+import sharpy.utils.coupling as coupling
+
+
+class TestCoupling(unittest.TestCase):
+    """
+    Tests the FSI coupling accelerators on a linear fixed point problem
+    """
+
+    @staticmethod
+    def solve(accelerator, tolerance=1e-10, max_iter=500):
+        np.random.seed(0)
+        n = 12
+        eigenvalues = np.linspace(-1.8, 0.6, n)
+        basis, _ = np.linalg.qr(np.random.rand(n, n))
+        a = np.dot(basis*eigenvalues, basis.T)
+        b = np.random.rand(n)
+        exact = np.linalg.solve(np.eye(n) - a, b)
+
+        force = np.zeros((n, ))
+        for i_iter in range(max_iter):
+            new_force = np.dot(a, force) + b
+            if np.linalg.norm(new_force - force) < tolerance:
+                break
+            accelerator.update((new_force, ), (force, ))
+            force = new_force
+        return i_iter, np.max(np.abs(force - exact))
+
+    @staticmethod
+    def solve_static(accelerator, n_load_steps=3, tolerance=1e-10, max_iter=500):
+        """
+        Drives the accelerator as StaticCoupled does: the forces of the first iteration of every load step are
+        given to the structure unchanged and the following ones are relaxed with respect to the forces applied
+        in the previous iteration.
+
+        Returns:
+            tuple: iterations of every load step and error of the final forces
+        """
+        np.random.seed(0)
+        n = 12
+        eigenvalues = np.linspace(-1.8, 0.6, n)
+        basis, _ = np.linalg.qr(np.random.rand(n, n))
+        a = np.dot(basis*eigenvalues, basis.T)
+        b = np.random.rand(n)
+
+        n_iterations = []
+        applied = np.zeros((n, ))
+        previous_force = None
+        for i_step in range(n_load_steps):
+            load_step_multiplier = (i_step + 1.0)/n_load_steps
+            for i_iter in range(max_iter):
+                struct_forces = np.dot(a, applied) + load_step_multiplier*b
+                if i_iter == 0:
+                    accelerator.reset()
+                else:
+                    accelerator.update((struct_forces, ), (previous_force, ))
+                previous_force = struct_forces.copy()
+
+                converged = i_iter > 0 and np.linalg.norm(struct_forces - applied) < tolerance
+                applied = struct_forces
+                if converged:
+                    n_iterations.append(i_iter + 1)
+                    break
+        exact = np.linalg.solve(np.eye(n) - a, b)
+        return n_iterations, np.max(np.abs(applied - exact))
+
+    def test_aitken(self):
+        n_prescribed, _ = self.solve(coupling.initialise_accelerator('prescribed', 0.6))
+        aitken = coupling.initialise_accelerator('aitken', 0.6)
+        n_aitken, error = self.solve(aitken)
+
+        self.assertLess(error, 1e-8)
+        self.assertLess(n_aitken, n_prescribed)
+        self.assertEqual(len(aitken.history), n_aitken)
+
+    def test_aitken_static(self):
+        n_prescribed, _ = self.solve_static(coupling.initialise_accelerator('prescribed', 0.6))
+        aitken = coupling.initialise_accelerator('aitken', 0.6)
+        n_aitken, error = self.solve_static(aitken)
+
+        self.assertLess(error, 1e-8)
+        self.assertEqual(len(n_aitken), 3)
+        for i_step in range(3):
+            self.assertLess(n_aitken[i_step], n_prescribed[i_step])
+        # the factor is not stuck at its lower bound
+        self.assertGreater(min(aitken.history), aitken.min_omega)
+        self.assertEqual(len(aitken.history), n_aitken[-1] - 1)
+
+    def test_iqn_ils(self):
+        n_aitken, _ = self.solve(coupling.initialise_accelerator('aitken', 0.6))
+        n_iqn, error = self.solve(coupling.initialise_accelerator('iqn_ils', 0.6))
+
+        self.assertLess(error, 1e-8)
+        self.assertLess(n_iqn, n_aitken)
+        # the secant model is exact for a linear problem after as many iterations as unknowns
+        self.assertLessEqual(n_iqn, 12 + 2)
+
+    def test_iqn_ils_static(self):
+        n_iterations, error = self.solve_static(coupling.initialise_accelerator('iqn_ils', 0.6))
+
+        self.assertLess(error, 1e-8)
+        self.assertEqual(len(n_iterations), 3)
+        for n_iter in n_iterations:
+            # a zero first residual would stop the iterations before any secant information is gathered
+            self.assertGreater(n_iter, 2)
+            self.assertLessEqual(n_iter, 12 + 3)
+
+    def test_extrapolate(self):
+        """
+        The predictor is exact for polynomials of its order
+        """
+        class Step(object):
+            def __init__(self, t):
+                self.q = np.array([1.0 + 2.0*t - 0.5*t**2, 3.0*t])
+
+        steps = [Step(float(t)) for t in range(1, 4)]
+        predicted = Step(0.)
+        coupling.extrapolate(steps, ['q'], predicted)
+        np.testing.assert_allclose(predicted.q, Step(4.).q)
+
+        # the linear predictor is only exact for the linear component
+        coupling.extrapolate(steps[1:], ['q'], predicted)
+        self.assertAlmostEqual(predicted.q[1], Step(4.).q[1])
+        self.assertNotAlmostEqual(predicted.q[0], Step(4.).q[0])
+
+    def test_adaptive_time_step(self):
+        controller = coupling.AdaptiveTimeStep(0.01, 1.0, 1e-3, 20)
+        # small errors make the step grow up to the maximum ratio
+        controller.estimate_error(np.ones((4, )), np.ones((4, )) + 1e-7)
+        self.assertEqual(controller.next_dt(0.1, 3), 0.2)
+        # large errors make it shrink
+        controller.estimate_error(np.ones((4, )), np.ones((4, )) + 1e-2)
+        self.assertLess(controller.next_dt(0.1, 3), 0.1)
+        # without convergence the step is halved, within the bounds
+        self.assertEqual(controller.next_dt(0.1, 20, converged=False), 0.05)
+        self.assertEqual(controller.next_dt(0.015, 20, converged=False), 0.01)
+
+    def test_input_index(self):
+        # inputs every 0.1: the closest one to the time of the step, within the inputs available
+        self.assertEqual(coupling.input_index(0., 0.1, 10), 0)
+        self.assertEqual(coupling.input_index(0.3, 0.1, 10), 3)
+        self.assertEqual(coupling.input_index(0.34, 0.1, 10), 3)
+        self.assertEqual(coupling.input_index(0.36, 0.1, 10), 4)
+        self.assertEqual(coupling.input_index(2.5, 0.1, 10), 9)
+        self.assertEqual(coupling.input_index(-0.1, 0.1, 10), 0)
+
+    def test_structural_substeps(self):
+        class Step(object):
+            def __init__(self, n_node):
+                self.q = np.zeros((n_node, ))
+                self.steady_applied_forces = np.zeros((n_node, 6), order='F')
+                self.unsteady_applied_forces = np.zeros((n_node, 6), order='F')
+
+            def copy(self):
+                step = Step(len(self.q))
+                step.q[:] = self.q
+                step.steady_applied_forces[:] = self.steady_applied_forces
+                step.unsteady_applied_forces[:] = self.unsteady_applied_forces
+                return step
+
+        class Structure(object):
+            """
+            dq/dt = f - q integrated exactly for the loads f of the step, which are recorded
+            """
+            def __init__(self):
+                self.calls = []
+
+            def run(self, structural_step=None, dt=None):
+                forces = structural_step.steady_applied_forces[:, 2] + structural_step.unsteady_applied_forces[:, 2]
+                self.calls.append((dt, forces.copy()))
+                structural_step.q[:] = forces + (structural_step.q - forces)*np.exp(-dt)
+                return len(self.calls)
+
+        n_node = 3
+        dt = 0.1
+        committed = Step(n_node)
+        committed.q[:] = [0.5, 1.0, -1.0]
+        committed.steady_applied_forces[:, 2] = 1.0
+        committed.unsteady_applied_forces[:, 2] = [0.0, 0.5, 1.0]
+        new = committed.copy()
+        new.steady_applied_forces[:, 2] = 2.0
+        new.unsteady_applied_forces[:, 2] = [1.0, 0.0, 0.5]
+        new_forces = new.steady_applied_forces[:, 2] + new.unsteady_applied_forces[:, 2]
+
+        # a single substep is the same as a single step of the solver
+        reference = new.copy()
+        Structure().run(structural_step=reference, dt=dt)
+        for interpolate in (True, False):
+            step = new.copy()
+            structure = Structure()
+            self.assertEqual(coupling.run_structural_substeps(structure, step, committed, dt, 1, interpolate), 1)
+            self.assertEqual(len(structure.calls), 1)
+            self.assertEqual(structure.calls[0][0], dt)
+            np.testing.assert_array_equal(step.q, reference.q)
+
+        # held loads: the substeps advance the same total time with the new loads
+        n_substeps = 4
+        step = new.copy()
+        structure = Structure()
+        coupling.run_structural_substeps(structure, step, committed, dt, n_substeps, interpolate=False)
+        self.assertEqual(len(structure.calls), n_substeps)
+        self.assertAlmostEqual(sum([call[0] for call in structure.calls]), dt)
+        for _, forces in structure.calls:
+            np.testing.assert_array_equal(forces, new_forces)
+        np.testing.assert_allclose(step.q, reference.q, rtol=1e-13)
+
+        # interpolated loads, ending at the new ones, which are restored in the step
+        step = new.copy()
+        structure = Structure()
+        coupling.run_structural_substeps(structure, step, committed, dt, n_substeps, interpolate=True)
+        old_forces = committed.steady_applied_forces[:, 2] + committed.unsteady_applied_forces[:, 2]
+        for i_substep, (substep_dt, forces) in enumerate(structure.calls):
+            weight = (i_substep + 1.0)/n_substeps
+            self.assertAlmostEqual(substep_dt, dt/n_substeps)
+            np.testing.assert_allclose(forces, (1.0 - weight)*old_forces + weight*new_forces, rtol=1e-13)
+        np.testing.assert_array_equal(step.steady_applied_forces, new.steady_applied_forces)
+        np.testing.assert_array_equal(step.unsteady_applied_forces, new.unsteady_applied_forces)
+        self.assertFalse(np.allclose(step.q, reference.q))
+
+    def test_structural_residual(self):
+        class State(object):
+            def __init__(self, n_dof):
+                self.q = np.zeros((n_dof, ))
+                self.dqdt = np.zeros((n_dof, ))
+                self.dqddt = np.zeros((n_dof, ))
+
+        n_dof = 6*4 + 10
+        previous = State(n_dof)
+        previous.q[:] = 1.
+        previous.dqdt[:] = 1.
+        state = State(n_dof)
+        state.q[:] = 1. + 1e-7
+        state.dqdt[:] = 1.
+        # the accelerations are zero: only the absolute tolerance is meaningful
+        state.dqddt[0] = 1e-10
+
+        residual = coupling.StructuralResidual(n_dof, 1e-5, 1e-9, blocks=True)
+        self.assertTrue(residual(state, previous))
+        self.assertTrue(residual.is_finite())
+        self.assertAlmostEqual(residual.field_residual('q'), 1e-7)
+        self.assertEqual(residual.field_residual('dqddt'), 1e-10)
+
+        # a large change in the quaternion block only
+        state.q[-1] += 1.
+        self.assertFalse(residual(state, previous))
+        self.assertEqual(np.argmax(residual.residual[0, :]), 2)
+        # the residuals of the first evaluation are overwritten
+        self.assertAlmostEqual(residual.residual[0, 0], 1e-7)
@@ -0,0 +1,152 @@
+import numpy as np
+import unittest
+
+import sharpy.utils.algebra as algebra
+
+from sharpy.utils.datastructures import AeroTimeStepInfo, StructTimeStepInfo, TimeStepHistory
+
+
+class TestTimeStepHistory(unittest.TestCase):
+    """
+    Tests the TimeStepHistory container
+    """
+
+    @staticmethod
+    def new_step(value):
+        tstep = StructTimeStepInfo(5, 2)
+        tstep.pos[:] = value
+        return tstep
+
+    def test_unbounded(self):
+        """
+        Without a retention policy the history behaves as a list
+        """
+        history = TimeStepHistory()
+        history.append(self.new_step(0.))
+        for i_ts in range(1, 10):
+            history.append_copy(history[-1])
+            history[-1].pos[:] = i_ts
+
+        self.assertEqual(len(history), 10)
+        self.assertEqual(history.first_index, 0)
+        self.assertEqual(history[3].pos[0, 0], 3.)
+        self.assertEqual([tstep.pos[0, 0] for tstep in history[-3:-1]], [7., 8.])
+
+    def test_retention(self):
+        """
+        Only the last steps are kept, the rest are spilled and their storage reused
+        """
+        spilled = dict()
+
+        def spill(ts, tstep):
+            spilled[ts] = tstep.pos[0, 0]
+
+        history = TimeStepHistory(n_keep=3, spill=spill)
+        history.append(self.new_step(0.))
+        allocated = set()
+        for i_ts in range(1, 20):
+            new_step = history.append_copy(history[-1])
+            new_step.pos[:] = i_ts
+            allocated.add(id(new_step.pos))
+
+        self.assertEqual(len(history), 20)
+        self.assertEqual(history.first_index, 17)
+        self.assertEqual(history[-1].pos[0, 0], 19.)
+        self.assertEqual(history[17].pos[0, 0], 17.)
+        self.assertEqual(len(history[-3:-1]), 2)
+        self.assertEqual(len(history[:]), 3)
+        with self.assertRaises(IndexError):
+            history[16]
+        self.assertEqual(sorted(spilled.keys()), list(range(17)))
+        self.assertEqual(spilled[5], 5.)
+        self.assertLessEqual(len(allocated), 4)
+
+        history.restart()
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history[0].pos[0, 0], 19.)
+
+    def test_copy_out(self):
+        """
+        Copying into an existing step reuses its arrays
+        """
+        source = self.new_step(1.)
+        source.time = 0.25
+        destination = self.new_step(0.)
+        pos = destination.pos
+        copied = source.copy(out=destination)
+        self.assertIs(copied, destination)
+        self.assertIs(copied.pos, pos)
+        np.testing.assert_array_equal(copied.pos, source.pos)
+        self.assertIsNot(copied.pos, source.pos)
+        self.assertEqual(copied.time, 0.25)
+        self.assertEqual(source.copy().time, 0.25)
+
+
+class TestStructTimeStepInfo(unittest.TestCase):
+    """
+    Tests the structural time step
+    """
+
+    def test_glob_pos(self):
+        tstep = StructTimeStepInfo(5, 2)
+        tstep.pos[:] = np.random.rand(5, 3)
+        tstep.quat[:] = algebra.mat2quat(algebra.crv2rot(np.array([0.1, -0.2, 0.3])))
+        tstep.for_pos[0:3] = [1., 2., 3.]
+
+        cga = tstep.cga()
+        expected = np.array([np.dot(cga, pos) for pos in tstep.pos])
+        np.testing.assert_allclose(tstep.glob_pos(include_rbm=False), expected, atol=1e-14)
+        np.testing.assert_allclose(tstep.glob_pos(include_rbm=True), expected + [1., 2., 3.], atol=1e-14)
+
+
+class TestAeroTimeStepInfo(unittest.TestCase):
+    """
+    Tests the caching of the ctypes pointer tables
+    """
+
+    def test_ctypes_pointers_cache(self):
+        dimensions = np.array([[2, 3], [4, 5]])
+        dimensions_star = np.array([[10, 3], [10, 5]])
+        tstep = AeroTimeStepInfo(dimensions, dimensions_star)
+
+        tstep.generate_ctypes_pointers()
+        p_gamma = tstep.ct_p_gamma
+
+        # in place modifications keep the tables
+        tstep.gamma[1][:] = 1.
+        tstep.copy(out=tstep.copy())
+        tstep.generate_ctypes_pointers()
+        self.assertIs(tstep.ct_p_gamma, p_gamma)
+        self.assertEqual(tstep.ct_p_gamma[1][0], 1.)
+
+        # arrays of the same shape are copied into the buffer
+        tstep.gamma[1] = np.full((4, 5), 2.)
+        tstep.generate_ctypes_pointers()
+        self.assertIs(tstep.ct_p_gamma, p_gamma)
+        self.assertEqual(tstep.ct_p_gamma[1][0], 2.)
+
+        # reallocations rebuild them
+        tstep.gamma = [np.zeros((2, 3)), np.full((4, 5), 3.)]
+        tstep.generate_ctypes_pointers()
+        self.assertIsNot(tstep.ct_p_gamma, p_gamma)
+        self.assertEqual(tstep.ct_p_gamma[1][0], 3.)
+
+    def test_contiguous_buffers(self):
+        dimensions = np.array([[2, 3], [4, 5]])
+        dimensions_star = np.array([[10, 3], [10, 5]])
+        tstep = AeroTimeStepInfo(dimensions, dimensions_star)
+        tstep.zeta[1][2, :, :] = 5.
+
+        # the surfaces are views of a single buffer
+        self.assertIs(tstep.zeta[1].base, tstep.zeta.buffer)
+        self.assertEqual(tstep.zeta.buffer[tstep.zeta.offsets[-1]], 5.)
+
+        tstep.generate_ctypes_pointers()
+        self.assertEqual(tstep.ct_p_zeta[5][0], 5.)
+        self.assertEqual(tstep.ct_p_zeta[4][0], 0.)
+
+        tstep.time = 0.25
+        copied = tstep.copy()
+        np.testing.assert_array_equal(copied.zeta[1], tstep.zeta[1])
+        self.assertIsNot(copied.zeta.buffer, tstep.zeta.buffer)
+        self.assertEqual(copied.time, 0.25)
@@ -0,0 +1,52 @@
+import numpy as np
+import unittest
+
+import sharpy.generators.gustvelocityfield as gustvelocityfield
+
+
+class TestGustVelocityField(unittest.TestCase):
+    """
+    Tests the vectorised gust shapes against their pointwise definition
+    """
+
+    def test_darpa(self):
+        gust_length = 2.0
+        gust_intensity = 0.5
+        span = 10.0
+        x = np.linspace(-3.0, 1.0, 9).reshape(3, 3)
+        y = np.linspace(-5.0, 5.0, 9).reshape(3, 3)
+        z = np.zeros((3, 3))
+
+        vel = gustvelocityfield.darpa(x, y, z, gust_length, gust_intensity, span)
+        for i in range(3):
+            for j in range(3):
+                expected = 0.
+                if -gust_length <= x[i, j] <= 0.0:
+                    expected = (-(1.0 - np.cos(2.0*np.pi*x[i, j]/gust_length))*gust_intensity*0.5*
+                                np.cos(y[i, j]/span*np.pi))
+                self.assertAlmostEqual(vel[2, i, j], expected)
+        self.assertTrue(np.all(vel[0:2, ...] == 0.))
+
+        # the points outside the gust are not affected by the span
+        x[...] = 2.0
+        with np.errstate(all='raise'):
+            vel = gustvelocityfield.darpa(x, y, z, gust_length, gust_intensity, 0.)
+        self.assertTrue(np.all(vel == 0.))
+
+    def test_darpa_span(self):
+        gust = gustvelocityfield.GustVelocityField()
+        in_dict = {'u_inf': 10.,
+                   'gust_shape': 'DARPA',
+                   'gust_length': 5.,
+                   'gust_intensity': 0.1}
+        with self.assertRaises(AttributeError):
+            gust.initialise(in_dict)
+
+        in_dict['span'] = 20.
+        gust.initialise(in_dict)
+        zeta = [np.zeros((3, 2, 4))]
+        zeta[0][1, :, :] = np.linspace(-10., 10., 4)
+        uext = [np.zeros((3, 2, 4))]
+        gust.generate({'zeta': zeta, 'override': True, 'ts': 0, 'dt': 0.1, 't': 0.1}, uext)
+        self.assertTrue(np.all(np.isfinite(uext[0])))
+        np.testing.assert_allclose(uext[0][0, ...], 10.)
@@ -0,0 +1,154 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import h5py
+import numpy as np
+
+from sharpy.utils.datastructures import AeroTimeStepInfo, StructTimeStepInfo, TimeStepHistory
+import sharpy.utils.h5utils as h5utils
+
+
+class TestTimeStepAppender(unittest.TestCase):
+    """
+    Tests the incremental saving of time steps
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.filename = os.path.join(self.folder, 'timesteps.h5')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_append(self):
+        history = TimeStepHistory(n_keep=2)
+        history.append(StructTimeStepInfo(5, 2))
+        n_steps = 10
+        with h5py.File(self.filename, 'w') as hdfile:
+            appender = h5utils.TimeStepAppender(hdfile.create_group('structure'), chunk_steps=4)
+            appender.append(0, history[0])
+            for ts in range(1, n_steps):
+                history.append_copy(history[-1])
+                history[-1].pos[:] = ts
+                appender.append(ts, history[-1])
+
+        with h5py.File(self.filename, 'r') as hdfile:
+            grp = hdfile['structure']
+            np.testing.assert_array_equal(grp['ts'][()], np.arange(n_steps))
+            self.assertEqual(grp['pos'].shape, (n_steps, 5, 3))
+            self.assertEqual(grp['pos'].chunks[0], 4)
+            np.testing.assert_array_equal(grp['pos'][:, 0, 0], np.arange(n_steps))
+            self.assertEqual(grp['psi'].shape, (n_steps, 2, 3, 3))
+
+    def test_online_then_offline(self):
+        """
+        An offline save after an online one continues the streamed history, as SaveData does
+        """
+        history = TimeStepHistory(n_keep=3)
+        history.append(StructTimeStepInfo(5, 2))
+        with h5py.File(self.filename, 'w') as hdfile:
+            appender = h5utils.TimeStepAppender(hdfile.require_group('timesteps').require_group('structure'))
+            appender.append(0, history[0])
+            for ts in range(1, 5):
+                history.append_copy(history[-1])
+                history[-1].pos[:] = ts
+                appender.append(ts, history[-1])
+        # steps committed after the online output was closed, only the last ones are still in memory
+        for ts in range(5, 8):
+            history.append_copy(history[-1])
+            history[-1].pos[:] = ts
+        self.assertEqual(history.first_index, 5)
+
+        with h5py.File(self.filename, 'a') as hdfile:
+            appender = h5utils.TimeStepAppender(hdfile.require_group('timesteps').require_group('structure'))
+            self.assertEqual(appender.last_ts, 4)
+            ts_list = list(range(max(appender.last_ts + 1, history.first_index), len(history)))
+            appender.append_steps(ts_list, [history[ts] for ts in ts_list])
+
+        ts, pos = h5utils.read_time_series(self.filename, 'timesteps/structure', 'pos')
+        np.testing.assert_array_equal(ts, np.arange(8))
+        np.testing.assert_array_equal(pos[:, 0, 0], np.arange(8))
+
+    def test_read_time_series(self):
+        tstep = AeroTimeStepInfo(np.array([[2, 3], [4, 5]]), np.array([[10, 3], [10, 5]]))
+        n_steps = 12
+        with h5py.File(self.filename, 'w') as hdfile:
+            appender = h5utils.TimeStepAppender(hdfile.create_group('aero'), chunk_steps=5,
+                                                compression='gzip', shuffle=True)
+            steps = []
+            for ts in range(n_steps):
+                steps.append(tstep.copy())
+                steps[-1].gamma[1][:] = ts
+            appender.append_steps(list(range(n_steps))[:7], steps[:7])
+            for ts in range(7, n_steps):
+                appender.append(ts, steps[ts])
+            self.assertEqual(hdfile['aero/gamma/00001'].compression, 'gzip')
+
+        self.assertIn('gamma', h5utils.time_series_fields(self.filename, 'aero'))
+        ts, gamma = h5utils.read_time_series(self.filename, 'aero', 'gamma', start=3, stop=6, i_surf=1)
+        np.testing.assert_array_equal(ts, [3, 4, 5])
+        self.assertEqual(gamma.shape, (3, 4, 5))
+        np.testing.assert_array_equal(gamma[:, -1, -1], [3., 4., 5.])
+
+        ts, zeta = h5utils.read_time_series(self.filename, 'aero', 'zeta', start=10)
+        np.testing.assert_array_equal(ts, [10, 11])
+        self.assertEqual([z.shape for z in zeta], [(2, 3, 3, 4), (2, 3, 5, 6)])
+
+
+class TestReadh5Lazy(unittest.TestCase):
+    """
+    Tests the lazy reader against readh5
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.filename = os.path.join(self.folder, 'case.data.h5')
+        # layout of sharpy.postproc.savedata
+        with h5py.File(self.filename, 'w') as hdfile:
+            data = hdfile.create_group('data')
+            data['_read_as'] = 'class'
+            data['ts'] = 3
+            data['case'] = 'case'
+            history = data.create_group('timestep_info')
+            history['_read_as'] = 'list'
+            for ts in (1, 2):
+                tstep = history.create_group('%.5d' % ts)
+                tstep['_read_as'] = 'class'
+                tstep['pos'] = np.full((5, 3), float(ts))
+                gamma = tstep.create_group('gamma')
+                gamma['_read_as'] = 'list'
+                gamma['_as_buffer'] = np.arange(26.)
+                gamma['_shapes'] = np.array([[2, 3], [4, 5]])
+            settings = data.create_group('settings')
+            settings['_read_as'] = 'dict'
+            settings['dt'] = 0.1
+            array_list = data.create_group('array_list')
+            array_list['_read_as'] = 'list'
+            array_list['_as_array'] = np.eye(3)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_readh5_lazy(self):
+        eager = h5utils.readh5(self.filename)
+        with h5utils.readh5_lazy(self.filename) as lazy:
+            self.assertEqual(lazy.data.ts, eager.data.ts)
+            self.assertEqual(lazy.data.case, 'case')
+            self.assertEqual(lazy.data.settings['dt'], eager.data.settings['dt'])
+
+            history = lazy.data.timestep_info
+            self.assertEqual(len(history), len(eager.data.timestep_info))
+            self.assertIsNone(history[0])
+            pos = history[-1].pos
+            self.assertIsInstance(pos, h5utils.LazyDataset)
+            self.assertEqual(pos.shape, (5, 3))
+            np.testing.assert_array_equal(pos[:, 1], eager.data.timestep_info[2].pos[:, 1])
+            np.testing.assert_array_equal(np.asarray(pos), eager.data.timestep_info[2].pos)
+            np.testing.assert_array_equal(history[1].gamma[1], eager.data.timestep_info[1].gamma[1])
+            np.testing.assert_array_equal(lazy.data.array_list[2], eager.data.array_list[2])
+            with self.assertRaises(AttributeError):
+                lazy.data.missing
+            file_handle = lazy._group
+        self.assertFalse(file_handle)
@@ -0,0 +1,76 @@
+import numpy as np
+import unittest
+
+import sharpy.utils.algebra as algebra
+import sharpy.aero.utils.mapping as mapping
+
+
+def loop_force_mapping(aero_forces, struct2aero_mapping, zeta, pos_def, psi_def, master, cag):
+    n_node, _ = pos_def.shape
+    struct_forces = np.zeros((n_node, 6))
+    for i_global_node in range(n_node):
+        for node_mapping in struct2aero_mapping[i_global_node]:
+            i_surf = node_mapping['i_surf']
+            i_n = node_mapping['i_n']
+            _, n_m, _ = aero_forces[i_surf].shape
+            i_master_elem, master_elem_local_node = master[i_global_node, :]
+            cab = algebra.crv2rot(psi_def[i_master_elem, master_elem_local_node, :])
+            cbg = np.dot(cab.T, cag)
+            for i_m in range(n_m):
+                chi_g = zeta[i_surf][:, i_m, i_n] - np.dot(cag.T, pos_def[i_global_node, :])
+                struct_forces[i_global_node, 0:3] += np.dot(cbg, aero_forces[i_surf][0:3, i_m, i_n])
+                struct_forces[i_global_node, 3:6] += np.dot(cbg, aero_forces[i_surf][3:6, i_m, i_n])
+                struct_forces[i_global_node, 3:6] += np.dot(cbg, np.cross(chi_g, aero_forces[i_surf][0:3, i_m, i_n]))
+    return struct_forces
+
+
+class TestMapping(unittest.TestCase):
+    """
+    Tests the aero to structure force mapping
+    """
+
+    def test_aero2struct_force_mapping(self):
+        np.random.seed(0)
+        n_elem = 10
+        n_node = 2*n_elem + 1
+        m = 4
+
+        # two surfaces sharing the central node, one node without aero
+        struct2aero_mapping = [[] for _ in range(n_node)]
+        n_surf_nodes = [0, 0]
+        for i_node in range(n_node - 1):
+            i_surf = 0 if i_node <= n_node//2 else 1
+            if i_node == n_node//2:
+                struct2aero_mapping[i_node].append({'i_surf': 1, 'i_n': n_surf_nodes[1]})
+                n_surf_nodes[1] += 1
+            struct2aero_mapping[i_node].append({'i_surf': i_surf, 'i_n': n_surf_nodes[i_surf]})
+            n_surf_nodes[i_surf] += 1
+
+        aero_forces = [np.random.rand(6, m + 1, n) for n in n_surf_nodes]
+        zeta = [np.random.rand(3, m + 1, n) for n in n_surf_nodes]
+        pos_def = np.random.rand(n_node, 3)
+        psi_def = np.random.rand(n_elem, 3, 3)
+        master = np.zeros((n_node, 2), dtype=int)
+        master[:, 0] = np.minimum(np.arange(n_node)//2, n_elem - 1)
+        master[:, 1] = np.arange(n_node) % 2
+        cag = algebra.crv2rot(np.array([0.1, -0.2, 0.3]))
+
+        expected = loop_force_mapping(aero_forces, struct2aero_mapping, zeta, pos_def, psi_def, master, cag)
+        result = mapping.aero2struct_force_mapping(aero_forces, struct2aero_mapping, zeta,
+                                                   pos_def, psi_def, master, None, cag)
+        np.testing.assert_allclose(result, expected, rtol=1e-12, atol=1e-12)
+        self.assertTrue(np.all(result[-1, :] == 0.))
+
+        # operator built once and given explicitly, as the one of the Aerogrid
+        operator = mapping.Aero2StructForceMapping(struct2aero_mapping, len(aero_forces))
+        for _ in range(2):
+            result = mapping.aero2struct_force_mapping(aero_forces, struct2aero_mapping, zeta,
+                                                       pos_def, psi_def, master, None, cag, operator=operator)
+            np.testing.assert_allclose(result, expected, rtol=1e-12, atol=1e-12)
+
+        # without an operator, a mapping modified in place is not mapped with the previous one
+        struct2aero_mapping[n_node//2] = struct2aero_mapping[n_node//2][1:]
+        expected = loop_force_mapping(aero_forces, struct2aero_mapping, zeta, pos_def, psi_def, master, cag)
+        result = mapping.aero2struct_force_mapping(aero_forces, struct2aero_mapping, zeta,
+                                                   pos_def, psi_def, master, None, cag)
+        np.testing.assert_allclose(result, expected, rtol=1e-12, atol=1e-12)
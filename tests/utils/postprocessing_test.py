@@ -0,0 +1,97 @@
+import threading
+import unittest
+
+from sharpy.utils.datastructures import StructTimeStepInfo, TimeStepHistory
+from sharpy.utils.postprocessing import BackgroundPostprocessors, snapshot_data
+from tests.utils.aerogrid_test import generate_wing
+
+
+class Structure(object):
+    def __init__(self):
+        self.timestep_info = TimeStepHistory(n_keep=2)
+
+
+class Data(object):
+    def __init__(self):
+        self.structure = Structure()
+        self.structure.timestep_info.append(StructTimeStepInfo(5, 2))
+
+
+class TipRecorder(object):
+    """
+    Online postprocessor recording the step number and tip position it sees
+    """
+    def __init__(self, data, release=None):
+        self.data = data
+        self.release = release
+        self.records = []
+
+    def run(self, online=False):
+        if self.release is not None:
+            self.release.wait()
+        history = self.data.structure.timestep_info
+        self.records.append((len(history) - 1, history[-1].pos[-1, 0]))
+        return self.data
+
+
+class TestBackgroundPostprocessors(unittest.TestCase):
+    """
+    Tests the postprocessing of snapshots in a background thread
+    """
+
+    def test_background_postprocessors(self):
+        data = Data()
+        release = threading.Event()
+        recorder = TipRecorder(data, release)
+        background = BackgroundPostprocessors([recorder], queue_size=2)
+
+        n_steps = 8
+        for ts in range(1, n_steps):
+            tstep = data.structure.timestep_info.append_copy(data.structure.timestep_info[-1])
+            tstep.pos[:] = ts
+            if ts == 4:
+                # the worker is blocked: the queue is full and the solver data evolves
+                self.assertTrue(background.queue.full())
+                release.set()
+            background.submit(data)
+        background.close()
+
+        # every step is seen once, with its values when it was committed
+        self.assertEqual(recorder.records, [(ts, float(ts)) for ts in range(1, n_steps)])
+        self.assertIs(recorder.data, data)
+
+    def test_error(self):
+        class Failing(TipRecorder):
+            def run(self, online=False):
+                raise ValueError('failed')
+
+        data = Data()
+        background = BackgroundPostprocessors([Failing(data)])
+        background.submit(data)
+        with self.assertRaises(RuntimeError):
+            background.close()
+
+
+class TestSnapshotData(unittest.TestCase):
+    """
+    Tests the snapshots of the problem data
+    """
+
+    def test_caches(self):
+        class WingData(object):
+            pass
+
+        data = WingData()
+        data.aero, data.structure = generate_wing()
+        snapshot = snapshot_data(data)
+        self.assertIsNot(snapshot.aero.timestep_info, data.aero.timestep_info)
+
+        # the caches of the solver are not shared with the snapshot
+        self.assertTrue(len(data.aero.undeformed_strip_db))
+        self.assertEqual(len(snapshot.aero.undeformed_strip_db), 0)
+        self.assertIsNone(snapshot.aero.strip_cache)
+        self.assertIsNot(snapshot.structure.nodal_operators, data.structure.nodal_operators)
+        data.aero.invalidate_strip_cache()
+        snapshot.aero.generate_strip_cache(snapshot.structure)
+        self.assertIsNone(data.aero.strip_cache)
+        self.assertIsNotNone(snapshot.aero.strip_cache)
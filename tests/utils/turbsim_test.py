@@ -0,0 +1,70 @@
+import h5py as h5
+import numpy as np
+import os
+import scipy.interpolate as interpolate
+import tempfile
+import unittest
+
+from sharpy.generators.turbsimvelocityfield import TurbSimVelocityField, trilinear_interpolation
+
+
+class TestTurbSimInterpolation(unittest.TestCase):
+    """
+    Tests the batched interpolation of the turbulent velocity field
+    """
+
+    def test_trilinear_interpolation(self):
+        np.random.seed(0)
+        grid = (np.linspace(-1., 1., 5), np.linspace(0., 3., 7), np.cumsum(np.random.rand(9)))
+        data = np.random.rand(3, 5, 7, 9)
+        points = np.zeros((3, 200))
+        for i_axis in range(3):
+            # some of the points are outside the grid
+            span = grid[i_axis][-1] - grid[i_axis][0]
+            points[i_axis, :] = grid[i_axis][0] - 0.05*span + 1.1*span*np.random.rand(200)
+        points[:, 0] = [grid[0][-1], grid[1][0], grid[2][-1]]
+
+        result = trilinear_interpolation(grid, data, points)
+        for i_dim in range(3):
+            interpolator = interpolate.RegularGridInterpolator(grid, data[i_dim, :, :, :],
+                                                               bounds_error=False,
+                                                               fill_value=0.0)
+            np.testing.assert_allclose(result[i_dim, :], interpolator(points.T), rtol=1e-12, atol=1e-12)
+
+    def test_stream(self):
+        """
+        Streaming the field by slabs gives the same velocities as loading it whole
+        """
+        np.random.seed(1)
+        n_x = 200
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, 'field.h5')
+            with h5.File(filename, 'w') as h5file:
+                h5file['time'] = np.linspace(0., 20., n_x)
+                h5file['u_inf'] = 10.
+                h5file['y_grid'] = np.linspace(-10., 10., 6)
+                h5file['z_grid'] = np.linspace(-5., 5., 4)
+                h5file.create_dataset('data/velocity', data=np.random.rand(3, 4, 6, n_x), chunks=(3, 4, 6, 10))
+
+            generators = []
+            for stream in (False, True):
+                generator = TurbSimVelocityField()
+                generator.initialise({'turbulent_field': filename,
+                                      'u_inf': 10.,
+                                      'offset': [0., 0., 0.],
+                                      'stream': stream,
+                                      'stream_margin': 5.})
+                generators.append(generator)
+
+            zeta = [np.random.rand(3, 3, 4)*np.array([2., 8., 4.]).reshape(3, 1, 1)]
+            for for_pos in np.linspace(-190., -10., 10):
+                uext = [[np.zeros_like(z) for z in zeta] for _ in generators]
+                for generator, u in zip(generators, uext):
+                    generator.generate({'zeta': zeta, 'for_pos': np.array([for_pos, 0., 0.])}, u)
+                np.testing.assert_allclose(uext[1][0], uext[0][0], rtol=1e-12, atol=1e-12)
+                self.assertTrue(np.all(uext[1][0] != 0.))
+
+            # only a window of the field is in memory
+            self.assertLess(generators[1].turb_data.shape[-1], 20)
+            for generator in generators:
+                generator.h5file.close()
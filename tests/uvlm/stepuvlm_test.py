@@ -0,0 +1,67 @@
+import numpy as np
+import unittest
+
+import sharpy.aero.models.aerogrid as aerogrid
+from sharpy.utils.datastructures import AeroTimeStepInfo
+
+
+class TestStepUvlm(unittest.TestCase):
+    """
+    Tests the steps StepUvlm uses for gamma_dot
+    """
+
+    @staticmethod
+    def step_solver(times):
+        import sharpy.solvers.stepuvlm as stepuvlm
+
+        class Data(object):
+            pass
+
+        data = Data()
+        data.aero = aerogrid.Aerogrid()
+        dimensions = np.array([[2, 3]])
+        dimensions_star = np.array([[4, 3]])
+        for t in times:
+            data.aero.timestep_info.append(AeroTimeStepInfo(dimensions, dimensions_star))
+            data.aero.timestep_info[-1].gamma[0][:] = t**2
+        solver = stepuvlm.StepUvlm()
+        solver.data = data
+        return solver
+
+    def test_gamma_dot_committed_step(self):
+        # gamma = t**2 at t = 0.0, 0.3 and 0.4, the current step is the last one
+        solver = self.step_solver([0.0, 0.3, 0.4])
+        solver.compute_gamma_dot(solver.data.aero.timestep_info[-1], 0.1, previous_dt=0.3)
+        np.testing.assert_allclose(solver.data.aero.timestep_info[-1].gamma_dot[0], 0.8)
+
+    def test_gamma_dot_scratch_step(self):
+        # the current step is a scratch copy, committed after the steps at t = 0.0 and 0.3
+        solver = self.step_solver([0.0, 0.3])
+        scratch = solver.data.aero.timestep_info[-1].copy()
+        scratch.gamma[0][:] = 0.4**2
+        solver.compute_gamma_dot(scratch, 0.1, previous_dt=0.3)
+        np.testing.assert_allclose(scratch.gamma_dot[0], 0.8)
+        # the committed steps are not modified
+        np.testing.assert_allclose(solver.data.aero.timestep_info[-1].gamma[0], 0.3**2)
+
+        # first step: first order difference with the initial state
+        solver = self.step_solver([0.0])
+        scratch = solver.data.aero.timestep_info[-1].copy()
+        scratch.gamma[0][:] = 0.1**2
+        solver.compute_gamma_dot(scratch, 0.1, previous_dt=0.1)
+        np.testing.assert_allclose(scratch.gamma_dot[0], 0.1)
+
+    def test_gamma_dot_uniform_steps(self):
+        # the scratch step at t = 0.3 is committed after the step at t = 0.2
+        solver = self.step_solver([0.0, 0.1, 0.2])
+        scratch = solver.data.aero.timestep_info[-1].copy()
+        scratch.gamma[0][:] = 0.3**2
+        solver.compute_gamma_dot(scratch, 0.1)
+        np.testing.assert_allclose(scratch.gamma_dot[0], 0.6)
+
+        # the first step has a first order difference with the initial state
+        solver = self.step_solver([0.0])
+        scratch = solver.data.aero.timestep_info[-1].copy()
+        scratch.gamma[0][:] = 0.1**2
+        solver.compute_gamma_dot(scratch, 0.1)
+        np.testing.assert_allclose(scratch.gamma_dot[0], 0.1)